@@ -1,13 +1,18 @@
 """distributed_prompt — horizontally scalable prompts for Recursive Language Models."""
 
 from distributed_prompt.backends.file_backend import FileBackend
+from distributed_prompt.cache import ShardCache, SharedShardCache
 from distributed_prompt.core import DistributedPrompt
 from distributed_prompt.ingest import ingest_file, ingest_string
+from distributed_prompt.rope import PromptRope
 from distributed_prompt.shard import ShardIndex, ShardMeta
 
 __all__ = [
     "DistributedPrompt",
     "FileBackend",
+    "PromptRope",
+    "ShardCache",
+    "SharedShardCache",
     "ShardIndex",
     "ShardMeta",
     "ingest_file",
@@ -1,7 +1,8 @@
 """Shard storage backends."""
 
+from distributed_prompt.backends.caching_backend import CachingBackend
 from distributed_prompt.backends.file_backend import FileBackend
 
-__all__ = ["FileBackend"]
+__all__ = ["CachingBackend", "FileBackend"]
 
 # S3Backend imported lazily to avoid hard boto3 dependency.
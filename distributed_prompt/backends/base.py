@@ -2,15 +2,65 @@
 
 from __future__ import annotations
 
+import asyncio
+import functools
+import hashlib
+import threading
+import warnings
 from abc import ABC, abstractmethod
+from collections.abc import Callable, Hashable, Iterable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TextIO, TypeVar
 
+from distributed_prompt.backends.prefetch import DEFAULT_READAHEAD_BYTES, Prefetcher
+from distributed_prompt.cache import Cache, ShardCache
+from distributed_prompt.lines import NEWLINE_FILE, LineIndex
+from distributed_prompt.ngram import TRIGRAM_FILE, TrigramIndex
 from distributed_prompt.shard import ShardIndex
+from distributed_prompt.tokens import TokenIndex
+
+T = TypeVar("T")
 
 
 class Backend(ABC):
-    """Abstract base class for shard storage backends."""
+    """Abstract base class for shard storage backends.
+
+    ``max_workers`` bounds how many shard reads a single ``fetch_range``
+    keeps in flight; with the default of 1 shards are read serially.
+    ``readahead`` is the number of shards to prefetch in the background
+    once ``fetch_range`` calls walk the shards in order (0 disables it),
+    holding at most ``readahead_bytes`` of prefetched data.  Whole shards
+    are kept in ``cache``.
+
+    The ``a``-prefixed coroutines (``aget_shard``, ``afetch_range``) run the
+    blocking reads on a separate pool of ``async_workers`` threads, so an
+    event loop can await many reads at once without stalling.
+    """
 
     index: ShardIndex
+    cache: Cache
+    max_workers: int = 1
+    readahead: int = 0
+    readahead_bytes: int = DEFAULT_READAHEAD_BYTES
+    async_workers: int = 32
+    _executor: ThreadPoolExecutor | None = None
+    _async_executor: ThreadPoolExecutor | None = None
+    _prefetcher: Prefetcher | None = None
+    _trigram_index: TrigramIndex | None = None
+    _line_index: LineIndex | None = None
+    _token_index: TokenIndex | None = None
+    _executor_lock = threading.Lock()
+
+    @staticmethod
+    def _default_cache(cache_bytes: int, cache_policy: str, cache_size: int | None) -> ShardCache:
+        """Build the cache a backend creates itself, honouring the deprecated ``cache_size``."""
+        if cache_size is not None:
+            warnings.warn(
+                "cache_size is deprecated; pass cache_bytes to bound the cache by memory",
+                DeprecationWarning,
+                stacklevel=3,
+            )
+        return ShardCache(cache_bytes, cache_policy, max_entries=cache_size)
 
     @abstractmethod
     def get_shard(self, shard_id: int) -> str:
@@ -22,11 +72,95 @@ class Backend(ABC):
         """Fetch a slice within a shard (offset relative to shard start)."""
         ...
 
+    def cache_key(self, shard_id: int) -> Hashable:
+        """Key of a shard in ``cache``: its content hash in a content-addressed
+        index (so caches shared across corpus versions share shards), else its id."""
+        if self.index.content_addressed:
+            return self.index.shards[shard_id].sha256
+        return shard_id
+
+    def _cached_slice(self, shard_id: int, offset: int, length: int) -> str | None:
+        """Serve a slice within a shard from ``cache``, or return ``None`` on a miss."""
+        # Cached values are the shard's UTF-8 text, i.e. the stored bytes of
+        # an uncompressed shard, so its byte spans apply to them too.
+        span = None if self.index.compression else self.index.byte_range(shard_id, offset, length)
+        return self.cache.get_slice(self.cache_key(shard_id), offset, length, span)
+
+    def get_shard_bytes(self, shard_id: int) -> bytes:
+        """Fetch a shard as stored, i.e. still compressed in a compressed index."""
+        if self.index.compression:
+            raise NotImplementedError(f"{type(self).__name__} cannot read compressed shards")
+        return self.get_shard(shard_id).encode("utf-8")
+
+    def read_aux(self, name: str) -> bytes:
+        """Read an auxiliary index file stored next to ``meta.json``.
+
+        Raises ``FileNotFoundError`` if the backend has no such file.
+        """
+        raise FileNotFoundError(name)
+
+    @property
+    def trigram_index(self) -> TrigramIndex | None:
+        """Per-shard trigram filters, or ``None`` if the corpus was ingested without them."""
+        if self._trigram_index is None and self.index.trigram_bits:
+            data = self.read_aux(TRIGRAM_FILE)
+            self._trigram_index = TrigramIndex(data, self.index.trigram_bits, self.index)
+        return self._trigram_index
+
+    @property
+    def line_index(self) -> LineIndex:
+        """Newline offsets, read from ``newlines.bin`` or built by one full scan."""
+        if self._line_index is None:
+            if self.index.line_index:
+                data = self.read_aux(NEWLINE_FILE)
+                self._line_index = LineIndex.from_bytes(data, self.index.total_length)
+            else:
+                self._line_index = LineIndex.scan(self)
+        return self._line_index
+
+    @property
+    def token_index(self) -> TokenIndex:
+        """Token→character mapping; requires a corpus ingested with ``token_encoding``."""
+        if self._token_index is None:
+            if not self.index.token_encoding:
+                raise ValueError("corpus was ingested without a token index (token_encoding)")
+            self._token_index = TokenIndex(self)
+        return self._token_index
+
+    def append(self, data: str | TextIO | Iterable[str]) -> None:
+        """Append text to the corpus and switch to the grown index."""
+        raise NotImplementedError(f"{type(self).__name__} does not support appending")
+
+    def _replace_index(self, index: ShardIndex) -> bool:
+        """Switch to *index*, dropping cached state it invalidates; return whether it changed."""
+        old = self.index
+        if index == old:
+            return False
+        if not old.content_addressed:
+            # Cache keys are shard ids; drop the shards whose content changed.
+            for sid in range(old.num_shards):
+                if sid >= index.num_shards or old.shards[sid] != index.shards[sid]:
+                    self.cache.discard(sid)
+        if self._prefetcher is not None:
+            self._prefetcher.close()
+            self._prefetcher = None
+        self.index = index
+        self._trigram_index = self._line_index = self._token_index = None
+        return True
+
+    def shard_version(self, shard_id: int) -> str | None:
+        """Return an opaque version tag (e.g. an ETag) for a shard's stored object.
+
+        Caching layers compare it with the tag recorded when they copied the
+        shard.  ``None`` means the backend cannot tell.
+        """
+        return None
+
     def fetch_range(self, start: int, stop: int) -> str:
         """Fetch characters in [start, stop) across shards.
 
         This is the core algorithm shared by all backends:
-        1. Compute which shards are needed (O(1) lookup).
+        1. Compute which shards are needed (``ShardIndex.lookup``).
         2. For each shard, compute the local offset and length.
         3. Fetch slices and concatenate.
         """
@@ -41,7 +175,9 @@ class Backend(ABC):
             return ""
 
         shard_ids = self.index.lookup(start, stop)
-        parts: list[str] = []
+        if self.prefetcher is not None:
+            self.prefetcher.observe(shard_ids)
+        requests: list[tuple[int, int, int]] = []
         for sid in shard_ids:
             meta = self.index.shards[sid]
             local_start = max(0, start - meta.start_offset)
@@ -49,5 +185,159 @@ class Backend(ABC):
             length = local_end - local_start
             if length <= 0:
                 continue
-            parts.append(self.get_shard_slice(sid, local_start, length))
-        return "".join(parts)
+            requests.append((sid, local_start, length))
+        if len(requests) > 1 and self.max_workers > 1:
+            # Fetch covered shards concurrently; map() yields in request order.
+            parts = self.executor.map(lambda r: self._fetch_slice(*r), requests)
+            return "".join(parts)
+        return "".join(self._fetch_slice(*r) for r in requests)
+
+    def fetch_many(self, ranges: Sequence[tuple[int, int]]) -> list[str]:
+        """Fetch several ``[start, stop)`` ranges, reading each shard at most once.
+
+        The requested pieces of each shard are merged into the single slice
+        spanning them, the shards are read concurrently (up to
+        ``max_workers``), and every range is cut from those slices.
+        Results are in request order; ranges are clamped like
+        ``fetch_range``.
+        """
+        total = self.index.total_length
+        spans: dict[int, list[int]] = {}  # shard -> [local_start, local_end]
+        clamped = []
+        for start, stop in ranges:
+            start, stop = min(max(start, 0), total), min(max(stop, 0), total)
+            clamped.append((start, stop))
+            for sid in self.index.lookup(start, stop):
+                meta = self.index.shards[sid]
+                lo = max(0, start - meta.start_offset)
+                hi = min(meta.byte_length, stop - meta.start_offset)
+                span = spans.setdefault(sid, [lo, hi])
+                span[0], span[1] = min(span[0], lo), max(span[1], hi)
+
+        requests = [(sid, lo, hi - lo) for sid, (lo, hi) in sorted(spans.items())]
+        if self.prefetcher is not None:
+            self.prefetcher.observe([sid for sid, _, _ in requests])
+        if len(requests) > 1 and self.max_workers > 1:
+            texts = list(self.executor.map(lambda r: self._fetch_slice(*r), requests))
+        else:
+            texts = [self._fetch_slice(*r) for r in requests]
+        pieces = {
+            sid: (self.index.shards[sid].start_offset + lo, text)
+            for (sid, lo, _), text in zip(requests, texts, strict=True)
+        }
+
+        out = []
+        for start, stop in clamped:
+            parts = []
+            for sid in self.index.lookup(start, stop):
+                base, text = pieces[sid]
+                parts.append(text[max(start - base, 0) : stop - base])
+            out.append("".join(parts))
+        return out
+
+    def iter_range(self, start: int, stop: int) -> Iterator[str]:
+        """Yield the text of [start, stop) as one piece per covered shard."""
+        for sid in self.index.lookup(start, stop):
+            meta = self.index.shards[sid]
+            yield self.fetch_range(max(start, meta.start_offset), min(stop, meta.end_offset))
+
+    def _fetch_slice(self, shard_id: int, offset: int, length: int) -> str:
+        if self._prefetcher is not None:
+            data = self._prefetcher.take(shard_id)
+            if data is not None:
+                return data[offset : offset + length]
+        return self.get_shard_slice(shard_id, offset, length)
+
+    def warm(self, shard_ids: Iterable[int] | None = None) -> None:
+        """Load *shard_ids* (default: every shard) into the cache ahead of use."""
+        if shard_ids is None:
+            shard_ids = range(self.index.num_shards)
+        pending = [sid for sid in shard_ids if self.cache_key(sid) not in self.cache]
+        for _ in self.executor.map(self.get_shard, pending):
+            pass
+
+    def verify_shard(self, shard_id: int) -> bool:
+        """Check the stored shard against its ``sha256``, bypassing the cache.
+
+        A shard that cannot be read or decoded counts as bad; a shard with no
+        recorded hash raises ``ValueError``.
+        """
+        expected = self.index.shards[shard_id].sha256
+        if not expected:
+            raise ValueError(f"shard {shard_id} has no recorded content hash")
+        try:
+            data = self.get_shard_bytes(shard_id)
+            if self.index.compression:
+                data = self.index.decode(shard_id, data).encode("utf-8")
+        except Exception:
+            return False
+        return hashlib.sha256(data).hexdigest() == expected
+
+    def verify(self, shard_ids: Iterable[int] | None = None) -> list[int]:
+        """Verify *shard_ids* (default: every shard) in parallel; return the bad ones."""
+        if shard_ids is None:
+            shard_ids = range(self.index.num_shards)
+        shard_ids = list(shard_ids)
+        results = self.executor.map(self.verify_shard, shard_ids)
+        return [sid for sid, ok in zip(shard_ids, results, strict=True) if not ok]
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Thread pool shared by this backend's concurrent reads (created lazily)."""
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=max(1, self.max_workers),
+                        thread_name_prefix=type(self).__name__,
+                    )
+        return self._executor
+
+    async def run_async(self, func: Callable[..., T], *args: Any) -> T:
+        """Run a blocking call on the async pool and await its result."""
+        if self._async_executor is None:
+            with self._executor_lock:
+                if self._async_executor is None:
+                    self._async_executor = ThreadPoolExecutor(
+                        max_workers=max(1, self.async_workers),
+                        thread_name_prefix=f"{type(self).__name__}-async",
+                    )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._async_executor, functools.partial(func, *args))
+
+    async def aget_shard(self, shard_id: int) -> str:
+        """Coroutine version of ``get_shard``."""
+        return await self.run_async(self.get_shard, shard_id)
+
+    async def afetch_range(self, start: int, stop: int) -> str:
+        """Coroutine version of ``fetch_range``."""
+        return await self.run_async(self.fetch_range, start, stop)
+
+    @property
+    def prefetcher(self) -> Prefetcher | None:
+        """Sequential readahead stage, or ``None`` when ``readahead`` is 0."""
+        if self._prefetcher is None and self.readahead > 0:
+            with self._executor_lock:
+                if self._prefetcher is None:
+                    self._prefetcher = Prefetcher(
+                        self.get_shard, self.index, self.readahead, self.readahead_bytes
+                    )
+        return self._prefetcher
+
+    def close(self) -> None:
+        """Release background threads held by this backend."""
+        if self._prefetcher is not None:
+            self._prefetcher.close()
+            self._prefetcher = None
+        if self._async_executor is not None:
+            self._async_executor.shutdown(wait=True)
+            self._async_executor = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,206 @@
+"""Read-through local disk cache that wraps another backend."""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+from distributed_prompt.backends.base import Backend
+from distributed_prompt.backends.file_backend import FileBackend
+from distributed_prompt.shard import OBJECTS_DIR, ShardIndex
+
+DEFAULT_DISK_BYTES = 8 * 1024 * 1024 * 1024
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+class CachingBackend(Backend):
+    """Backend that persists shards fetched from ``inner`` to a local directory.
+
+    The cache directory uses the ``FileBackend`` layout (shard files as
+    stored by ``inner``, compressed or not, plus ``meta.json``), with a
+    ``NNNN.version`` sidecar holding the tag returned
+    by ``inner.shard_version`` when the shard was copied.  The first time a
+    cached shard is used in a process it is validated: its size must match
+    the index and, if ``validate`` is set, its content must match the
+    index's ``sha256`` (or, for indexes without hashes, its recorded version
+    must match the inner backend's current one); otherwise it is refetched.
+    Hash validation is purely local, so a warm cache needs no requests.  Shards are
+    evicted least-recently-used first to keep the directory within
+    ``max_disk_bytes``.  If the inner index differs from the cached
+    ``meta.json`` the whole directory is discarded, except for a
+    content-addressed index: its shards live in ``cache_dir/objects`` under
+    their hashes, so switching corpus versions keeps every shared shard.
+
+    Local reads go through a ``FileBackend`` that shares the inner backend's
+    in-memory cache, so a shard is never held in memory twice.
+    """
+
+    def __init__(
+        self,
+        inner: Backend,
+        cache_dir: str | Path,
+        max_disk_bytes: int = DEFAULT_DISK_BYTES,
+        validate: bool = True,
+    ) -> None:
+        self.inner = inner
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_disk_bytes = max_disk_bytes
+        self.validate = validate
+        self.index = inner.index
+        self.cache = inner.cache
+        self.max_workers = inner.max_workers
+        self.readahead = inner.readahead
+        self._lock = threading.Lock()
+        # Sizes and validation are keyed by shard file name, which a
+        # content-addressed index shares between identical shards.
+        self._validated: set[str] = set()
+        content_addressed = self.index.content_addressed
+        self._objects_dir = self.cache_dir / OBJECTS_DIR if content_addressed else self.cache_dir
+
+        meta_path = self.cache_dir / "meta.json"
+        if meta_path.exists() and ShardIndex.load_dir(self.cache_dir) != self.index:
+            self.purge(keep_objects=content_addressed)
+        _atomic_write(meta_path, json.dumps(self.index.to_dict(), indent=2).encode("utf-8"))
+        _atomic_write(self.cache_dir / "meta.bin", self.index.to_bytes())
+        self._sizes: dict[str, int] = {}
+        if content_addressed:
+            # Objects left by other versions count against the budget too.
+            for path in self._objects_dir.rglob("*"):
+                if path.is_file() and path.suffix != ".tmp":
+                    self._sizes[path.relative_to(self._objects_dir).as_posix()] = (
+                        path.stat().st_size
+                    )
+        else:
+            for sid in range(self.index.num_shards):
+                path = self._shard_path(sid)
+                if path.exists():
+                    self._sizes[self.index.shard_filename(sid)] = path.stat().st_size
+        self._local = FileBackend(self.cache_dir, cache=self.cache, objects_dir=self._objects_dir)
+
+    def _shard_path(self, shard_id: int) -> Path:
+        return self._objects_dir / self.index.shard_filename(shard_id)
+
+    def _version_path(self, name: str) -> Path:
+        return (self._objects_dir / name).with_suffix(".version")
+
+    @property
+    def disk_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def _is_valid(self, shard_id: int) -> bool:
+        meta = self.index.shards[shard_id]
+        path = self._shard_path(shard_id)
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return False
+        if meta.stored_bytes is not None and size != meta.stored_bytes:
+            return False
+        if self.validate and meta.sha256:
+            return self._local.verify_shard(shard_id)
+        if self.validate:
+            version = self.inner.shard_version(shard_id)
+            if version is not None:
+                try:
+                    recorded = self._version_path(self.index.shard_filename(shard_id)).read_text()
+                except FileNotFoundError:
+                    return False
+                if recorded != version:
+                    return False
+        return True
+
+    def _ensure_local(self, shard_id: int) -> None:
+        """Make sure a validated copy of the shard exists in the cache directory."""
+        name = self.index.shard_filename(shard_id)
+        path = self._objects_dir / name
+        if name in self._validated and name in self._sizes:
+            os.utime(path)
+            return
+        if name in self._sizes and self._is_valid(shard_id):
+            self._validated.add(name)
+            os.utime(path)
+            return
+        self.cache.discard(self.cache_key(shard_id))
+        meta = self.index.shards[shard_id]
+        version = None if meta.sha256 else self.inner.shard_version(shard_id)
+        data = self.inner.get_shard_bytes(shard_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write(path, data)
+        if version is not None:
+            _atomic_write(self._version_path(name), version.encode("utf-8"))
+        with self._lock:
+            self._sizes[name] = len(data)
+            self._validated.add(name)
+            self._evict(keep=name)
+
+    def _evict(self, keep: str) -> None:
+        total = sum(self._sizes.values())
+        if total <= self.max_disk_bytes:
+            return
+        by_age = sorted(
+            ((self._objects_dir / name).stat().st_mtime_ns, name)
+            for name in self._sizes
+            if name != keep
+        )
+        for _, name in by_age:
+            if total <= self.max_disk_bytes:
+                break
+            total -= self._sizes.pop(name)
+            self._validated.discard(name)
+            (self._objects_dir / name).unlink(missing_ok=True)
+            self._version_path(name).unlink(missing_ok=True)
+
+    def purge(self, keep_objects: bool = False) -> None:
+        """Delete every cached shard file.
+
+        ``keep_objects`` spares the content-addressed ``objects`` directory.
+        """
+        for path in self.cache_dir.iterdir():
+            if path.name not in ("meta.json", "meta.bin") and path.is_file():
+                path.unlink(missing_ok=True)
+        if not keep_objects:
+            shutil.rmtree(self.cache_dir / OBJECTS_DIR, ignore_errors=True)
+        self._sizes = {}
+        self._validated = set()
+
+    def read_aux(self, name: str) -> bytes:
+        return self.inner.read_aux(name)
+
+    def shard_version(self, shard_id: int) -> str | None:
+        return self.inner.shard_version(shard_id)
+
+    def get_shard_bytes(self, shard_id: int) -> bytes:
+        self._ensure_local(shard_id)
+        return self._local.get_shard_bytes(shard_id)
+
+    def get_shard(self, shard_id: int) -> str:
+        if self.cache_key(shard_id) not in self.cache:
+            self._ensure_local(shard_id)
+        return self._local.get_shard(shard_id)
+
+    def get_shard_slice(self, shard_id: int, offset: int, length: int) -> str:
+        if length <= 0:
+            return ""
+        if self.cache_key(shard_id) not in self.cache:
+            self._ensure_local(shard_id)
+        return self._local.get_shard_slice(shard_id, offset, length)
+
+    def close(self) -> None:
+        super().close()
+        self._local.close()
+        self.inner.close()
@@ -2,35 +2,112 @@
 
 from __future__ import annotations
 
-from functools import lru_cache
+import mmap
+from collections.abc import Iterable
 from pathlib import Path
+from typing import Any, TextIO
 
 from distributed_prompt.backends.base import Backend
-from distributed_prompt.shard import ShardIndex
+from distributed_prompt.cache import DEFAULT_CACHE_BYTES, Cache
+from distributed_prompt.ingest import append
+from distributed_prompt.shard import OBJECTS_DIR, ShardIndex
 
 
 class FileBackend(Backend):
     """Backend that reads shards from local files.
 
     Shards are stored as ``shards_dir/NNNN.txt`` with an accompanying
-    ``meta.json`` index file.
+    ``meta.bin`` (memory-mapped) or ``meta.json`` index file.  Whole-shard
+    reads go through a byte-bounded ``ShardCache`` (pass ``cache`` to
+    supply or share one, e.g. a ``SharedShardCache`` for multi-process
+    workers); partial slices are served from a memory map using the
+    index's char→byte checkpoints, so only the bytes near the slice are
+    decoded.
+
+    A content-addressed index keeps its shards in ``objects_dir``, by
+    default the ``objects`` directory next to ``shards_dir``.
+
+    ``cache_size`` (a shard count) is deprecated in favour of
+    ``cache_bytes``; when given it also caps the cache's entry count.
     """
 
-    def __init__(self, shards_dir: str | Path, cache_size: int = 32) -> None:
+    def __init__(
+        self,
+        shards_dir: str | Path,
+        cache_bytes: int = DEFAULT_CACHE_BYTES,
+        cache_policy: str = "lru",
+        max_workers: int = 1,
+        readahead: int = 0,
+        cache: Cache | None = None,
+        objects_dir: str | Path | None = None,
+        cache_size: int | None = None,
+    ) -> None:
         self.shards_dir = Path(shards_dir)
-        self.index = ShardIndex.load(self.shards_dir / "meta.json")
-        # Build a cached reader with the specified LRU size.
-        self._read_shard = lru_cache(maxsize=cache_size)(self._read_shard_uncached)
+        self.max_workers = max_workers
+        self.readahead = readahead
+        self.index = ShardIndex.load_dir(self.shards_dir)
+        if objects_dir is not None:
+            self.objects_dir = Path(objects_dir)
+        elif self.index.content_addressed:
+            self.objects_dir = self.shards_dir.parent / OBJECTS_DIR
+        else:
+            self.objects_dir = self.shards_dir
+        if cache is None:
+            cache = self._default_cache(cache_bytes, cache_policy, cache_size)
+        self.cache = cache
+
+    def refresh(self) -> bool:
+        """Reload the index from disk (e.g. after ``append``); return whether it changed."""
+        return self._replace_index(ShardIndex.load_dir(self.shards_dir))
+
+    def append(self, data: str | TextIO | Iterable[str], **kwargs: Any) -> None:
+        """Append to the corpus with ``ingest.append`` and switch to the new index."""
+        objects_dir = self.objects_dir if self.index.content_addressed else None
+        self._replace_index(append(self.shards_dir, data, objects_dir=objects_dir, **kwargs))
 
     def _shard_path(self, shard_id: int) -> Path:
-        return self.shards_dir / f"{shard_id:04d}.txt"
+        return self.objects_dir / self.index.shard_filename(shard_id)
 
     def _read_shard_uncached(self, shard_id: int) -> str:
-        return self._shard_path(shard_id).read_text(encoding="utf-8")
+        return self.index.decode(shard_id, self.get_shard_bytes(shard_id))
+
+    def get_shard_bytes(self, shard_id: int) -> bytes:
+        return self._shard_path(shard_id).read_bytes()
+
+    def _read_span(self, shard_id: int, byte_start: int, byte_end: int) -> bytes:
+        with (
+            open(self._shard_path(shard_id), "rb") as f,
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm,
+        ):
+            return mm[byte_start:byte_end]
+
+    def read_aux(self, name: str) -> bytes:
+        return (self.shards_dir / self.index.aux_files.get(name, name)).read_bytes()
+
+    def shard_version(self, shard_id: int) -> str | None:
+        st = self._shard_path(shard_id).stat()
+        return f"{st.st_mtime_ns}-{st.st_size}"
 
     def get_shard(self, shard_id: int) -> str:
-        return self._read_shard(shard_id)
+        return self.cache.get_or_load(
+            self.cache_key(shard_id), lambda _: self._read_shard_uncached(shard_id)
+        )
 
     def get_shard_slice(self, shard_id: int, offset: int, length: int) -> str:
-        data = self._read_shard(shard_id)
-        return data[offset : offset + length]
+        if length <= 0:
+            return ""
+        meta = self.index.shards[shard_id]
+        cached = self._cached_slice(shard_id, offset, length)
+        if cached is not None:
+            return cached
+        span = None
+        if offset > 0 or length < meta.byte_length:
+            span = self.index.byte_range(shard_id, offset, length)
+        if span is None:
+            data = self._read_shard_uncached(shard_id)
+            self.cache.put(self.cache_key(shard_id), data)
+            return data[offset : offset + length]
+        byte_start, byte_end, skip = span
+        data = self._read_span(shard_id, byte_start, byte_end)
+        text = self.index.decode(shard_id, data, byte_start)
+        return text[skip : skip + length]
@@ -0,0 +1,112 @@
+"""Sequential-access readahead for shard scans."""
+
+from __future__ import annotations
+
+import sys
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from distributed_prompt.shard import ShardIndex
+
+DEFAULT_READAHEAD_BYTES = 256 * 1024 * 1024
+_STR_HEADER = sys.getsizeof("")
+
+
+class Prefetcher:
+    """Detects sequential shard access and reads the next shards in the background.
+
+    ``observe`` is told which shards each request covers.  Once a request
+    advances past the shard the previous one ended on (starting right after
+    it, or starting on it and running into the next), the next ``depth``
+    shards are loaded on background threads so their I/O overlaps with the
+    caller's work on the current shard.  Further reads within the current
+    shard leave readahead as it is; any other access pattern cancels it.
+    Prefetched shards are held until ``take`` claims them, as decoded
+    ``str``s; an upper bound on their size never exceeds ``max_bytes``.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[int], str],
+        index: ShardIndex,
+        depth: int = 2,
+        max_bytes: int = DEFAULT_READAHEAD_BYTES,
+    ) -> None:
+        self._loader = loader
+        self._index = index
+        self.depth = depth
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self._futures: dict[int, Future[str]] = {}
+        self._pending_bytes = 0
+        self._last: int | None = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=depth, thread_name_prefix="Prefetcher")
+
+    def _estimate(self, shard_id: int) -> int:
+        """Upper bound on the memory a decoded shard holds, whatever its compression.
+
+        A ``str`` takes one byte per character when it is ASCII (as many
+        UTF-8 bytes as characters) and at most four otherwise.
+        """
+        meta = self._index.shards[shard_id]
+        width = 1 if meta.num_bytes == meta.byte_length else 4
+        return _STR_HEADER + width * meta.byte_length
+
+    def _drop(self, shard_id: int) -> None:
+        fut = self._futures.pop(shard_id)
+        fut.cancel()
+        self._pending_bytes -= self._estimate(shard_id)
+
+    def observe(self, shard_ids: list[int]) -> None:
+        """Record an access to *shard_ids* and schedule readahead if it is sequential."""
+        if not shard_ids:
+            return
+        first, last = shard_ids[0], shard_ids[-1]
+        with self._lock:
+            if first == last == self._last:
+                return
+            sequential = self._last is not None and (
+                first == self._last + 1 or first == self._last < last
+            )
+            self._last = last
+            for sid in list(self._futures):
+                if not sequential or sid < first:
+                    self._drop(sid)
+            if not sequential:
+                return
+            for sid in range(last + 1, min(last + 1 + self.depth, self._index.num_shards)):
+                if sid in self._futures:
+                    continue
+                size = self._estimate(sid)
+                if self._pending_bytes + size > self.max_bytes:
+                    break
+                self._futures[sid] = self._executor.submit(self._loader, sid)
+                self._pending_bytes += size
+
+    def take(self, shard_id: int) -> str | None:
+        """Claim a prefetched shard, waiting for it if still in flight.
+
+        Returns ``None`` if the shard was not prefetched or its read failed;
+        the caller then reads it the normal way.
+        """
+        with self._lock:
+            fut = self._futures.pop(shard_id, None)
+            if fut is None:
+                return None
+            self._pending_bytes -= self._estimate(shard_id)
+        try:
+            data = fut.result()
+        except Exception:
+            return None
+        self.hits += 1
+        return data
+
+    def close(self) -> None:
+        """Cancel outstanding readahead and stop the worker threads."""
+        with self._lock:
+            for sid in list(self._futures):
+                self._drop(sid)
+            self._last = None
+        self._executor.shutdown(wait=True)
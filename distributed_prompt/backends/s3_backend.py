@@ -2,23 +2,75 @@
 
 from __future__ import annotations
 
+import hashlib
+import itertools
 import json
-from functools import lru_cache
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from pathlib import Path
 from typing import Any
 
 from distributed_prompt.backends.base import Backend
-from distributed_prompt.shard import ShardIndex
+from distributed_prompt.cache import DEFAULT_CACHE_BYTES, Cache
+from distributed_prompt.lines import NEWLINE_FILE
+from distributed_prompt.ngram import TRIGRAM_FILE
+from distributed_prompt.shard import OBJECTS_DIR, ShardIndex, ShardMeta, aux_filename, shard_name
 
 try:
     import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config
 except ImportError:
     boto3 = None  # type: ignore[assignment]
+    TransferConfig = None  # type: ignore[assignment,misc]
+
+DEFAULT_MULTIPART_THRESHOLD = 64 * 1024 * 1024
+_MULTIPART_CONCURRENCY = 4  # parts in flight per multipart upload
+# Published last, in this order: readers load meta.bin when it exists.
+_INDEX_FILES = ("meta.json", "meta.bin")
+
+
+def _is_missing(exc: Exception) -> bool:
+    """True if *exc* is a botocore error for a nonexistent key."""
+    code = getattr(exc, "response", {}).get("Error", {}).get("Code")
+    return code in ("NoSuchKey", "404")
+
+
+def _join(prefix: str, name: str) -> str:
+    return f"{prefix}/{name}" if prefix else name
+
+
+def _objects_prefix(prefix: str) -> str:
+    """Default prefix of the content-addressed objects shared by versions next to *prefix*."""
+    parent = prefix.rpartition("/")[0]
+    return f"{parent}/{OBJECTS_DIR}" if parent else OBJECTS_DIR
 
 
 class S3Backend(Backend):
     """Backend that reads shards from an S3-compatible object store.
 
     Works with AWS S3 and MinIO (via ``endpoint_url``).
+
+    Slices smaller than ``range_threshold`` of their shard are fetched with
+    an HTTP Range request covering only the checkpoint-bounded byte span;
+    larger slices (or shards without checkpoints) fetch the whole object into
+    the byte-bounded ``ShardCache``.  Slices spanning several shards fetch up to ``max_workers``
+    objects concurrently, and sequential scans read the next ``readahead``
+    shards in the background.  Pass ``client`` to use a preconfigured (or stub)
+    S3 client.
+
+    The client's HTTP connection pool holds ``max_pool_connections``
+    connections, and the async API (``aget_shard``, ``afetch_range``) runs
+    on as many threads, so that many requests from concurrent coroutines
+    are in flight at once.
+
+    A content-addressed index keeps its shards under ``objects_prefix``, by
+    default ``objects`` next to ``prefix`` (so ``corpus/v1`` and
+    ``corpus/v2`` share ``corpus/objects``).
+
+    ``cache_size`` (a shard count) is deprecated in favour of
+    ``cache_bytes``; when given it also caps the cache's entry count.
     """
 
     def __init__(
@@ -26,16 +78,42 @@ class S3Backend(Backend):
         bucket: str,
         prefix: str = "",
         endpoint_url: str | None = None,
-        cache_size: int = 32,
+        cache_bytes: int = DEFAULT_CACHE_BYTES,
+        cache_policy: str = "lru",
+        range_threshold: float = 0.25,
+        max_workers: int = 8,
+        readahead: int = 2,
+        cache: Cache | None = None,
+        client: Any = None,
+        max_pool_connections: int = 64,
+        objects_prefix: str | None = None,
+        cache_size: int | None = None,
         **boto_kwargs: Any,
     ) -> None:
-        if boto3 is None:
-            raise ImportError("boto3 is required for S3Backend: pip install boto3")
+        if client is None:
+            if boto3 is None:
+                raise ImportError("boto3 is required for S3Backend: pip install boto3")
+            config = Config(max_pool_connections=max_pool_connections)
+            if "config" in boto_kwargs:
+                config = boto_kwargs.pop("config").merge(config)
+            client = boto3.client("s3", endpoint_url=endpoint_url, config=config, **boto_kwargs)
         self.bucket = bucket
         self.prefix = prefix.strip("/")
-        self._client = boto3.client("s3", endpoint_url=endpoint_url, **boto_kwargs)
+        self.range_threshold = range_threshold
+        self.max_workers = max_workers
+        self.readahead = readahead
+        self.async_workers = max_pool_connections
+        self._client = client
         self.index = self._load_index()
-        self._read_shard = lru_cache(maxsize=cache_size)(self._read_shard_uncached)
+        if objects_prefix is not None:
+            self.objects_prefix = objects_prefix.strip("/")
+        elif self.index.content_addressed:
+            self.objects_prefix = _objects_prefix(self.prefix)
+        else:
+            self.objects_prefix = self.prefix
+        if cache is None:
+            cache = self._default_cache(cache_bytes, cache_policy, cache_size)
+        self.cache = cache
 
     def _key(self, name: str) -> str:
         if self.prefix:
@@ -43,49 +121,220 @@ class S3Backend(Backend):
         return name
 
     def _load_index(self) -> ShardIndex:
+        try:
+            resp = self._client.get_object(Bucket=self.bucket, Key=self._key("meta.bin"))
+        except Exception as exc:
+            if not _is_missing(exc):
+                raise
+        else:
+            return ShardIndex.from_bytes(resp["Body"].read())
         resp = self._client.get_object(Bucket=self.bucket, Key=self._key("meta.json"))
-        data = json.loads(resp["Body"].read().decode("utf-8"))
-        from distributed_prompt.shard import ShardMeta
-
-        shards = [ShardMeta(**s) for s in data["shards"]]
-        return ShardIndex(
-            total_length=data["total_length"],
-            shard_size=data["shard_size"],
-            num_shards=data["num_shards"],
-            source_file=data["source_file"],
-            shards=shards,
-        )
+        return ShardIndex.from_dict(json.loads(resp["Body"].read().decode("utf-8")))
+
+    def refresh(self) -> bool:
+        """Reload the published index; return whether it changed."""
+        return self._replace_index(self._load_index())
+
+    def _shard_key(self, shard_id: int) -> str:
+        return _join(self.objects_prefix, self.index.shard_filename(shard_id))
 
     def _read_shard_uncached(self, shard_id: int) -> str:
-        key = self._key(f"{shard_id:04d}.txt")
+        return self.index.decode(shard_id, self.get_shard_bytes(shard_id))
+
+    def get_shard_bytes(self, shard_id: int) -> bytes:
+        resp = self._client.get_object(Bucket=self.bucket, Key=self._shard_key(shard_id))
+        return resp["Body"].read()
+
+    def _read_span(self, shard_id: int, byte_start: int, byte_end: int) -> bytes:
+        resp = self._client.get_object(
+            Bucket=self.bucket,
+            Key=self._shard_key(shard_id),
+            Range=f"bytes={byte_start}-{byte_end - 1}",
+        )
+        return resp["Body"].read()
+
+    def read_aux(self, name: str) -> bytes:
+        key = self._key(self.index.aux_files.get(name, name))
         resp = self._client.get_object(Bucket=self.bucket, Key=key)
-        return resp["Body"].read().decode("utf-8")
+        return resp["Body"].read()
+
+    def shard_version(self, shard_id: int) -> str | None:
+        resp = self._client.head_object(Bucket=self.bucket, Key=self._shard_key(shard_id))
+        return resp.get("ETag")
 
     def get_shard(self, shard_id: int) -> str:
-        return self._read_shard(shard_id)
+        return self.cache.get_or_load(
+            self.cache_key(shard_id), lambda _: self._read_shard_uncached(shard_id)
+        )
 
     def get_shard_slice(self, shard_id: int, offset: int, length: int) -> str:
-        data = self._read_shard(shard_id)
-        return data[offset : offset + length]
+        if length <= 0:
+            return ""
+        meta = self.index.shards[shard_id]
+        cached = self._cached_slice(shard_id, offset, length)
+        if cached is not None:
+            return cached
+        span = None
+        if length < meta.byte_length * self.range_threshold:
+            span = self.index.byte_range(shard_id, offset, length)
+        if span is None:
+            data = self._read_shard_uncached(shard_id)
+            self.cache.put(self.cache_key(shard_id), data)
+            return data[offset : offset + length]
+        byte_start, byte_end, skip = span
+        data = self._read_span(shard_id, byte_start, byte_end)
+        text = self.index.decode(shard_id, data, byte_start)
+        return text[skip : skip + length]
+
+
+def _file_digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(1 << 20):
+            h.update(block)
+    return h.hexdigest()
 
 
 def ingest_to_s3(
-    shards_dir: str,
+    shards_dir: str | Path,
     bucket: str,
     prefix: str = "",
     endpoint_url: str | None = None,
+    workers: int = 8,
+    multipart_threshold: int = DEFAULT_MULTIPART_THRESHOLD,
+    force: bool = False,
+    client: Any = None,
+    objects_dir: str | Path | None = None,
+    objects_prefix: str | None = None,
     **boto_kwargs: Any,
-) -> None:
-    """Upload a local shard directory to an S3 bucket."""
-    if boto3 is None:
-        raise ImportError("boto3 is required: pip install boto3")
-    from pathlib import Path
+) -> list[str]:
+    """Upload a local shard directory to an S3 bucket; return the keys uploaded.
+
+    Files are uploaded ``workers`` at a time, and files larger than
+    ``multipart_threshold`` bytes as concurrent multipart uploads.  Each
+    object carries its sha256 in the ``sha256`` user metadata; a file whose
+    remote object already has the same hash is skipped (unless ``force``),
+    so re-publishing a corpus only uploads what changed.  The index files
+    go up only after every shard has: ``meta.json``, then ``meta.bin``
+    (which readers load first), so readers never see an index referring to
+    shards that are not there yet.  Published shards are never overwritten:
+    in a plain layout a shard whose key holds different content is uploaded
+    under its next revision's name (see ``shard_name``) and the uploaded
+    index records that revision, so readers of the previous index keep
+    reading the shards it describes.  Auxiliary files (``trigrams.bin``,
+    ``newlines.bin``) are read lazily, long after the index, so they are
+    published under content-derived names recorded in the uploaded index's
+    ``aux_files``; readers of the previous index keep reading theirs.  Only
+    the shards and auxiliary files the local index uses are uploaded.
 
-    client = boto3.client("s3", endpoint_url=endpoint_url, **boto_kwargs)
+    For a content-addressed index the shards are read from ``objects_dir``
+    and uploaded under ``objects_prefix`` (defaults as in ``FileBackend``
+    and ``S3Backend``), so shards already published by another version
+    are skipped.
+    """
     shards_path = Path(shards_dir)
+    if client is None:
+        if boto3 is None:
+            raise ImportError("boto3 is required: pip install boto3")
+        config = Config(max_pool_connections=workers * _MULTIPART_CONCURRENCY)
+        client = boto3.client("s3", endpoint_url=endpoint_url, config=config, **boto_kwargs)
+    transfer = {}
+    if TransferConfig is not None:
+        transfer["Config"] = TransferConfig(
+            multipart_threshold=multipart_threshold, max_concurrency=_MULTIPART_CONCURRENCY
+        )
     prefix = prefix.strip("/")
+    index = ShardIndex.load_dir(shards_path)
+
+    # (local path, key, sha256 if already known from the index)
+    files: list[tuple[Path, str, str | None]] = []
+    shard_dir, shard_prefix = shards_path, prefix
+    if index.content_addressed:
+        shard_dir = Path(objects_dir) if objects_dir else shards_path.parent / OBJECTS_DIR
+        if objects_prefix is not None:
+            shard_prefix = objects_prefix.strip("/")
+        else:
+            shard_prefix = _objects_prefix(prefix)
+    shard_names: dict[str, str | None] = {}
+    for sid in range(index.num_shards):
+        known = None if index.compression else index.shards[sid].sha256 or None
+        shard_names[index.shard_filename(sid)] = known
+    if index.content_addressed:
+        for name, known in shard_names.items():
+            files.append((shard_dir / name, _join(shard_prefix, name), known))
+    # Only the auxiliary files the index uses: superseded revisions, lock
+    # files and anything else in the directory stay local.
+    aux_files: dict[str, str] = {}
+    for name, used in ((TRIGRAM_FILE, index.trigram_bits), (NEWLINE_FILE, index.line_index)):
+        path = shards_path / index.aux_files.get(name, name)
+        if used and path.exists():
+            digest = _file_digest(path)
+            aux_files[name] = aux_filename(name, digest)
+            files.append((path, _join(prefix, aux_files[name]), digest))
+
+    def remote_digest(key: str) -> str | None:
+        """The sha256 recorded on the object at *key*: ``None`` if missing, ``""`` if unknown."""
+        try:
+            head = client.head_object(Bucket=bucket, Key=key)
+        except Exception as exc:
+            if not _is_missing(exc):
+                raise
+            return None
+        return head.get("Metadata", {}).get("sha256", "")
+
+    def put(path: Path, key: str, digest: str) -> str:
+        client.upload_file(
+            str(path), bucket, key, ExtraArgs={"Metadata": {"sha256": digest}}, **transfer
+        )
+        return key
+
+    def upload(path: Path, key: str, digest: str | None, skip_unchanged: bool) -> str | None:
+        digest = digest or _file_digest(path)
+        if skip_unchanged and remote_digest(key) == digest:
+            return None
+        return put(path, key, digest)
+
+    def upload_shard(shard_id: int) -> tuple[str | None, ShardMeta]:
+        """Upload a plain-layout shard without overwriting a published one.
+
+        The shard goes to the first key from its own revision on that is
+        free or already holds it: a key holding other (or unrecorded)
+        content belongs to a published index, so the revision is bumped.
+        Returns the key uploaded (``None`` if skipped) and the shard's
+        metadata for the uploaded index.
+        """
+        meta = index.shards[shard_id]
+        path = shard_dir / index.shard_filename(shard_id)
+        digest = shard_names[index.shard_filename(shard_id)] or _file_digest(path)
+        for revision in itertools.count(meta.revision):
+            key = _join(prefix, shard_name(shard_id, index.compression, revision))
+            remote = remote_digest(key)
+            if remote is None or remote == digest:
+                break
+        meta = replace(meta, revision=revision)
+        if remote == digest and not force:
+            return None, meta
+        return put(path, key, digest), meta
 
-    for f in sorted(shards_path.iterdir()):
-        if f.is_file():
-            key = f"{prefix}/{f.name}" if prefix else f.name
-            client.upload_file(str(f), bucket, key)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = pool.map(lambda f: upload(*f, not force), files)
+        shards: list[ShardMeta] | None = None
+        if not index.content_addressed:
+            shard_results = list(pool.map(upload_shard, range(index.num_shards)))
+            shards = [meta for _, meta in shard_results]
+            results = itertools.chain((key for key, _ in shard_results), results)
+        uploaded = [key for key in results if key]
+    published = replace(index, aux_files=aux_files)
+    if shards is not None:
+        published = replace(published, shards=shards)
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in _INDEX_FILES:
+            if not (shards_path / name).exists():
+                continue
+            path = Path(tmp) / name
+            if name == "meta.bin":
+                published.save_binary(path)
+            else:
+                published.save(path)
+            uploaded.append(upload(path, _join(prefix, name), None, False))
+    return uploaded
@@ -0,0 +1,554 @@
+"""Byte-budgeted shard caches: in-process with pluggable eviction, or shared across processes."""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import mmap
+import os
+import sys
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import quote
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # type: ignore[assignment]
+
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+DEFAULT_LOCAL_BYTES = 64 * 1024 * 1024  # decoded entries a SharedShardCache keeps in-process
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    """Snapshot of cache counters."""
+
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    nbytes: int
+    max_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class EvictionPolicy(ABC):
+    """Tracks resident keys and chooses which one to evict next."""
+
+    @abstractmethod
+    def insert(self, key: Hashable) -> None:
+        """Start tracking a newly stored *key*."""
+
+    @abstractmethod
+    def touch(self, key: Hashable) -> None:
+        """Record a hit on *key*."""
+
+    @abstractmethod
+    def remove(self, key: Hashable) -> None:
+        """Stop tracking *key*, which left the cache."""
+
+    @abstractmethod
+    def victim(self) -> Hashable:
+        """Return the key to evict next (the cache then calls ``remove``)."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Forget every key."""
+
+
+class LRUPolicy(EvictionPolicy):
+    """Evict the least recently used key."""
+
+    def __init__(self) -> None:
+        self._order: OrderedDict[Hashable, None] = OrderedDict()
+
+    def insert(self, key: Hashable) -> None:
+        self._order[key] = None
+
+    def touch(self, key: Hashable) -> None:
+        self._order.move_to_end(key)
+
+    def remove(self, key: Hashable) -> None:
+        del self._order[key]
+
+    def victim(self) -> Hashable:
+        return next(iter(self._order))
+
+    def clear(self) -> None:
+        self._order.clear()
+
+
+class LFUPolicy(EvictionPolicy):
+    """Evict the least frequently used key, oldest first among ties."""
+
+    def __init__(self) -> None:
+        self._counts: dict[Hashable, int] = {}
+        self._heap: list[tuple[int, int, Hashable]] = []
+        self._seq = itertools.count()
+
+    def _push(self, key: Hashable) -> None:
+        heapq.heappush(self._heap, (self._counts[key], next(self._seq), key))
+
+    def insert(self, key: Hashable) -> None:
+        self._counts[key] = 1
+        self._push(key)
+
+    def touch(self, key: Hashable) -> None:
+        self._counts[key] += 1
+        self._push(key)
+        if len(self._heap) > 4 * len(self._counts) + 64:
+            self._heap = [(c, next(self._seq), k) for k, c in self._counts.items()]
+            heapq.heapify(self._heap)
+
+    def remove(self, key: Hashable) -> None:
+        del self._counts[key]
+
+    def victim(self) -> Hashable:
+        # Heap entries are invalidated lazily: skip removed keys and stale counts.
+        while True:
+            count, _, key = self._heap[0]
+            if self._counts.get(key) == count:
+                return key
+            heapq.heappop(self._heap)
+
+    def clear(self) -> None:
+        self._counts.clear()
+        self._heap.clear()
+
+
+class ARCPolicy(EvictionPolicy):
+    """Adaptive Replacement Cache (Megiddo & Modha, 2003).
+
+    Balances a recency list (``t1``) against a frequency list (``t2``)
+    using ghost lists of recently evicted keys to steer the target size of
+    ``t1``.  Capacity is measured in resident entries, which adapts
+    naturally to the byte budget enforced by the cache.
+    """
+
+    def __init__(self) -> None:
+        self._t1: OrderedDict[Hashable, None] = OrderedDict()
+        self._t2: OrderedDict[Hashable, None] = OrderedDict()
+        self._b1: OrderedDict[Hashable, None] = OrderedDict()
+        self._b2: OrderedDict[Hashable, None] = OrderedDict()
+        self._p = 0.0
+
+    def _capacity(self) -> int:
+        return max(1, len(self._t1) + len(self._t2))
+
+    def insert(self, key: Hashable) -> None:
+        if key in self._b1:
+            self._p = min(self._p + max(len(self._b2) / len(self._b1), 1), self._capacity())
+            del self._b1[key]
+            self._t2[key] = None
+        elif key in self._b2:
+            self._p = max(self._p - max(len(self._b1) / len(self._b2), 1), 0)
+            del self._b2[key]
+            self._t2[key] = None
+        else:
+            self._t1[key] = None
+        capacity = self._capacity()
+        for ghosts in (self._b1, self._b2):
+            while len(ghosts) > capacity:
+                ghosts.popitem(last=False)
+
+    def touch(self, key: Hashable) -> None:
+        if key in self._t1:
+            del self._t1[key]
+        self._t2[key] = None
+        self._t2.move_to_end(key)
+
+    def remove(self, key: Hashable) -> None:
+        if key in self._t1:
+            del self._t1[key]
+            self._b1[key] = None
+        else:
+            del self._t2[key]
+            self._b2[key] = None
+
+    def victim(self) -> Hashable:
+        if self._t1 and (len(self._t1) > self._p or not self._t2):
+            return next(iter(self._t1))
+        return next(iter(self._t2))
+
+    def clear(self) -> None:
+        for lst in (self._t1, self._t2, self._b1, self._b2):
+            lst.clear()
+        self._p = 0.0
+
+
+POLICIES: dict[str, type[EvictionPolicy]] = {
+    "lru": LRUPolicy,
+    "lfu": LFUPolicy,
+    "arc": ARCPolicy,
+}
+
+
+class Cache(ABC):
+    """Interface shared by shard caches; backends accept any implementation."""
+
+    max_bytes: int
+
+    @abstractmethod
+    def __len__(self) -> int: ...
+
+    @abstractmethod
+    def __contains__(self, key: Hashable) -> bool: ...
+
+    @property
+    @abstractmethod
+    def nbytes(self) -> int: ...
+
+    @property
+    @abstractmethod
+    def stats(self) -> CacheStats: ...
+
+    @abstractmethod
+    def peek(self, key: Hashable) -> str | None:
+        """Return a cached value without touching counters or eviction order."""
+
+    @abstractmethod
+    def get(self, key: Hashable) -> str | None:
+        """Return a cached value (counting a hit) or ``None`` (counting a miss)."""
+
+    @abstractmethod
+    def put(self, key: Hashable, value: str) -> None:
+        """Store *value*, evicting other entries to stay within ``max_bytes``."""
+
+    @abstractmethod
+    def discard(self, key: Hashable) -> None:
+        """Remove *key* if present."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop all entries; counters are kept."""
+
+    def get_slice(
+        self,
+        key: Hashable,
+        offset: int,
+        length: int,
+        span: tuple[int, int, int] | None = None,
+    ) -> str | None:
+        """Return characters ``[offset, offset + length)`` of a cached value, or ``None``.
+
+        *span* is the value's UTF-8 byte range covering the slice, as
+        returned by ``ShardIndex.byte_range``, when known; caches that store
+        encoded bytes use it to avoid decoding the whole value.
+        """
+        value = self.get(key)
+        return None if value is None else value[offset : offset + length]
+
+    def get_or_load(self, key: Hashable, loader: Callable[[Hashable], str]) -> str:
+        """Return the cached value for *key*, loading and caching it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = loader(key)
+            self.put(key, value)
+        return value
+
+    def warm(self, keys: Iterable[Hashable], loader: Callable[[Hashable], str]) -> None:
+        """Load every key in *keys* that is not already cached."""
+        for key in keys:
+            if key not in self:
+                self.put(key, loader(key))
+
+
+class ShardCache(Cache):
+    """Thread-safe shard cache bounded by total memory rather than entry count.
+
+    Entry sizes are measured with ``sys.getsizeof``, i.e. the real size of
+    the cached ``str`` objects.  Values larger than the whole budget are
+    returned to the caller but never stored.  ``policy`` is one of
+    ``"lru"``, ``"lfu"`` or ``"arc"``, or an ``EvictionPolicy`` instance.
+    ``max_entries`` additionally bounds the number of entries, as the
+    backends' deprecated ``cache_size`` did.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_CACHE_BYTES,
+        policy: str | EvictionPolicy = "lru",
+        max_entries: int | None = None,
+    ) -> None:
+        if isinstance(policy, str):
+            try:
+                policy = POLICIES[policy]()
+            except KeyError:
+                raise ValueError(
+                    f"unknown cache policy {policy!r}; expected one of {sorted(POLICIES)}"
+                ) from None
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._policy = policy
+        self._data: dict[Hashable, str] = {}
+        self._sizes: dict[Hashable, int] = {}
+        self._nbytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._data),
+                nbytes=self._nbytes,
+                max_bytes=self.max_bytes,
+            )
+
+    def peek(self, key: Hashable) -> str | None:
+        return self._data.get(key)
+
+    def get(self, key: Hashable) -> str | None:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._policy.touch(key)
+            return value
+
+    def put(self, key: Hashable, value: str) -> None:
+        size = sys.getsizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            if size > self.max_bytes or self.max_entries == 0:
+                return
+            while self._nbytes + size > self.max_bytes or (
+                self.max_entries is not None and len(self._data) >= self.max_entries
+            ):
+                self._remove(self._policy.victim())
+                self._evictions += 1
+            self._data[key] = value
+            self._sizes[key] = size
+            self._nbytes += size
+            self._policy.insert(key)
+
+    def _remove(self, key: Hashable) -> None:
+        del self._data[key]
+        self._nbytes -= self._sizes.pop(key)
+        self._policy.remove(key)
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._nbytes = 0
+            self._policy.clear()
+
+
+def _default_shared_dir() -> Path:
+    shm = Path("/dev/shm")
+    base = shm if shm.is_dir() else Path(tempfile.gettempdir())
+    return base / "distributed_prompt-cache"
+
+
+class SharedShardCache(Cache):
+    """Shard cache shared by every process on a node through a cache directory.
+
+    Entries are stored as UTF-8 files under ``directory/namespace`` (by
+    default in ``/dev/shm``, i.e. RAM-backed) and read through ``mmap``,
+    so all processes share one copy of each shard's bytes in the page cache
+    instead of each downloading and holding its own.  Writes are atomic
+    (write to a temporary file, then rename) and eviction is coordinated
+    with an ``flock`` on ``.lock``: whichever process pushes the directory
+    over ``max_bytes`` removes the least recently used entries, tracked by
+    file mtime.  Hit/miss counters are per process.
+
+    Decoding a large entry is far slower than slicing it, so each process
+    keeps up to ``local_bytes`` of recently read entries decoded, and
+    ``get_slice`` with a byte span decodes only that span from the map.
+
+    ``namespace`` is required and must identify the corpus version (e.g.
+    ``index.root_hash``): keys are shard ids, so two corpora sharing a
+    namespace would read each other's shards.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path | None = None,
+        max_bytes: int = DEFAULT_CACHE_BYTES,
+        *,
+        namespace: str,
+        local_bytes: int = DEFAULT_LOCAL_BYTES,
+    ) -> None:
+        if not namespace:
+            raise ValueError("SharedShardCache needs a namespace identifying the corpus")
+        root = Path(directory) if directory is not None else _default_shared_dir()
+        self.directory = root / quote(namespace, safe="")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock_path = self.directory / ".lock"
+        # Keyed by (file name, inode, size): a replaced entry is a new inode.
+        self._local = ShardCache(local_bytes)
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _path(self, key: Hashable) -> Path:
+        return self.directory / f"{quote(str(key), safe='')}.txt"
+
+    def _entries(self) -> list[os.DirEntry]:
+        return [e for e in os.scandir(self.directory) if e.name.endswith(".txt")]
+
+    def __len__(self) -> int:
+        return len(self._entries())
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._path(key).exists()
+
+    @property
+    def nbytes(self) -> int:
+        total = 0
+        for entry in self._entries():
+            try:
+                total += entry.stat().st_size
+            except FileNotFoundError:
+                pass
+        return total
+
+    @property
+    def stats(self) -> CacheStats:
+        entries = self._entries()
+        return CacheStats(
+            hits=self._hits,
+            misses=self._misses,
+            evictions=self._evictions,
+            entries=len(entries),
+            nbytes=self.nbytes,
+            max_bytes=self.max_bytes,
+        )
+
+    def _read(
+        self,
+        path: Path,
+        offset: int = 0,
+        length: int | None = None,
+        span: tuple[int, int, int] | None = None,
+    ) -> str | None:
+        """Read characters ``[offset, offset + length)`` of an entry (all of it by default).
+
+        A decoded copy kept in-process is sliced when there is one; otherwise
+        only the slice's byte *span* is decoded if given, and without one the
+        whole entry is decoded and kept.
+        """
+        try:
+            with open(path, "rb") as f:
+                st = os.fstat(f.fileno())
+                tag = (path.name, st.st_ino, st.st_size)
+                value = self._local.get(tag) if st.st_size else ""
+                if value is None:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        if span is not None:
+                            byte_start, byte_end, skip = span
+                            text = str(mm[byte_start:byte_end], "utf-8")
+                            return text[skip : skip + length]
+                        value = str(mm[:], "utf-8")
+                    self._local.put(tag, value)
+        except FileNotFoundError:
+            return None
+        return value if length is None else value[offset : offset + length]
+
+    def peek(self, key: Hashable) -> str | None:
+        return self._read(self._path(key))
+
+    def get(self, key: Hashable) -> str | None:
+        path = self._path(key)
+        return self._counted(path, self._read(path))
+
+    def get_slice(
+        self,
+        key: Hashable,
+        offset: int,
+        length: int,
+        span: tuple[int, int, int] | None = None,
+    ) -> str | None:
+        path = self._path(key)
+        return self._counted(path, self._read(path, offset, length, span))
+
+    def _counted(self, path: Path, value: str | None) -> str | None:
+        """Count a lookup of *path* and mark a hit as recently used."""
+        if value is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return value
+
+    def put(self, key: Hashable, value: str) -> None:
+        data = value.encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        self._evict()
+
+    def _evict(self) -> None:
+        with open(self._lock_path, "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            entries = []
+            for entry in self._entries():
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                Path(path).unlink(missing_ok=True)
+                total -= size
+                self._evictions += 1
+
+    def discard(self, key: Hashable) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        with open(self._lock_path, "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            for entry in self._entries():
+                Path(entry.path).unlink(missing_ok=True)
+        self._local.clear()
@@ -3,28 +3,62 @@
 from __future__ import annotations
 
 import argparse
+import os
 import sys
 
-from distributed_prompt.ingest import DEFAULT_SHARD_SIZE, ingest_file
+from distributed_prompt.compression import CODECS
+from distributed_prompt.ingest import DEFAULT_SHARD_SIZE, IngestProgress, append, ingest_file
+from distributed_prompt.ngram import DEFAULT_TRIGRAM_BITS
 from distributed_prompt.shard import ShardIndex
 
 
 def cmd_ingest(args: argparse.Namespace) -> None:
-    import tiktoken
-
     path = args.file
     output = args.output
     shard_size = args.shard_size
     print(f"Ingesting {path} → {output} (shard_size={shard_size:,})")
-    index = ingest_file(path, output, shard_size)
+    last: list[IngestProgress] = []
+
+    def report(p: IngestProgress) -> None:
+        last[:] = [p]
+        if sys.stderr.isatty():
+            sys.stderr.write(
+                f"\r  {p.shards_done} shards, {p.bytes_written / 1e6:,.1f} MB, "
+                f"{p.mb_per_s:,.1f} MB/s"
+            )
+
+    index = ingest_file(
+        path,
+        output,
+        shard_size,
+        trigram_bits=args.trigram_bits,
+        token_encoding=args.encoding or None,
+        workers=args.workers,
+        processes=args.processes,
+        progress=report,
+        compression=args.compression,
+        align=args.align,
+        content_addressed=args.content_addressed,
+    )
+    if last and sys.stderr.isatty():
+        sys.stderr.write("\n")
 
-    enc = tiktoken.get_encoding("cl100k_base")
-    with open(path, encoding="utf-8") as f:
-        num_tokens = len(enc.encode(f.read()))
+    summary = f"Done: {index.num_shards} shards, {index.total_length:,} characters"
+    if index.token_encoding:
+        num_tokens = sum(s.num_tokens for s in index.shards)
+        summary += f", {num_tokens:,} tokens"
+    if last:
+        summary += f" in {last[0].elapsed:.1f}s ({last[0].mb_per_s:,.1f} MB/s)"
+    print(summary)
 
-    print(
-        f"Done: {index.num_shards} shards, {index.total_length:,} characters, {num_tokens:,} tokens"
-    )
+
+def cmd_append(args: argparse.Namespace) -> None:
+    if args.file == "-":
+        index = append(args.shards_dir, sys.stdin, workers=args.workers, processes=args.processes)
+    else:
+        with open(args.file, encoding="utf-8") as f:
+            index = append(args.shards_dir, f, workers=args.workers, processes=args.processes)
+    print(f"Done: {index.num_shards} shards, {index.total_length:,} characters")
 
 
 def cmd_slice(args: argparse.Namespace) -> None:
@@ -36,16 +70,47 @@ def cmd_slice(args: argparse.Namespace) -> None:
 
 
 def cmd_info(args: argparse.Namespace) -> None:
-    index = ShardIndex.load(f"{args.shards_dir}/meta.json")
+    index = ShardIndex.load_dir(args.shards_dir)
     print(f"Source:      {index.source_file}")
     print(f"Total chars: {index.total_length:,}")
-    print(f"Shard size:  {index.shard_size:,}")
+    aligned = f" (aligned to {index.align}s)" if index.align else ""
+    print(f"Shard size:  {index.shard_size:,}{aligned}")
     print(f"Num shards:  {index.num_shards}")
+    if index.compression:
+        stored = sum(s.stored_bytes for s in index.shards)
+        raw = sum(s.num_bytes for s in index.shards)
+        ratio = raw / stored if stored else 1.0
+        print(f"Compression: {index.compression} ({stored:,} bytes stored, {ratio:.1f}x)")
+    if index.token_encoding:
+        num_tokens = sum(s.num_tokens for s in index.shards)
+        print(f"Tokens:      {num_tokens:,} ({index.token_encoding})")
+    if index.root_hash:
+        print(f"Root hash:   {index.root_hash}")
+    if index.content_addressed:
+        unique = len({s.sha256 for s in index.shards})
+        print(f"Layout:      content-addressed ({unique} unique objects)")
     if index.shards:
         last = index.shards[-1]
         print(f"Last shard:  {last.byte_length:,} chars (id={last.shard_id})")
 
 
+def cmd_verify(args: argparse.Namespace) -> None:
+    from distributed_prompt.backends.file_backend import FileBackend
+
+    with FileBackend(args.shards_dir, max_workers=args.workers) as backend:
+        index = backend.index
+        if not index.root_hash or not index.has_hashes():
+            print("Index lacks content hashes; re-ingest to enable verification", file=sys.stderr)
+            sys.exit(2)
+        bad = backend.verify()
+    if bad:
+        for sid in bad:
+            print(f"BAD   shard {sid} ({index.shard_filename(sid)})")
+        print(f"{len(bad)} of {index.num_shards} shards failed verification")
+        sys.exit(1)
+    print(f"OK    {index.num_shards} shards, root {index.root_hash}")
+
+
 def main(argv: list[str] | None = None) -> None:
     parser = argparse.ArgumentParser(
         prog="distributed_prompt",
@@ -63,6 +128,73 @@ def main(argv: list[str] | None = None) -> None:
         default=DEFAULT_SHARD_SIZE,
         help=f"Shard size in characters (default: {DEFAULT_SHARD_SIZE:,})",
     )
+    p_ingest.add_argument(
+        "--trigram-bits",
+        type=int,
+        nargs="?",
+        const=DEFAULT_TRIGRAM_BITS,
+        default=0,
+        help=(
+            "Build per-shard trigram filters of this many bits so find/in skip shards "
+            f"(default when given without a value: {DEFAULT_TRIGRAM_BITS:,})"
+        ),
+    )
+
+    p_ingest.add_argument(
+        "--encoding",
+        default="cl100k_base",
+        help="tiktoken encoding for the token index; empty to skip (default: cl100k_base)",
+    )
+    p_ingest.add_argument(
+        "--workers",
+        "-j",
+        type=int,
+        default=None,
+        help="Worker threads for encoding and indexing shards (default: one per CPU)",
+    )
+    p_ingest.add_argument(
+        "--processes",
+        "-p",
+        type=int,
+        default=None,
+        help="Build trigram filters in this many worker processes (default: in the threads)",
+    )
+    p_ingest.add_argument(
+        "--compression",
+        choices=sorted(CODECS),
+        default="",
+        help="Store shards as independently compressed blocks (default: uncompressed)",
+    )
+    p_ingest.add_argument(
+        "--align",
+        choices=["line", "paragraph"],
+        default="",
+        help="Cut shards on line or paragraph boundaries near --shard-size (default: exact)",
+    )
+    p_ingest.add_argument(
+        "--content-addressed",
+        action="store_true",
+        help="Store shards by content hash in an objects/ directory next to --output, "
+        "shared with other versions ingested there",
+    )
+
+    p_append = sub.add_parser("append", help="Append text to an ingested shard directory")
+    p_append.add_argument("shards_dir", help="Path to shards directory")
+    p_append.add_argument("file", help="Path to the text to append ('-' for stdin)")
+    p_append.add_argument(
+        "--workers",
+        "-j",
+        type=int,
+        default=None,
+        help="Worker threads for encoding and indexing shards (default: one per CPU)",
+    )
+    p_append.add_argument(
+        "--processes",
+        "-p",
+        type=int,
+        default=None,
+        help="Build trigram filters in this many worker processes (default: in the threads)",
+    )
 
     p_slice = sub.add_parser("slice", help="Read a character range from sharded prompt")
     p_slice.add_argument("shards_dir", help="Path to shards directory")
@@ -72,13 +204,27 @@ def main(argv: list[str] | None = None) -> None:
     p_info = sub.add_parser("info", help="Show info about a shard directory")
     p_info.add_argument("shards_dir", help="Path to shards directory")
 
+    p_verify = sub.add_parser("verify", help="Check every shard against its content hash")
+    p_verify.add_argument("shards_dir", help="Path to shards directory")
+    p_verify.add_argument(
+        "--workers",
+        "-j",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Shards verified in parallel (default: one per CPU)",
+    )
+
     args = parser.parse_args(argv)
     if args.command == "ingest":
         cmd_ingest(args)
+    elif args.command == "append":
+        cmd_append(args)
     elif args.command == "slice":
         cmd_slice(args)
     elif args.command == "info":
         cmd_info(args)
+    elif args.command == "verify":
+        cmd_verify(args)
     else:
         parser.print_help()
         sys.exit(1)
@@ -0,0 +1,71 @@
+"""Block-compressed shard encoding.
+
+A compressed shard is a sequence of independently compressed blocks, one
+per ``ShardIndex.checkpoint_interval`` characters, so a slice only has to
+fetch and decompress the blocks it overlaps.  Block offsets are stored in
+``ShardMeta.blocks``.
+"""
+
+from __future__ import annotations
+
+import zlib
+from collections.abc import Callable
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # type: ignore[assignment]
+
+Codec = tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]
+
+CODECS: dict[str, Codec] = {
+    "zlib": (lambda data: zlib.compress(data, 6), zlib.decompress),
+}
+if zstandard is not None:
+    CODECS["zstd"] = (
+        lambda data: zstandard.ZstdCompressor(level=3).compress(data),
+        lambda data: zstandard.ZstdDecompressor().decompress(data),
+    )
+
+
+def get_codec(name: str) -> Codec:
+    """Return the ``(compress, decompress)`` pair for *name*."""
+    try:
+        return CODECS[name]
+    except KeyError:
+        if name == "zstd":
+            raise ImportError(
+                "zstd compression requires zstandard: pip install zstandard"
+            ) from None
+        raise ValueError(f"unknown compression {name!r}; choose from {sorted(CODECS)}") from None
+
+
+def compress_blocks(chunk: str, interval: int, codec: str) -> tuple[bytes, int, tuple[int, ...]]:
+    """Compress *chunk* in blocks of *interval* characters.
+
+    Returns the stored bytes, the size of the uncompressed UTF-8 encoding,
+    and the offset of every block in the stored bytes followed by their
+    total length.
+    """
+    compress = get_codec(codec)[0]
+    pieces: list[bytes] = []
+    blocks = [0]
+    num_bytes = 0
+    for i in range(0, len(chunk), interval):
+        raw = chunk[i : i + interval].encode("utf-8")
+        num_bytes += len(raw)
+        pieces.append(compress(raw))
+        blocks.append(blocks[-1] + len(pieces[-1]))
+    return b"".join(pieces), num_bytes, tuple(blocks)
+
+
+def decompress_blocks(data: bytes, blocks: tuple[int, ...], codec: str) -> bytes:
+    """Decompress consecutive blocks; *blocks* are their offsets, ending with the span's end.
+
+    ``data`` holds the stored bytes from ``blocks[0]`` to ``blocks[-1]``.
+    """
+    decompress = get_codec(codec)[1]
+    base = blocks[0]
+    return b"".join(
+        decompress(data[a - base : b - base]) for a, b in zip(blocks, blocks[1:], strict=False)
+    )
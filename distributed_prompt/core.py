@@ -2,7 +2,128 @@
 
 from __future__ import annotations
 
+import re
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import TYPE_CHECKING, TextIO
+
 from distributed_prompt.backends.base import Backend
+from distributed_prompt.lines import Lines
+from distributed_prompt.search import DEFAULT_MAX_MATCH, AhoCorasick, TextMatch, scan_window
+from distributed_prompt.shard import content_hash
+from distributed_prompt.tokens import Tokens
+
+if TYPE_CHECKING:
+    from distributed_prompt.rope import PromptRope
+
+VIEW_THRESHOLD = 1 << 20  # slices at least this long are returned as lazy views
+
+
+def take_stepped(pieces: Iterable[str], positions: range) -> str:
+    """Gather the characters at *positions* from *pieces*, which span exactly
+    ``min(positions)`` to ``max(positions)``."""
+    stride = abs(positions.step)
+    picked = []
+    pos = 0
+    for chunk in pieces:
+        picked.append(chunk[-pos % stride :: stride])
+        pos += len(chunk)
+    text = "".join(picked)
+    return text if positions.step > 0 else text[::-1]
+
+
+def rechunk(pieces: Iterable[str], size: int, overlap: int = 0) -> Iterator[str]:
+    """Re-cut a stream of text into chunks of *size*, each sharing *overlap* with the last."""
+    if size <= 0:
+        raise ValueError("size must be positive")
+    if not 0 <= overlap < size:
+        raise ValueError("overlap must satisfy 0 <= overlap < size")
+    return _rechunk(pieces, size, overlap)
+
+
+def _rechunk(pieces: Iterable[str], size: int, overlap: int) -> Iterator[str]:
+    stride = size - overlap
+    buf = ""
+    emitted = False
+    for piece in pieces:
+        buf += piece
+        pos = 0
+        while len(buf) - pos >= size:
+            yield buf[pos : pos + size]
+            emitted = True
+            pos += stride
+        buf = buf[pos:]
+    # The remainder is new text unless it is only the previous chunk's overlap.
+    if len(buf) > (overlap if emitted else 0):
+        yield buf
+
+
+def regex_windows(
+    fetch: Callable[[int, int], str],
+    segments: Iterable[tuple[int, int]],
+    lo: int,
+    hi: int,
+    max_match: int,
+) -> Iterator[tuple[str, int, int, int]]:
+    """Yield ``(text, pos, accept_end, offset)`` arguments for ``scan_window``.
+
+    One window per segment ``[a, b)`` of ``[lo, hi)`` (in order, covering
+    it), with up to *max_match* characters of context read by *fetch* on
+    each side.
+    """
+    if lo == hi:
+        yield "", 0, 1, lo
+    for a, b in segments:
+        fetch_start = max(lo, a - max_match)
+        text = fetch(fetch_start, min(hi, b + max_match))
+        # An empty match at the very end belongs to the last window.
+        accept_end = b - fetch_start + (b == hi)
+        yield text, a - fetch_start, accept_end, fetch_start
+
+
+def scan_regex(
+    pattern: str | re.Pattern,
+    flags: int,
+    windows: Iterator[tuple[str, int, int, int]],
+    start: int,
+    processes: int | None = None,
+) -> Iterator[TextMatch]:
+    """Yield the non-overlapping matches of *pattern* in ``regex_windows`` output, in order.
+
+    With ``processes`` the windows are matched in a process pool, at most
+    ``2 * processes`` at a time.
+    """
+    if isinstance(pattern, re.Pattern):
+        pattern, flags = pattern.pattern, pattern.flags | flags
+    next_allowed = start
+    if processes is None:
+        for text, pos, accept_end, offset in windows:
+            pos = max(pos, next_allowed - offset)
+            for m in scan_window(pattern, flags, text, pos, accept_end, offset):
+                yield m
+                next_allowed = m.end
+        return
+
+    with ProcessPoolExecutor(processes) as pool:
+        pending: deque[tuple[Future, tuple[str, int, int, int]]] = deque()
+        while True:
+            while len(pending) < 2 * processes:
+                window = next(windows, None)
+                if window is None:
+                    break
+                pending.append((pool.submit(scan_window, pattern, flags, *window), window))
+            if not pending:
+                return
+            future, (text, pos, accept_end, offset) = pending.popleft()
+            matches = future.result()
+            if matches and matches[0].start < next_allowed:
+                # A match from the previous window ran into this one; rescan after it.
+                pos = next_allowed - offset
+                matches = scan_window(pattern, flags, text, pos, accept_end, offset)
+            for m in matches:
+                yield m
+                next_allowed = m.end
 
 
 class DistributedPrompt:
@@ -13,10 +134,22 @@ class DistributedPrompt:
 
     This is *not* a ``str`` subclass.  Subclassing ``str`` forces full
     materialisation at construction time, defeating the purpose.
+
+    A prompt may be a window ``[start, stop)`` over its backend: slices of
+    at least ``view_threshold`` characters return such a view instead of a
+    ``str``, so slicing a large region and then slicing or searching it
+    again reads only what the final operation needs.  Offsets and line
+    numbers of a view are relative to its window, and ``str()`` or
+    formatting a view yields its full text, so code that formats a slice
+    into a string gets the same result as with a ``str`` slice.
     """
 
-    def __init__(self, backend: Backend) -> None:
+    view_threshold: int = VIEW_THRESHOLD
+
+    def __init__(self, backend: Backend, start: int = 0, stop: int | None = None) -> None:
         self._backend = backend
+        self._start = start
+        self._stop = stop
 
     # -- core access -----------------------------------------------------------
 
@@ -24,100 +157,417 @@ class DistributedPrompt:
     def _index(self):
         return self._backend.index
 
+    @property
+    def _end(self) -> int:
+        """Absolute end of the window; a whole prompt follows the index length."""
+        return self._index.total_length if self._stop is None else self._stop
+
     def __len__(self) -> int:
-        return self._index.total_length
+        return self._end - self._start
 
-    def __getitem__(self, key: int | slice) -> str:
+    def _fetch(self, start: int, stop: int) -> str:
+        """Fetch window offsets [start, stop) as a ``str``."""
+        return self._backend.fetch_range(self._start + start, self._start + stop)
+
+    def __getitem__(self, key: int | slice) -> str | DistributedPrompt:
         if isinstance(key, int):
             if key < 0:
                 key = len(self) + key
             if key < 0 or key >= len(self):
                 raise IndexError("index out of range")
-            return self._backend.fetch_range(key, key + 1)
+            return self._fetch(key, key + 1)
         if isinstance(key, slice):
             start, stop, step = key.indices(len(self))
             if step != 1:
-                # Fall back to character-by-character for non-unit steps.
-                return "".join(
-                    self._backend.fetch_range(i, i + 1) for i in range(start, stop, step)
-                )
-            return self._backend.fetch_range(start, stop)
+                return self._fetch_stepped(range(start, stop, step))
+            if stop - start >= self.view_threshold:
+                view = DistributedPrompt(self._backend, self._start + start, self._start + stop)
+                view.view_threshold = self.view_threshold
+                return view
+            return self._fetch(start, max(start, stop))
         raise TypeError(f"indices must be integers or slices, not {type(key).__name__}")
 
+    def _fetch_stepped(self, positions: range) -> str:
+        """Gather the characters at *positions*, reading each covered shard once."""
+        if not positions:
+            return ""
+        lo = min(positions[0], positions[-1])
+        hi = max(positions[0], positions[-1]) + 1
+        return take_stepped(self._backend.iter_range(self._start + lo, self._start + hi), positions)
+
+    def get_many(self, ranges: Iterable[tuple[int | None, int | None]]) -> list[str]:
+        """Return ``[prompt[a:b] for a, b in ranges]`` as strings, batching the reads.
+
+        Overlapping and neighbouring ranges share shard reads: each shard
+        is fetched at most once and shards are read in parallel when the
+        backend allows it.
+        """
+        n = len(self)
+        windows = []
+        for a, b in ranges:
+            start, stop, _ = slice(a, b).indices(n)
+            windows.append((self._start + start, self._start + max(start, stop)))
+        return self._backend.fetch_many(windows)
+
+    # -- async access ----------------------------------------------------------
+
+    async def aslice(self, start: int | None = None, stop: int | None = None) -> str:
+        """Coroutine equivalent of ``prompt[start:stop]``, always returning a ``str``."""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        return await self._backend.afetch_range(self._start + start, self._start + max(start, stop))
+
+    async def afind(self, sub: str, start: int = 0, end: int | None = None) -> int:
+        """Coroutine equivalent of ``prompt.find(sub, start, end)``."""
+        return await self._backend.run_async(self.find, sub, start, end)
+
+    # -- line access -----------------------------------------------------------
+
+    @property
+    def lines(self) -> Lines:
+        """Sequence of lines (``split("\\n")`` semantics): ``prompt.lines[a:b]``."""
+        return Lines(self._backend, self._backend.line_index, self._start, self._end)
+
+    def line_of(self, offset: int) -> int:
+        """Return the 0-based line number containing character *offset*."""
+        n = len(self)
+        if offset < 0:
+            offset += n
+        if not 0 <= offset <= n:
+            raise IndexError("offset out of range")
+        return self.lines.line_of(offset)
+
+    def offset_of_line(self, n: int) -> int:
+        """Return the character offset at which line *n* starts."""
+        return self.lines.offset_of_line(n)
+
+    def splitlines(self, keepends: bool = False) -> Iterator[str]:
+        """Lazily yield lines with ``str.splitlines`` semantics, one shard at a time."""
+        carry = ""
+        for chunk in self._backend.iter_range(self._start, self._end):
+            pieces = (carry + chunk).splitlines(keepends=True)
+            # The last piece may continue (or be a "\r" completed by "\n") in the next shard.
+            carry = pieces.pop() if pieces else ""
+            for piece in pieces:
+                yield piece if keepends else piece.splitlines()[0]
+        if carry:
+            yield carry if keepends else carry.splitlines()[0]
+
+    # -- token access ----------------------------------------------------------
+
+    def _require_whole(self, what: str) -> None:
+        if len(self) != self._index.total_length:
+            raise ValueError(f"{what} is only available on a whole prompt, not a slice view")
+
+    @property
+    def num_tokens(self) -> int:
+        """Token count from the ingest-time index; no text is read."""
+        self._require_whole("num_tokens")
+        return self._backend.token_index.num_tokens
+
+    @property
+    def tokens(self) -> Tokens:
+        """Token-addressed view: ``prompt.tokens[a:b]`` is the text of tokens ``a..b``."""
+        self._require_whole("tokens")
+        return Tokens(self._backend, self._backend.token_index)
+
+    def extend(self, data: str | TextIO | Iterable[str]) -> None:
+        """Append *data* to the corpus behind this prompt, in time proportional to *data*.
+
+        The backend must support appending (``FileBackend`` does; see
+        ``ingest.append``).  The prompt then covers the grown corpus;
+        existing views keep their windows.
+        """
+        if self._start or self._stop is not None:
+            raise ValueError("extend is only available on a whole prompt, not a slice view")
+        self._backend.append(data)
+
     # -- string protocol -------------------------------------------------------
 
     def __str__(self) -> str:
+        """The full text of a slice view (as slicing a ``str`` would give), and an
+        abbreviated preview of a whole prompt, which may not fit in memory."""
         n = len(self)
-        if n <= 200:
-            return self._backend.fetch_range(0, n)
-        head = self._backend.fetch_range(0, 80)
-        tail = self._backend.fetch_range(n - 80, n)
+        if n <= 200 or self._stop is not None:
+            return self._fetch(0, n)
+        head = self._fetch(0, 80)
+        tail = self._fetch(n - 80, n)
         return f"{head}...({n - 160} chars omitted)...{tail}"
 
     def __repr__(self) -> str:
         idx = self._index
+        window = f", window=[{self._start:,}:{self._end:,}]" if self._stop is not None else ""
         return (
-            f"DistributedPrompt(length={idx.total_length:,}, "
-            f"shards={idx.num_shards}, shard_size={idx.shard_size:,})"
+            f"DistributedPrompt(length={len(self):,}, "
+            f"shards={idx.num_shards}, shard_size={idx.shard_size:,}{window})"
         )
 
-    def __contains__(self, item: str) -> bool:  # type: ignore[override]
-        # Scan shard by shard with overlap to catch cross-boundary matches.
-        overlap = len(item) - 1 if len(item) > 1 else 0
-        for shard in self._index.shards:
-            start = max(0, shard.start_offset - overlap)
-            end = shard.end_offset
-            chunk = self._backend.fetch_range(start, end)
-            if item in chunk:
-                return True
-        return False
+    def _search_windows(self, sub: str, start: int, end: int):
+        """Yield ``(fetch_start, fetch_end)`` windows that together cover every match.
 
-    def find(self, sub: str, start: int = 0, end: int | None = None) -> int:
-        if end is None:
-            end = len(self)
+        Windows are yielded in offset order and any match found in a window
+        starts no earlier than matches in later windows, so the first hit
+        is the leftmost one.  With a trigram index only shards that may
+        contain a match are visited; each window then extends forward into
+        the next shard.  Otherwise every shard is scanned with a backward
+        overlap of ``len(sub) - 1`` characters to catch cross-boundary matches.
+        """
         overlap = len(sub) - 1 if len(sub) > 1 else 0
         shard_ids = self._index.lookup(start, end)
+        trigram_index = self._backend.trigram_index
+        candidates = trigram_index.candidates(sub, shard_ids) if trigram_index else None
+        if candidates is not None:
+            for sid in candidates:
+                meta = self._index.shards[sid]
+                yield max(start, meta.start_offset), min(end, meta.end_offset + overlap)
+            return
         for sid in shard_ids:
             meta = self._index.shards[sid]
             fetch_start = max(start, meta.start_offset - overlap) if sid != shard_ids[0] else start
-            fetch_end = min(end, meta.end_offset)
+            yield fetch_start, min(end, meta.end_offset)
+
+    def __contains__(self, item: str) -> bool:  # type: ignore[override]
+        return self.find(item) != -1
+
+    def find(self, sub: str, start: int = 0, end: int | None = None) -> int:
+        n = len(self)
+        if not sub and start > n:
+            return -1
+        start, end, _ = slice(start, end).indices(n)
+        if not sub:
+            return start if start <= end else -1
+        base = self._start
+        for fetch_start, fetch_end in self._search_windows(sub, base + start, base + end):
             chunk = self._backend.fetch_range(fetch_start, fetch_end)
             pos = chunk.find(sub)
             if pos != -1:
-                return fetch_start + pos
+                return fetch_start + pos - base
+        return -1
+
+    def index(self, sub: str, start: int = 0, end: int | None = None) -> int:
+        pos = self.find(sub, start, end)
+        if pos == -1:
+            raise ValueError("substring not found")
+        return pos
+
+    def _segments(self, start: int, end: int) -> Iterator[tuple[int, int]]:
+        """Split window offsets ``[start, end)`` at shard boundaries."""
+        base = self._start
+        for sid in self._index.lookup(base + start, base + end):
+            meta = self._index.shards[sid]
+            yield max(start, meta.start_offset - base), min(end, meta.end_offset - base)
+
+    def _start_windows(self, sub: str, start: int, end: int) -> list[tuple[int, int]]:
+        """Windows, one per shard, covering every match of *sub* that starts in that shard.
+
+        Each window extends ``len(sub) - 1`` characters into the next shard,
+        so the windows' match starts are disjoint.  Shards ruled out by the
+        trigram index are skipped.
+        """
+        overlap = max(len(sub) - 1, 0)
+        shard_ids = self._index.lookup(start, end)
+        trigram_index = self._backend.trigram_index
+        candidates = trigram_index.candidates(sub, shard_ids) if trigram_index else None
+        windows = []
+        for sid in shard_ids if candidates is None else candidates:
+            meta = self._index.shards[sid]
+            windows.append((max(start, meta.start_offset), min(end, meta.end_offset + overlap)))
+        return windows
+
+    def rfind(self, sub: str, start: int = 0, end: int | None = None) -> int:
+        n = len(self)
+        if not sub and start > n:
+            return -1
+        start, end, _ = slice(start, end).indices(n)
+        if not sub:
+            return end if start <= end else -1
+        base = self._start
+        for fetch_start, fetch_end in reversed(self._start_windows(sub, base + start, base + end)):
+            pos = self._backend.fetch_range(fetch_start, fetch_end).rfind(sub)
+            if pos != -1:
+                return fetch_start + pos - base
         return -1
 
-    def __iter__(self):
-        for i in range(len(self)):
-            yield self[i]
+    def rindex(self, sub: str, start: int = 0, end: int | None = None) -> int:
+        pos = self.rfind(sub, start, end)
+        if pos == -1:
+            raise ValueError("substring not found")
+        return pos
+
+    def finditer(self, sub: str, start: int = 0, end: int | None = None) -> Iterator[int]:
+        """Lazily yield the offset of every non-overlapping occurrence of *sub*, left to right."""
+        n = len(self)
+        if start > n:
+            return
+        start, end, _ = slice(start, end).indices(n)
+        if not sub:
+            yield from range(start, end + 1)
+            return
+        base = self._start
+        next_allowed = base + start
+        for fetch_start, fetch_end in self._start_windows(sub, base + start, base + end):
+            if fetch_end - max(fetch_start, next_allowed) < len(sub):
+                continue
+            chunk = self._backend.fetch_range(fetch_start, fetch_end)
+            pos = chunk.find(sub, max(0, next_allowed - fetch_start))
+            while pos != -1:
+                yield fetch_start + pos - base
+                next_allowed = fetch_start + pos + len(sub)
+                pos = chunk.find(sub, pos + len(sub))
+
+    def count(self, sub: str, start: int = 0, end: int | None = None) -> int:
+        return sum(1 for _ in self.finditer(sub, start, end))
+
+    def startswith(
+        self, prefix: str | tuple[str, ...], start: int = 0, end: int | None = None
+    ) -> bool:
+        if isinstance(prefix, tuple):
+            return any(self.startswith(p, start, end) for p in prefix)
+        if start > len(self):
+            return False
+        start, end, _ = slice(start, end).indices(len(self))
+        if start + len(prefix) > end:
+            return False
+        return self._fetch(start, start + len(prefix)) == prefix
+
+    def endswith(
+        self, suffix: str | tuple[str, ...], start: int = 0, end: int | None = None
+    ) -> bool:
+        if isinstance(suffix, tuple):
+            return any(self.endswith(s, start, end) for s in suffix)
+        if start > len(self):
+            return False
+        start, end, _ = slice(start, end).indices(len(self))
+        if end - len(suffix) < start:
+            return False
+        return self._fetch(end - len(suffix), end) == suffix
+
+    def find_all_of(
+        self, patterns: Iterable[str] | AhoCorasick, start: int = 0, end: int | None = None
+    ) -> Iterator[tuple[str, int]]:
+        """Lazily yield ``(pattern, offset)`` for every occurrence of any of *patterns*.
+
+        All patterns are matched in a single streamed pass with an
+        Aho–Corasick automaton whose state carries across shard boundaries,
+        so no shard is read twice.  Overlapping occurrences are all
+        reported, ordered by where they end.  Pass a prebuilt
+        ``AhoCorasick`` to reuse it across calls.
+        """
+        automaton = patterns if isinstance(patterns, AhoCorasick) else AhoCorasick(patterns)
+        start, end, _ = slice(start, end).indices(len(self))
+        chunks = self._backend.iter_range(self._start + start, self._start + end)
+        for pattern, pos in automaton.search(chunks):
+            yield pattern, start + pos
+
+    def re_finditer(
+        self,
+        pattern: str | re.Pattern,
+        flags: int = 0,
+        start: int = 0,
+        end: int | None = None,
+        max_match: int = DEFAULT_MAX_MATCH,
+        processes: int | None = None,
+    ) -> Iterator[TextMatch]:
+        """Lazily yield non-overlapping regex matches as ``TextMatch`` objects, in order.
+
+        The prompt is scanned one shard at a time with ``max_match``
+        characters of context on each side, so anchors and lookarounds see
+        across shard boundaries; a match longer than ``max_match`` that
+        crosses a boundary may be missed or cut short.  With ``processes``
+        the shards are matched in a pool of that many processes (for
+        CPU-bound patterns) while this process reads ahead; at most
+        ``2 * processes`` shards are in flight.
+        """
+        start, end, _ = slice(start, end).indices(len(self))
+        windows = regex_windows(self._fetch, self._segments(start, end), start, end, max_match)
+        return scan_regex(pattern, flags, windows, start, processes)
+
+    def __iter__(self) -> Iterator[str]:
+        # Stream shard-sized chunks rather than fetching one character at a time.
+        for chunk in self._backend.iter_range(self._start, self._end):
+            yield from chunk
+
+    def iter_chunks(self, size: int, overlap: int = 0) -> Iterator[str]:
+        """Yield consecutive chunks of *size* characters, each sharing *overlap* with the last.
+
+        Chunk ``k`` starts at ``k * (size - overlap)``; only the final chunk
+        may be shorter.  Text is streamed shard by shard, so at most one
+        shard plus one chunk is held in memory.
+        """
+        return rechunk(self._backend.iter_range(self._start, self._end), size, overlap)
 
     def __format__(self, format_spec: str) -> str:
         return format(str(self), format_spec)
 
-    def __add__(self, other: str) -> str:
-        return str(self) + other
+    def __add__(self, other: str | DistributedPrompt) -> PromptRope:
+        """Concatenate lazily: see ``PromptRope``."""
+        from distributed_prompt.rope import PromptRope
+
+        if not isinstance(other, (str, DistributedPrompt)):
+            return NotImplemented
+        return PromptRope([self, other])
+
+    def __radd__(self, other: str) -> PromptRope:
+        from distributed_prompt.rope import PromptRope
+
+        if not isinstance(other, str):
+            return NotImplemented
+        return PromptRope([other, self])
 
-    def __radd__(self, other: str) -> str:
-        return other + str(self)
+    @property
+    def root_hash(self) -> str | None:
+        """Content hash of the whole prompt from the index, or ``None`` for views
+        and indexes missing any shard's hash."""
+        if self._start or len(self) != self._index.total_length:
+            return None
+        if not self._index.root_hash or not self._index.has_hashes():
+            return None
+        return self._index.root_hash
+
+    def _hash_equal(self, other: str | DistributedPrompt) -> bool | None:
+        """Decide equality from the recorded content hashes, or ``None`` if they can't."""
+        root = self.root_hash
+        if root is None:
+            return None
+        if isinstance(other, DistributedPrompt):
+            other_root = other.root_hash
+            if other_root is None:
+                return None
+            if root == other_root:
+                return True
+            # Different roots only prove a difference when the shards line up.
+            same_layout = list(self._index.start_offsets()) == list(other._index.start_offsets())
+            return False if same_layout else None
+        shards = self._index.shards
+        return all(
+            content_hash(other[meta.start_offset : meta.end_offset]) == meta.sha256
+            for meta in shards
+        )
 
     def __eq__(self, other: object) -> bool:
         if isinstance(other, str):
             if len(self) != len(other):
                 return False
+            by_hash = self._hash_equal(other)
+            if by_hash is not None:
+                return by_hash
             # Compare shard by shard to avoid full materialisation for mismatches.
-            for meta in self._index.shards:
-                chunk = self._backend.fetch_range(meta.start_offset, meta.end_offset)
-                if chunk != other[meta.start_offset : meta.end_offset]:
+            pos = 0
+            for chunk in self._backend.iter_range(self._start, self._end):
+                if chunk != other[pos : pos + len(chunk)]:
                     return False
+                pos += len(chunk)
             return True
         if isinstance(other, DistributedPrompt):
             if len(self) != len(other):
                 return False
-            for meta in self._index.shards:
-                a = self._backend.fetch_range(meta.start_offset, meta.end_offset)
-                b = other[meta.start_offset : meta.end_offset]
-                if a != b:
+            by_hash = self._hash_equal(other)
+            if by_hash is not None:
+                return by_hash
+            pos = 0
+            for chunk in self._backend.iter_range(self._start, self._end):
+                if chunk != other._fetch(pos, pos + len(chunk)):
                     return False
+                pos += len(chunk)
             return True
         return NotImplemented
 
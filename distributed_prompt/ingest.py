@@ -1,96 +1,653 @@
-"""Ingestion pipeline: file/string → shards + meta.json."""
+"""Ingestion pipeline: file/string → shards + meta.json/meta.bin."""
 
 from __future__ import annotations
 
+import hashlib
+import itertools
 import math
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
 from pathlib import Path
+from typing import Any, BinaryIO, TextIO
 
-from distributed_prompt.shard import ShardIndex, ShardMeta
+from distributed_prompt.compression import compress_blocks, get_codec
+from distributed_prompt.lines import NEWLINE_FILE, encode_newlines
+from distributed_prompt.ngram import TRIGRAM_FILE, shard_bloom
+from distributed_prompt.shard import (
+    OBJECTS_DIR,
+    ShardIndex,
+    ShardMeta,
+    aux_filename,
+    content_hash,
+    object_filename,
+    root_hash,
+    shard_name,
+)
+from distributed_prompt.tokens import DEFAULT_TOKEN_INTERVAL, get_encoding, tokenize_shard
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # type: ignore[assignment]
 
 DEFAULT_SHARD_SIZE = 1_000_000  # 1 MB (in characters)
+DEFAULT_CHECKPOINT_INTERVAL = 65_536  # characters between char→byte checkpoints
+DEFAULT_ALIGN_TOLERANCE = 0.1  # aligned shards may deviate this much from shard_size
+LOCK_FILE = ".lock"  # flock'ed by ``append`` in the shard directory
 
+# Boundaries tried, in order, when cutting aligned shards.
+_SEPARATORS = {"line": ("\n",), "paragraph": ("\n\n", "\n")}
 
-def ingest_file(
-    path: str | Path,
-    output_dir: str | Path,
-    shard_size: int = DEFAULT_SHARD_SIZE,
+
+def _encode_with_checkpoints(chunk: str, interval: int) -> tuple[bytes, tuple[int, ...]]:
+    """Encode *chunk* as UTF-8, recording the byte offset of every *interval*-th char.
+
+    ASCII chunks get no checkpoints: their byte and character offsets coincide.
+    """
+    if chunk.isascii():
+        return chunk.encode("ascii"), ()
+    pieces: list[bytes] = []
+    checkpoints: list[int] = []
+    pos = 0
+    for i in range(0, len(chunk), interval):
+        checkpoints.append(pos)
+        piece = chunk[i : i + interval].encode("utf-8")
+        pieces.append(piece)
+        pos += len(piece)
+    return b"".join(pieces), tuple(checkpoints)
+
+
+def _write_shard(
+    output_dir: Path,
+    shard_id: int,
+    start: int,
+    chunk: str,
+    checkpoint_interval: int,
+    compression: str = "",
+    content_addressed: bool = False,
+    revision: int = 0,
+) -> ShardMeta:
+    """Write one shard file and return its metadata.
+
+    With ``content_addressed``, *output_dir* is the objects directory and a
+    shard whose object already exists is not written again.  Otherwise the
+    file is named after *shard_id* and *revision* (see ``shard_name``).
+    """
+    blocks: tuple[int, ...] = ()
+    if compression:
+        data, num_bytes, blocks = compress_blocks(chunk, checkpoint_interval, compression)
+        checkpoints: tuple[int, ...] = ()
+        digest = content_hash(chunk)
+    else:
+        data, checkpoints = _encode_with_checkpoints(chunk, checkpoint_interval)
+        num_bytes = len(data)
+        digest = hashlib.sha256(data).hexdigest()
+    if content_addressed:
+        path = output_dir / object_filename(digest, compression, checkpoint_interval)
+        path.parent.mkdir(parents=True, exist_ok=True)
+    else:
+        path = output_dir / shard_name(shard_id, compression, revision)
+    if not (content_addressed and path.exists()):
+        # Replace atomically: workers may write the same object concurrently.
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    return ShardMeta(
+        shard_id=shard_id,
+        start_offset=start,
+        end_offset=start + len(chunk),
+        byte_length=len(chunk),
+        num_bytes=num_bytes,
+        checkpoints=checkpoints,
+        num_newlines=chunk.count("\n"),
+        blocks=blocks,
+        sha256=digest,
+        revision=revision,
+    )
+
+
+@dataclass(frozen=True)
+class IngestProgress:
+    """Snapshot passed to the ``progress`` callback after each shard is written."""
+
+    shards_done: int
+    chars: int
+    bytes_written: int
+    elapsed: float
+
+    @property
+    def mb_per_s(self) -> float:
+        return self.bytes_written / 1e6 / self.elapsed if self.elapsed > 0 else 0.0
+
+
+@dataclass(frozen=True)
+class _ShardOptions:
+    output_dir: Path
+    checkpoint_interval: int
+    trigram_bits: int
+    line_index: bool
+    encoding: Any | None
+    token_interval: int
+    compression: str
+    content_addressed: bool
+
+
+def _build_shard(
+    shard_id: int, start: int, chunk: str, lookahead: str, revision: int, opts: _ShardOptions
+) -> tuple[ShardMeta, bytes, bytes]:
+    """Worker stage: write one shard and compute its metadata and index records.
+
+    Returns the metadata plus this shard's records for ``trigrams.bin`` and
+    ``newlines.bin`` (empty when those indexes are disabled).
+    """
+    meta = _write_shard(
+        opts.output_dir,
+        shard_id,
+        start,
+        chunk,
+        opts.checkpoint_interval,
+        opts.compression,
+        opts.content_addressed,
+        revision,
+    )
+    if opts.encoding is not None:
+        n, checkpoints = tokenize_shard(opts.encoding, chunk, opts.token_interval)
+        meta = replace(meta, num_tokens=n, token_checkpoints=checkpoints)
+    bloom = shard_bloom(chunk, lookahead, opts.trigram_bits) if opts.trigram_bits else b""
+    newlines = encode_newlines(chunk, start) if opts.line_index else b""
+    return meta, bloom, newlines
+
+
+def _read_file_chunks(path: Path, shard_size: int) -> Iterator[str]:
+    with open(path, encoding="utf-8") as f:
+        while chunk := f.read(shard_size):
+            yield chunk
+
+
+def _string_chunks(data: str, shard_size: int) -> Iterator[str]:
+    num_shards = max(1, math.ceil(len(data) / shard_size))
+    for i in range(num_shards):
+        yield data[i * shard_size : (i + 1) * shard_size]
+
+
+def _stream_chunks(pieces: Iterable[str], shard_size: int) -> Iterator[str]:
+    """Re-cut pieces of text into chunks of exactly *shard_size*; the last may be shorter."""
+    buf = ""
+    for piece in pieces:
+        pos = 0
+        if buf:
+            pos = shard_size - len(buf)
+            buf += piece[:pos]
+            if len(buf) < shard_size:
+                continue
+            yield buf
+        while len(piece) - pos >= shard_size:
+            yield piece[pos : pos + shard_size]
+            pos += shard_size
+        buf = piece[pos:]
+    if buf:
+        yield buf
+
+
+def _cut_point(buf: str, shard_size: int, align: str, tolerance: float) -> int:
+    """Return where to end the next aligned shard in *buf*.
+
+    Picks the last boundary that keeps the shard within *tolerance* of
+    *shard_size*, trying paragraph breaks before line breaks; without one
+    the shard is cut at exactly *shard_size*.
+    """
+    lo = max(1, int(shard_size * (1 - tolerance)))
+    hi = int(shard_size * (1 + tolerance))
+    for sep in _SEPARATORS[align]:
+        i = buf.rfind(sep, max(0, lo - len(sep)), hi)
+        if i != -1:
+            return i + len(sep)
+    return shard_size
+
+
+def _aligned_chunks(
+    pieces: Iterator[str], shard_size: int, align: str, tolerance: float
+) -> Iterator[str]:
+    """Re-cut a stream of text into shards ending on *align* boundaries."""
+    if align not in _SEPARATORS:
+        raise ValueError(f"align must be one of {sorted(_SEPARATORS)}, got {align!r}")
+    limit = int(shard_size * (1 + tolerance))
+    buf = ""
+    for piece in pieces:
+        buf += piece
+        while len(buf) > limit:
+            cut = _cut_point(buf, shard_size, align, tolerance)
+            yield buf[:cut]
+            buf = buf[cut:]
+    if buf:
+        yield buf
+
+
+def _with_lookahead(chunks: Iterator[str], size: int = 2) -> Iterator[tuple[str, str]]:
+    """Yield ``(chunk, lookahead)`` pairs, where *lookahead* is the next *size* characters.
+
+    Reads as many shards ahead of the caller as the lookahead needs, so
+    shards shorter than *size* do not cut it short.
+    """
+    ahead: deque[str] = deque()
+    while True:
+        chunk = ahead.popleft() if ahead else next(chunks, None)
+        if chunk is None:
+            return
+        while sum(map(len, ahead)) < size and (following := next(chunks, None)) is not None:
+            ahead.append(following)
+        yield chunk, "".join(ahead)[:size]
+
+
+def _ingest_chunks(
+    chunks: Iterator[str],
+    output_dir: Path,
+    source_file: str,
+    shard_size: int,
+    checkpoint_interval: int,
+    trigram_bits: int,
+    line_index: bool,
+    token_encoding: str | Any | None,
+    token_interval: int,
+    workers: int | None,
+    progress: Callable[[IngestProgress], None] | None,
+    compression: str,
+    align: str,
+    content_addressed: bool,
+    keep: Sequence[ShardMeta] = (),
+    objects_dir: Path | None = None,
+    revisions: dict[int, int] | None = None,
+    base_aux_files: dict[str, str] | None = None,
+    processes: int | None = None,
 ) -> ShardIndex:
-    """Stream a file into fixed-size shard files + meta.json.
+    """Run the reader → worker pool → writer pipeline and save the index.
+
+    The reader is *chunks*; workers encode, write and index shards in
+    parallel; this thread collects their results in shard order, appends
+    the index records and reports progress.  At most ``2 * workers`` shards
+    (or ``2 * processes``, if more) are in flight, bounding memory.
+
+    Worker threads only run in parallel where the work releases the GIL:
+    file I/O, hashing, compression and tokenization.  Trigram filters are
+    built in pure Python, so with ``processes`` they are built in a pool
+    of that many processes instead.
 
-    Never holds more than one shard in memory at a time.
+    *keep* are existing shards that precede *chunks* (see ``append``),
+    *revisions* maps the ids of re-written shards to their new
+    ``ShardMeta.revision`` and *base_aux_files* is the current index's
+    ``aux_files``.  The auxiliary files are then written to new files
+    named by ``aux_filename``: the records of *keep* are copied from the
+    current ones, which are never modified.  Auxiliary files go to
+    temporary names until every shard is written, and are removed if
+    ingest fails; ``meta.json`` and then ``meta.bin`` are replaced
+    atomically once everything else is on disk.
     """
-    path = Path(path)
-    output_dir = Path(output_dir)
+    if trigram_bits and (trigram_bits < 0 or trigram_bits % 8):
+        raise ValueError(f"trigram_bits must be a positive multiple of 8, got {trigram_bits}")
+    if compression:
+        get_codec(compression)
+        if checkpoint_interval <= 0:
+            raise ValueError("compressed shards need a positive checkpoint_interval")
     output_dir.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    encoding = get_encoding(token_encoding) if token_encoding else None
+    process_pool = None
+    if processes and trigram_bits:
+        # Forking next to the worker threads could deadlock a child.
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else None)
+        process_pool = ProcessPoolExecutor(processes, context)
+    opts = _ShardOptions(
+        (objects_dir or output_dir.parent / OBJECTS_DIR) if content_addressed else output_dir,
+        checkpoint_interval,
+        # Threads build the trigram filters only when no process pool does.
+        trigram_bits if process_pool is None else 0,
+        line_index,
+        encoding,
+        token_interval,
+        compression,
+        content_addressed,
+    )
 
-    total_length = path.stat().st_size  # byte length ≈ char length for UTF-8 ASCII
-    num_shards = max(1, math.ceil(total_length / shard_size))
-    shards: list[ShardMeta] = []
+    shards: list[ShardMeta] = list(keep)
+    bytes_written = 0
+    t0 = time.perf_counter()
+    aux: dict[str, BinaryIO] = {}
+    base = base_aux_files or {}
+    if trigram_bits:
+        size = len(keep) * (trigram_bits // 8)
+        aux[TRIGRAM_FILE] = _open_aux(output_dir, TRIGRAM_FILE, base, size)
+    if line_index:
+        size = 8 * sum(meta.num_newlines or 0 for meta in keep)
+        aux[NEWLINE_FILE] = _open_aux(output_dir, NEWLINE_FILE, base, size)
+    executor = ThreadPoolExecutor(workers, thread_name_prefix="ingest")
+    in_flight = 2 * max(workers, processes or 0)
+    pending: deque[tuple[Future, Future | None]] = deque()
 
-    with open(path, encoding="utf-8") as f:
-        for i in range(num_shards):
-            chunk = f.read(shard_size)
-            if not chunk:
-                break
-            start = i * shard_size
-            end = start + len(chunk)
-            shard_path = output_dir / f"{i:04d}.txt"
-            shard_path.write_text(chunk, encoding="utf-8")
-            shards.append(
-                ShardMeta(
-                    shard_id=i,
-                    start_offset=start,
-                    end_offset=end,
-                    byte_length=len(chunk),
+    def collect(futures: tuple[Future, Future | None]) -> None:
+        nonlocal bytes_written
+        meta, bloom, newlines = futures[0].result()
+        if futures[1] is not None:
+            bloom = futures[1].result()
+        shards.append(meta)
+        bytes_written += meta.stored_bytes
+        if TRIGRAM_FILE in aux:
+            aux[TRIGRAM_FILE].write(bloom)
+        if NEWLINE_FILE in aux:
+            aux[NEWLINE_FILE].write(newlines)
+        if progress is not None:
+            progress(
+                IngestProgress(
+                    len(shards), meta.end_offset, bytes_written, time.perf_counter() - t0
                 )
             )
 
-    actual_length = shards[-1].end_offset if shards else 0
+    start = keep[-1].end_offset if keep else 0
+    try:
+        for chunk, lookahead in _with_lookahead(chunks):
+            shard_id = len(shards) + len(pending)
+            revision = revisions.get(shard_id, 0) if revisions else 0
+            bloom = None
+            if process_pool is not None:
+                bloom = process_pool.submit(shard_bloom, chunk, lookahead, trigram_bits)
+            built = executor.submit(_build_shard, shard_id, start, chunk, lookahead, revision, opts)
+            pending.append((built, bloom))
+            start += len(chunk)
+            if len(pending) >= in_flight:
+                collect(pending.popleft())
+        while pending:
+            collect(pending.popleft())
+    except BaseException:
+        for f in aux.values():
+            f.close()
+            os.unlink(f.name)
+        raise
+    finally:
+        executor.shutdown(cancel_futures=True)
+        if process_pool is not None:
+            process_pool.shutdown(cancel_futures=True)
+    aux_files = {}
+    for name, f in aux.items():
+        stored = _publish_aux(f, output_dir, name, versioned=base_aux_files is not None)
+        if stored != name:
+            aux_files[name] = stored
+
     index = ShardIndex(
-        total_length=actual_length,
+        total_length=start,
         shard_size=shard_size,
         num_shards=len(shards),
-        source_file=str(path),
+        source_file=source_file,
         shards=shards,
+        checkpoint_interval=checkpoint_interval,
+        trigram_bits=trigram_bits,
+        line_index=line_index,
+        token_encoding=encoding.name if encoding is not None else "",
+        compression=compression,
+        align=align,
+        root_hash=root_hash(s.sha256 for s in shards),
+        content_addressed=content_addressed,
+        aux_files=aux_files,
     )
     index.save(output_dir / "meta.json")
+    index.save_binary(output_dir / "meta.bin")
     return index
 
 
+def _open_aux(output_dir: Path, name: str, base: dict[str, str], size: int) -> BinaryIO:
+    """Open a temporary file for auxiliary index *name*, starting with *size* bytes of records.
+
+    The records are copied from the file the current index stores *name*
+    under (*base* is its ``aux_files``), which is only read.
+    """
+    f = open(output_dir / f"{name}.{os.getpid()}.{threading.get_ident()}.tmp", "w+b")
+    if size:
+        with open(output_dir / base.get(name, name), "rb") as src:
+            while size and (block := src.read(min(size, 1 << 20))):
+                f.write(block)
+                size -= len(block)
+    return f
+
+
+def _publish_aux(f: BinaryIO, output_dir: Path, name: str, versioned: bool) -> str:
+    """Close a file from ``_open_aux`` and move it into place; return its stored name.
+
+    A *versioned* file is named by ``aux_filename`` after its content, so
+    it never replaces a file that an existing index uses.
+    """
+    f.close()
+    stored = name
+    if versioned:
+        with open(f.name, "rb") as written:
+            stored = aux_filename(name, hashlib.file_digest(written, "sha256").hexdigest())
+    os.replace(f.name, output_dir / stored)
+    return stored
+
+
+@contextmanager
+def _locked(directory: Path) -> Iterator[None]:
+    """Hold an exclusive ``flock`` on *directory*'s ``LOCK_FILE``."""
+    with open(directory / LOCK_FILE, "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def ingest_file(
+    path: str | Path,
+    output_dir: str | Path,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+    trigram_bits: int = 0,
+    line_index: bool = True,
+    token_encoding: str | Any | None = None,
+    token_interval: int = DEFAULT_TOKEN_INTERVAL,
+    workers: int | None = None,
+    progress: Callable[[IngestProgress], None] | None = None,
+    compression: str = "",
+    align: str = "",
+    align_tolerance: float = DEFAULT_ALIGN_TOLERANCE,
+    content_addressed: bool = False,
+    processes: int | None = None,
+) -> ShardIndex:
+    """Stream a file into shard files + index in a single pass.
+
+    One thread reads the file while a pool of ``workers`` threads (default:
+    one per CPU) encodes, writes and indexes shards; at most ``2 * workers``
+    shards are held in memory.  The threads overlap I/O, compression and
+    tokenization, but trigram filters are pure Python and hold the GIL: pass
+    ``processes`` to build them in that many worker processes.  Lengths are
+    counted in decoded characters, so non-ASCII input is handled correctly.
+    A non-zero ``trigram_bits`` also writes a per-shard trigram Bloom filter
+    of that many bits to ``trigrams.bin``, which lets ``find``/``in`` skip
+    shards.  ``line_index`` records every newline offset in ``newlines.bin``
+    for the line-oriented API.  With ``token_encoding`` (a tiktoken encoding
+    name or object) each shard's token count plus a checkpoint every
+    ``token_interval`` tokens are stored, enabling ``prompt.num_tokens`` and
+    ``prompt.tokens[a:b]``.  ``progress`` is called with an
+    ``IngestProgress`` after every shard.  ``compression`` (``"zlib"``, or
+    ``"zstd"`` with zstandard installed) stores each shard as independently
+    compressed blocks of ``checkpoint_interval`` characters, so slices only
+    decompress the blocks they touch.  The index is written both as
+    ``meta.json`` and as the binary ``meta.bin``, which backends prefer.
+    With ``align="line"`` or ``"paragraph"`` shards end on such a boundary
+    when one lies within ``align_tolerance`` (a fraction) of ``shard_size``,
+    so a line or paragraph usually lives in one shard.  With
+    ``content_addressed`` shards are stored by content hash in the
+    ``objects`` directory next to *output_dir*, which then holds only the
+    index; versions ingested side by side share their unchanged shards.
+    """
+    path = Path(path)
+    chunks = _read_file_chunks(path, shard_size)
+    if align:
+        chunks = _aligned_chunks(chunks, shard_size, align, align_tolerance)
+    return _ingest_chunks(
+        chunks,
+        Path(output_dir),
+        str(path),
+        shard_size,
+        checkpoint_interval,
+        trigram_bits,
+        line_index,
+        token_encoding,
+        token_interval,
+        workers,
+        progress,
+        compression,
+        align,
+        content_addressed,
+        processes=processes,
+    )
+
+
 def ingest_string(
     data: str,
     output_dir: str | Path,
     shard_size: int = DEFAULT_SHARD_SIZE,
+    checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL,
+    trigram_bits: int = 0,
+    line_index: bool = True,
+    token_encoding: str | Any | None = None,
+    token_interval: int = DEFAULT_TOKEN_INTERVAL,
+    workers: int | None = None,
+    progress: Callable[[IngestProgress], None] | None = None,
+    compression: str = "",
+    align: str = "",
+    align_tolerance: float = DEFAULT_ALIGN_TOLERANCE,
+    content_addressed: bool = False,
+    processes: int | None = None,
 ) -> ShardIndex:
     """Ingest a Python string into shards. Useful for testing."""
-    output_dir = Path(output_dir)
-    output_dir.mkdir(parents=True, exist_ok=True)
+    chunks = _string_chunks(data, shard_size)
+    if align and data:
+        chunks = _aligned_chunks(chunks, shard_size, align, align_tolerance)
+    return _ingest_chunks(
+        chunks,
+        Path(output_dir),
+        "<string>",
+        shard_size,
+        checkpoint_interval,
+        trigram_bits,
+        line_index,
+        token_encoding,
+        token_interval,
+        workers,
+        progress,
+        compression,
+        align,
+        content_addressed,
+        processes=processes,
+    )
 
-    total_length = len(data)
-    num_shards = max(1, math.ceil(total_length / shard_size))
-    shards: list[ShardMeta] = []
 
-    for i in range(num_shards):
-        start = i * shard_size
-        end = min(start + shard_size, total_length)
-        chunk = data[start:end]
-        shard_path = output_dir / f"{i:04d}.txt"
-        shard_path.write_text(chunk, encoding="utf-8")
-        shards.append(
-            ShardMeta(
-                shard_id=i,
-                start_offset=start,
-                end_offset=end,
-                byte_length=len(chunk),
-            )
+def append(
+    output_dir: str | Path,
+    data: str | TextIO | Iterable[str],
+    workers: int | None = None,
+    progress: Callable[[IngestProgress], None] | None = None,
+    token_encoding: str | Any | None = None,
+    token_interval: int = DEFAULT_TOKEN_INTERVAL,
+    align_tolerance: float = DEFAULT_ALIGN_TOLERANCE,
+    objects_dir: str | Path | None = None,
+    processes: int | None = None,
+) -> ShardIndex:
+    """Append *data* to an ingested corpus in place; return the new index.
+
+    *data* is a string, a text stream or an iterable of strings.  Only the
+    last shard is rewritten (filled up to ``shard_size``, or re-cut in an
+    aligned index) and new shards follow it, all with the corpus's
+    original settings, so the cost is proportional to the appended text.
+    A rewritten shard goes to a new file (``NNNN-<revision>.<ext>``) and
+    the auxiliary files are rewritten under new names recorded in the
+    index's ``aux_files``; the superseded files are left in place for
+    readers still holding the old index.  The index is replaced atomically
+    after the shards and auxiliary files, so readers see either the old
+    corpus or the new one, and a failed append leaves the corpus as it
+    was; open backends pick the new one up with ``refresh``.  Appends to
+    one directory are serialized by an ``flock`` on its ``LOCK_FILE``.
+    Pass ``token_encoding`` when the corpus's encoding is not loadable by
+    name (a custom tiktoken ``Encoding``), and ``objects_dir`` to override
+    the objects directory of a content-addressed corpus.  ``workers`` and
+    ``processes`` are as in ``ingest_file``.
+    """
+    output_dir = Path(output_dir)
+    with _locked(output_dir):
+        return _append(
+            output_dir,
+            data,
+            workers,
+            progress,
+            token_encoding,
+            token_interval,
+            align_tolerance,
+            objects_dir,
+            processes,
         )
 
-    index = ShardIndex(
-        total_length=total_length,
-        shard_size=shard_size,
-        num_shards=len(shards),
-        source_file="<string>",
-        shards=shards,
+
+def _append(
+    output_dir: Path,
+    data: str | TextIO | Iterable[str],
+    workers: int | None,
+    progress: Callable[[IngestProgress], None] | None,
+    token_encoding: str | Any | None,
+    token_interval: int,
+    align_tolerance: float,
+    objects_dir: str | Path | None,
+    processes: int | None,
+) -> ShardIndex:
+    base = ShardIndex.load_dir(output_dir)
+    keep: list[ShardMeta] = list(base.shards)
+    redo: list[ShardMeta] = []
+    # Re-process the last shard: it may be partial and may not end on an
+    # aligned boundary.  Trigram filters take in the two characters after
+    # their shard, so earlier shards that precede fewer than two characters
+    # are re-processed as well.
+    while keep and (not redo or sum(meta.byte_length for meta in redo) < 2):
+        redo.insert(0, keep.pop())
+    shard_dir = output_dir
+    if base.content_addressed:
+        shard_dir = Path(objects_dir) if objects_dir else output_dir.parent / OBJECTS_DIR
+    tail = "".join(
+        base.decode(meta.shard_id, (shard_dir / base.shard_filename(meta.shard_id)).read_bytes())
+        for meta in redo
+    )
+
+    if isinstance(data, str):
+        pieces: Iterable[str] = [data]
+    elif hasattr(data, "read"):
+        pieces = iter(lambda: data.read(base.shard_size), "")
+    else:
+        pieces = data
+    chunks = _stream_chunks(itertools.chain([tail], pieces), base.shard_size)
+    if base.align:
+        chunks = _aligned_chunks(chunks, base.shard_size, base.align, align_tolerance)
+    return _ingest_chunks(
+        chunks,
+        output_dir,
+        base.source_file,
+        base.shard_size,
+        base.checkpoint_interval,
+        base.trigram_bits,
+        base.line_index,
+        token_encoding or base.token_encoding or None,
+        token_interval,
+        workers,
+        progress,
+        base.compression,
+        base.align,
+        base.content_addressed,
+        keep=keep,
+        objects_dir=Path(objects_dir) if objects_dir else None,
+        # Re-written shards get new file names: readers holding the old
+        # index keep reading the old files, which are left in place.
+        revisions={meta.shard_id: meta.revision + 1 for meta in redo},
+        base_aux_files=base.aux_files,
+        processes=processes,
     )
-    index.save(output_dir / "meta.json")
-    return index
@@ -0,0 +1,160 @@
+"""Newline offset index and line-oriented access."""
+
+from __future__ import annotations
+
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Iterator
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from distributed_prompt.backends.base import Backend
+
+NEWLINE_FILE = "newlines.bin"
+
+
+def newline_offsets(chunk: str, base: int = 0) -> array:
+    """Return the offsets of every ``"\\n"`` in *chunk*, shifted by *base*."""
+    out = array("Q")
+    i = chunk.find("\n")
+    while i != -1:
+        out.append(base + i)
+        i = chunk.find("\n", i + 1)
+    return out
+
+
+def _to_le(offsets: array) -> bytes:
+    if sys.byteorder == "big":
+        offsets = array("Q", offsets)
+        offsets.byteswap()
+    return offsets.tobytes()
+
+
+def encode_newlines(chunk: str, base: int = 0) -> bytes:
+    """Return the ``newlines.bin`` record for a shard: its newline offsets as LE uint64."""
+    return _to_le(newline_offsets(chunk, base))
+
+
+class LineIndex:
+    """Sorted global offsets of every newline in a prompt.
+
+    Lines follow ``str.split("\\n")`` semantics: ``N`` newlines delimit
+    ``N + 1`` lines, the last of which may be empty.
+    """
+
+    def __init__(self, offsets: array, total_length: int) -> None:
+        self.offsets = offsets
+        self.total_length = total_length
+
+    @classmethod
+    def from_bytes(cls, data: bytes, total_length: int) -> LineIndex:
+        offsets = array("Q")
+        offsets.frombytes(data)
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        # An append may have extended the file past the index this reader holds.
+        del offsets[bisect_left(offsets, total_length) :]
+        return cls(offsets, total_length)
+
+    @classmethod
+    def scan(cls, backend: Backend) -> LineIndex:
+        """Build the index by reading every shard (for corpora ingested without one)."""
+        offsets = array("Q")
+        for meta in backend.index.shards:
+            offsets.extend(newline_offsets(backend.get_shard(meta.shard_id), meta.start_offset))
+        return cls(offsets, backend.index.total_length)
+
+    @property
+    def num_lines(self) -> int:
+        return len(self.offsets) + 1
+
+    def line_of(self, offset: int) -> int:
+        """Return the 0-based line number containing character *offset*."""
+        return bisect_left(self.offsets, offset)
+
+    def _normalize(self, n: int) -> int:
+        if n < 0:
+            n += self.num_lines
+        if not 0 <= n < self.num_lines:
+            raise IndexError("line number out of range")
+        return n
+
+    def offset_of_line(self, n: int) -> int:
+        """Return the character offset at which line *n* starts."""
+        n = self._normalize(n)
+        return 0 if n == 0 else self.offsets[n - 1] + 1
+
+    def line_span(self, n: int) -> tuple[int, int]:
+        """Return ``(start, end)`` of line *n*, excluding its newline."""
+        n = self._normalize(n)
+        start = 0 if n == 0 else self.offsets[n - 1] + 1
+        end = self.offsets[n] if n < len(self.offsets) else self.total_length
+        return start, end
+
+
+class Lines:
+    """Sequence view over the lines of a ``DistributedPrompt``.
+
+    ``lines[i]`` and ``lines[a:b]`` fetch only the characters of the
+    requested lines; a contiguous slice is read with a single range fetch.
+    For a slice view of a prompt (``start``/``stop``) the lines are those
+    of the window's text: the first and last may be partial lines of the
+    whole prompt, and numbering and offsets are relative to the window.
+    """
+
+    def __init__(
+        self, backend: Backend, line_index: LineIndex, start: int = 0, stop: int | None = None
+    ) -> None:
+        self._backend = backend
+        self._index = line_index
+        self._start = start
+        self._stop = line_index.total_length if stop is None else stop
+        self._first = line_index.line_of(start)
+        self._count = line_index.line_of(self._stop) - self._first + 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _normalize(self, n: int) -> int:
+        if n < 0:
+            n += self._count
+        if not 0 <= n < self._count:
+            raise IndexError("line number out of range")
+        return n
+
+    def _span(self, n: int) -> tuple[int, int]:
+        start, end = self._index.line_span(self._first + self._normalize(n))
+        return max(start, self._start), min(end, self._stop)
+
+    def line_of(self, offset: int) -> int:
+        """Return the line number containing window offset *offset*."""
+        return self._index.line_of(self._start + offset) - self._first
+
+    def offset_of_line(self, n: int) -> int:
+        """Return the window offset at which line *n* starts."""
+        return self._span(n)[0] - self._start
+
+    def __getitem__(self, key: int | slice) -> str | list[str]:
+        if isinstance(key, int):
+            start, end = self._span(key)
+            return self._backend.fetch_range(start, end)
+        if isinstance(key, slice):
+            numbers = range(*key.indices(len(self)))
+            if not numbers:
+                return []
+            if numbers.step != 1:
+                return [self[i] for i in numbers]
+            start = self._span(numbers[0])[0]
+            end = self._span(numbers[-1])[1]
+            return self._backend.fetch_range(start, end).split("\n")
+        raise TypeError(f"line indices must be integers or slices, not {type(key).__name__}")
+
+    def __iter__(self) -> Iterator[str]:
+        # Stream shard by shard rather than issuing one fetch per line.
+        carry = ""
+        for chunk in self._backend.iter_range(self._start, self._stop):
+            parts = (carry + chunk).split("\n")
+            carry = parts.pop()
+            yield from parts
+        yield carry
@@ -0,0 +1,88 @@
+"""Per-shard trigram Bloom filters for pruning substring searches."""
+
+from __future__ import annotations
+
+import zlib
+from collections.abc import Iterable
+
+from distributed_prompt.shard import ShardIndex
+
+TRIGRAM_FILE = "trigrams.bin"
+DEFAULT_TRIGRAM_BITS = 1 << 20  # 128 KiB per shard
+NUM_HASHES = 3
+
+
+def trigrams(text: str) -> set[str]:
+    """Return the set of distinct 3-character substrings of *text*."""
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _bit_positions(gram: str, bits: int) -> list[int]:
+    # Double hashing with two stable checksums; Python's hash() is salted per process.
+    data = gram.encode("utf-8")
+    h1 = zlib.crc32(data)
+    h2 = zlib.adler32(data) | 1
+    return [(h1 + i * h2) % bits for i in range(NUM_HASHES)]
+
+
+def build_bloom(grams: Iterable[str], bits: int) -> bytes:
+    """Build a Bloom filter of *bits* bits containing every gram in *grams*."""
+    bloom = bytearray(bits // 8)
+    for gram in grams:
+        for pos in _bit_positions(gram, bits):
+            bloom[pos >> 3] |= 1 << (pos & 7)
+    return bytes(bloom)
+
+
+def shard_bloom(chunk: str, lookahead: str, bits: int) -> bytes:
+    """Bloom filter for a shard.
+
+    *lookahead* is the start of the following shard: trigrams that begin in
+    this shard but cross its end are attributed to this shard, so every
+    trigram of the corpus lives in the filter of the shard where it starts.
+    """
+    return build_bloom(trigrams(chunk + lookahead[:2]), bits)
+
+
+class TrigramIndex:
+    """Read-side view over ``trigrams.bin``: one fixed-size filter per shard."""
+
+    def __init__(self, data: bytes, bits: int, index: ShardIndex) -> None:
+        self.bits = bits
+        self._data = data
+        self._index = index
+        self._stride = bits // 8
+
+    def _contains(self, shard_id: int, positions: list[int]) -> bool:
+        base = shard_id * self._stride
+        data = self._data
+        return all(data[base + (pos >> 3)] & (1 << (pos & 7)) for pos in positions)
+
+    def candidates(self, pattern: str, shard_ids: Iterable[int]) -> list[int] | None:
+        """Return the shards among *shard_ids* in which a match of *pattern* may start.
+
+        A match starting in shard ``i`` can run into the following shards,
+        so each trigram of the pattern must appear in the filter of shard
+        ``i`` or one of the shards the match could reach.  Returns ``None``
+        when the pattern is too short to prune.
+        """
+        grams = trigrams(pattern)
+        if not grams:
+            return None
+        probes = [_bit_positions(g, self.bits) for g in grams]
+        present: dict[int, list[bool]] = {}
+
+        def grams_in(sid: int) -> list[bool]:
+            if sid not in present:
+                present[sid] = [self._contains(sid, p) for p in probes]
+            return present[sid]
+
+        reach = len(pattern) - 1
+        total = self._index.total_length
+        result = []
+        for sid in shard_ids:
+            meta = self._index.shards[sid]
+            covered = self._index.lookup(meta.start_offset, min(total, meta.end_offset + reach))
+            if all(any(grams_in(s)[g] for s in covered) for g in range(len(probes))):
+                result.append(sid)
+        return result
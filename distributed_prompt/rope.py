@@ -0,0 +1,339 @@
+"""PromptRope — lazy concatenation of DistributedPrompts and strings."""
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_right
+from collections.abc import Iterable, Iterator
+
+from distributed_prompt.core import (
+    VIEW_THRESHOLD,
+    DistributedPrompt,
+    rechunk,
+    regex_windows,
+    scan_regex,
+    take_stepped,
+)
+from distributed_prompt.search import DEFAULT_MAX_MATCH, AhoCorasick, TextMatch
+
+
+class PromptRope:
+    """A str-like concatenation of ``DistributedPrompt``s and ``str``s.
+
+    ``prompt + "suffix"``, ``"prefix" + prompt`` and ``a + b`` build a rope
+    without reading any text.  A table of part start offsets maps an
+    offset to its part by bisection, so slicing costs O(log parts) plus
+    reading the covered text, and slices of at least ``view_threshold``
+    characters return another rope.  Searches run on each part (using its
+    own shard windows and trigram filters) and on the few characters
+    around each part boundary, so matches spanning parts are found too.
+
+    Prompt parts are pinned to their current window: a prompt that later
+    grows with ``extend`` does not change the rope.  Like a prompt, a rope
+    converts to its full text with ``str()`` unless it contains a whole
+    prompt, which is only previewed.
+    """
+
+    view_threshold: int = VIEW_THRESHOLD
+
+    def __init__(self, parts: Iterable[str | DistributedPrompt | PromptRope]) -> None:
+        flat: list[str | DistributedPrompt] = []
+        self._whole = False  # whether a whole prompt (not a slice view) went in
+        for part in parts:
+            if isinstance(part, PromptRope):
+                items: list[str | DistributedPrompt] = part._parts
+                self._whole |= part._whole
+            elif isinstance(part, DistributedPrompt):
+                self._whole |= part._stop is None
+                pinned = DistributedPrompt(part._backend, part._start, part._end)
+                pinned.view_threshold = part.view_threshold
+                items = [pinned]
+            elif isinstance(part, str):
+                items = [part]
+            else:
+                raise TypeError(
+                    f"can only concatenate str or DistributedPrompt, not {type(part).__name__}"
+                )
+            for item in items:
+                if not len(item):
+                    continue
+                if isinstance(item, str) and flat and isinstance(flat[-1], str):
+                    flat[-1] += item
+                else:
+                    flat.append(item)
+        self._parts = flat
+        # _starts[i] is the offset of part i; _starts[-1] is the total length.
+        self._starts = [0]
+        for item in flat:
+            self._starts.append(self._starts[-1] + len(item))
+
+    @property
+    def parts(self) -> tuple[str | DistributedPrompt, ...]:
+        return tuple(self._parts)
+
+    # -- core access -----------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self._starts[-1]
+
+    def _spans(
+        self, start: int, stop: int
+    ) -> Iterator[tuple[int, str | DistributedPrompt, int, int]]:
+        """Yield ``(part_start, part, a, b)`` for each part overlapping ``[start, stop)``.
+
+        ``[a, b)`` is the overlapping range in the part's own offsets.
+        """
+        if start >= stop:
+            return
+        i = bisect_right(self._starts, start) - 1
+        while i < len(self._parts) and self._starts[i] < stop:
+            ps = self._starts[i]
+            yield ps, self._parts[i], max(start, ps) - ps, min(stop, self._starts[i + 1]) - ps
+            i += 1
+
+    def _fetch(self, start: int, stop: int) -> str:
+        """Fetch offsets [start, stop) as a ``str``."""
+        return "".join(
+            part[a:b] if isinstance(part, str) else part._fetch(a, b)
+            for _, part, a, b in self._spans(start, stop)
+        )
+
+    def _iter_range(self, start: int, stop: int) -> Iterator[str]:
+        """Stream offsets [start, stop) as str parts and prompt shards."""
+        for _, part, a, b in self._spans(start, stop):
+            if isinstance(part, str):
+                yield part[a:b]
+            else:
+                yield from part._backend.iter_range(part._start + a, part._start + b)
+
+    def _segments(self, start: int, end: int) -> Iterator[tuple[int, int]]:
+        """Split ``[start, end)`` at part and shard boundaries."""
+        for ps, part, a, b in self._spans(start, end):
+            if isinstance(part, str):
+                yield ps + a, ps + b
+            else:
+                for x, y in part._segments(a, b):
+                    yield ps + x, ps + y
+
+    def __getitem__(self, key: int | slice) -> str | DistributedPrompt | PromptRope:
+        if isinstance(key, int):
+            if key < 0:
+                key = len(self) + key
+            if key < 0 or key >= len(self):
+                raise IndexError("index out of range")
+            return self._fetch(key, key + 1)
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                positions = range(start, stop, step)
+                if not positions:
+                    return ""
+                lo = min(positions[0], positions[-1])
+                hi = max(positions[0], positions[-1]) + 1
+                return take_stepped(self._iter_range(lo, hi), positions)
+            if stop - start >= self.view_threshold:
+                return self._view(start, stop)
+            return self._fetch(start, max(start, stop))
+        raise TypeError(f"indices must be integers or slices, not {type(key).__name__}")
+
+    def _view(self, start: int, stop: int) -> str | DistributedPrompt | PromptRope:
+        parts: list[str | DistributedPrompt] = []
+        for _, part, a, b in self._spans(start, stop):
+            if isinstance(part, str):
+                parts.append(part[a:b])
+            else:
+                view = DistributedPrompt(part._backend, part._start + a, part._start + b)
+                view.view_threshold = part.view_threshold
+                parts.append(view)
+        if len(parts) == 1:
+            return parts[0]
+        rope = PromptRope(parts)
+        rope.view_threshold = self.view_threshold
+        return rope
+
+    # -- string protocol -------------------------------------------------------
+
+    def __str__(self) -> str:
+        n = len(self)
+        if n <= 200 or not self._whole:
+            return self._fetch(0, n)
+        head = self._fetch(0, 80)
+        tail = self._fetch(n - 80, n)
+        return f"{head}...({n - 160} chars omitted)...{tail}"
+
+    def __repr__(self) -> str:
+        return f"PromptRope(length={len(self):,}, parts={len(self._parts)})"
+
+    def __format__(self, format_spec: str) -> str:
+        return format(str(self), format_spec)
+
+    def __contains__(self, item: str) -> bool:
+        return self.find(item) != -1
+
+    def finditer(self, sub: str, start: int = 0, end: int | None = None) -> Iterator[int]:
+        """Lazily yield the offset of every non-overlapping occurrence of *sub*, left to right."""
+        n = len(self)
+        if start > n:
+            return
+        start, end, _ = slice(start, end).indices(n)
+        if not sub:
+            yield from range(start, end + 1)
+            return
+        size = len(sub)
+        next_allowed = start
+        for ps, part, a, b in self._spans(start, end):
+            lo = max(a, next_allowed - ps)
+            if isinstance(part, str):
+                pos = part.find(sub, lo, b)
+                while pos != -1:
+                    yield ps + pos
+                    next_allowed = ps + pos + size
+                    pos = part.find(sub, pos + size, b)
+            elif lo < b:
+                for pos in part.finditer(sub, lo, b):
+                    yield ps + pos
+                    next_allowed = ps + pos + size
+            # At most one further match can start in this part: one that crosses its end.
+            pe = ps + b
+            if pe < end:
+                ws = max(next_allowed, ps + a, pe - size + 1)
+                pos = self._fetch(ws, min(end, pe + size - 1)).find(sub)
+                if pos != -1:
+                    yield ws + pos
+                    next_allowed = ws + pos + size
+
+    def find(self, sub: str, start: int = 0, end: int | None = None) -> int:
+        return next(self.finditer(sub, start, end), -1)
+
+    def index(self, sub: str, start: int = 0, end: int | None = None) -> int:
+        pos = self.find(sub, start, end)
+        if pos == -1:
+            raise ValueError("substring not found")
+        return pos
+
+    def rfind(self, sub: str, start: int = 0, end: int | None = None) -> int:
+        n = len(self)
+        if not sub and start > n:
+            return -1
+        start, end, _ = slice(start, end).indices(n)
+        if not sub:
+            return end if start <= end else -1
+        size = len(sub)
+        for ps, part, a, b in reversed(list(self._spans(start, end))):
+            pe = ps + b
+            if pe < end:
+                # Every match in this window crosses the end of the part.
+                ws = max(ps + a, pe - size + 1)
+                pos = self._fetch(ws, min(end, pe + size - 1)).rfind(sub)
+                if pos != -1:
+                    return ws + pos
+            pos = part.rfind(sub, a, b)
+            if pos != -1:
+                return ps + pos
+        return -1
+
+    def rindex(self, sub: str, start: int = 0, end: int | None = None) -> int:
+        pos = self.rfind(sub, start, end)
+        if pos == -1:
+            raise ValueError("substring not found")
+        return pos
+
+    def count(self, sub: str, start: int = 0, end: int | None = None) -> int:
+        return sum(1 for _ in self.finditer(sub, start, end))
+
+    def startswith(
+        self, prefix: str | tuple[str, ...], start: int = 0, end: int | None = None
+    ) -> bool:
+        if isinstance(prefix, tuple):
+            return any(self.startswith(p, start, end) for p in prefix)
+        if start > len(self):
+            return False
+        start, end, _ = slice(start, end).indices(len(self))
+        if start + len(prefix) > end:
+            return False
+        return self._fetch(start, start + len(prefix)) == prefix
+
+    def endswith(
+        self, suffix: str | tuple[str, ...], start: int = 0, end: int | None = None
+    ) -> bool:
+        if isinstance(suffix, tuple):
+            return any(self.endswith(s, start, end) for s in suffix)
+        if start > len(self):
+            return False
+        start, end, _ = slice(start, end).indices(len(self))
+        if end - len(suffix) < start:
+            return False
+        return self._fetch(end - len(suffix), end) == suffix
+
+    def find_all_of(
+        self, patterns: Iterable[str] | AhoCorasick, start: int = 0, end: int | None = None
+    ) -> Iterator[tuple[str, int]]:
+        """Lazily yield ``(pattern, offset)`` for every occurrence of any of *patterns*.
+
+        See ``DistributedPrompt.find_all_of``; the automaton runs across
+        part boundaries as it does across shard boundaries.
+        """
+        automaton = patterns if isinstance(patterns, AhoCorasick) else AhoCorasick(patterns)
+        start, end, _ = slice(start, end).indices(len(self))
+        for pattern, pos in automaton.search(self._iter_range(start, end)):
+            yield pattern, start + pos
+
+    def re_finditer(
+        self,
+        pattern: str | re.Pattern,
+        flags: int = 0,
+        start: int = 0,
+        end: int | None = None,
+        max_match: int = DEFAULT_MAX_MATCH,
+        processes: int | None = None,
+    ) -> Iterator[TextMatch]:
+        """Lazily yield non-overlapping regex matches as ``TextMatch`` objects, in order.
+
+        Parts are scanned shard by shard with ``max_match`` characters of
+        context, as in ``DistributedPrompt.re_finditer``.
+        """
+        start, end, _ = slice(start, end).indices(len(self))
+        windows = regex_windows(self._fetch, self._segments(start, end), start, end, max_match)
+        return scan_regex(pattern, flags, windows, start, processes)
+
+    def __iter__(self) -> Iterator[str]:
+        for piece in self._iter_range(0, len(self)):
+            yield from piece
+
+    def iter_chunks(self, size: int, overlap: int = 0) -> Iterator[str]:
+        """Yield consecutive chunks of *size* characters, each sharing *overlap* with the last."""
+        return rechunk(self._iter_range(0, len(self)), size, overlap)
+
+    def __add__(self, other: str | DistributedPrompt | PromptRope) -> PromptRope:
+        if not isinstance(other, (str, DistributedPrompt, PromptRope)):
+            return NotImplemented
+        return PromptRope([self, other])
+
+    def __radd__(self, other: str | DistributedPrompt) -> PromptRope:
+        if not isinstance(other, (str, DistributedPrompt)):
+            return NotImplemented
+        return PromptRope([other, self])
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, str):
+            if len(self) != len(other):
+                return False
+            fetch = lambda a, b: other[a:b]  # noqa: E731
+        elif isinstance(other, (DistributedPrompt, PromptRope)):
+            if len(self) != len(other):
+                return False
+            fetch = other._fetch
+        else:
+            return NotImplemented
+        pos = 0
+        for piece in self._iter_range(0, len(self)):
+            if piece != fetch(pos, pos + len(piece)):
+                return False
+            pos += len(piece)
+        return True
+
+    def __hash__(self):
+        raise TypeError("unhashable type: 'PromptRope'")
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
@@ -0,0 +1,120 @@
+"""Search helpers: regex scanning over shard windows and Aho–Corasick multi-pattern matching."""
+
+from __future__ import annotations
+
+import re
+from collections import deque
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+
+DEFAULT_MAX_MATCH = 4096  # characters of context shared between adjacent regex windows
+
+
+@dataclass(frozen=True)
+class TextMatch:
+    """A regex match with offsets into the searched prompt.
+
+    Mirrors the parts of ``re.Match`` that survive a process boundary.
+    """
+
+    start: int
+    end: int
+    text: str
+    groups: tuple[str | None, ...] = ()
+    named: dict[str, str | None] = field(default_factory=dict)
+
+    def span(self) -> tuple[int, int]:
+        return self.start, self.end
+
+    def group(self, key: int | str = 0) -> str | None:
+        if key == 0:
+            return self.text
+        if isinstance(key, str):
+            return self.named[key]
+        return self.groups[key - 1]
+
+
+def scan_window(
+    pattern: str, flags: int, text: str, pos: int, accept_end: int, base: int
+) -> list[TextMatch]:
+    """Find matches of *pattern* in *text* that start in ``[pos, accept_end)``.
+
+    Text before *pos* and after *accept_end* is context only, so anchors,
+    ``\\b`` and lookarounds see the neighbouring characters.  Offsets are
+    shifted by *base*.  Module-level so process pools can pickle it.
+    """
+    out = []
+    for m in re.compile(pattern, flags).finditer(text, pos):
+        if m.start() >= accept_end:
+            break
+        out.append(
+            TextMatch(base + m.start(), base + m.end(), m.group(), m.groups(), m.groupdict())
+        )
+    return out
+
+
+class AhoCorasick:
+    """Aho–Corasick automaton matching many literal patterns in one pass.
+
+    Transitions are precomputed for every character that occurs in a
+    pattern (any other character returns to the root), so each input
+    character costs one dict lookup.  ``search`` carries the automaton
+    state from one chunk to the next, so matches spanning chunk
+    boundaries are found without re-reading any text.
+    """
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        self.patterns = list(dict.fromkeys(patterns))
+        if not self.patterns:
+            raise ValueError("at least one pattern is required")
+        if not all(self.patterns):
+            raise ValueError("patterns must be non-empty")
+        goto: list[dict[str, int]] = [{}]
+        out: list[tuple[int, ...]] = [()]
+        for i, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append(())
+                state = nxt
+            out[state] += (i,)
+
+        # Breadth-first: fill failure links and complete the transitions.
+        alphabet = set("".join(self.patterns))
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            out[state] += out[fail[state]]
+            for ch, nxt in goto[state].items():
+                fail[nxt] = goto[fail[state]].get(ch, 0) if state else 0
+                queue.append(nxt)
+            if state:
+                for ch in alphabet.difference(goto[state]):
+                    target = goto[fail[state]].get(ch)
+                    if target:
+                        goto[state][ch] = target
+        self._goto = goto
+        self._out = out
+
+    def search(self, chunks: Iterable[str]) -> Iterator[tuple[str, int]]:
+        """Yield ``(pattern, offset)`` for every (possibly overlapping) occurrence.
+
+        Offsets count from the start of the first chunk; matches are
+        yielded in order of where they end.
+        """
+        goto, out, patterns = self._goto, self._out, self.patterns
+        lengths = [len(p) for p in patterns]
+        state = 0
+        pos = 0
+        for chunk in chunks:
+            for i, ch in enumerate(chunk):
+                state = goto[state].get(ch) or goto[0].get(ch, 0)
+                if out[state]:
+                    for k in out[state]:
+                        yield patterns[k], pos + i + 1 - lengths[k]
+            pos += len(chunk)
@@ -2,37 +2,291 @@
 
 from __future__ import annotations
 
+import hashlib
 import json
 import math
+import mmap
+import os
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Sequence
 from dataclasses import asdict, dataclass, field
 from pathlib import Path
+from typing import overload
+
+from distributed_prompt.compression import decompress_blocks
 
 
 @dataclass(frozen=True)
 class ShardMeta:
-    """Metadata for a single shard."""
+    """Metadata for a single shard.
+
+    ``byte_length`` is the shard length in characters (historical name).
+    ``num_bytes`` is the UTF-8 encoded size on disk and ``checkpoints`` holds
+    the byte offset of every ``ShardIndex.checkpoint_interval``-th character.
+    ``num_newlines`` counts the ``"\n"`` characters in the shard;
+    ``num_tokens`` and ``token_checkpoints`` (``(token, char)`` pairs, both
+    local to the shard) describe its tokenization.  These are
+    ``None``/empty for indexes written before they existed; pure ASCII
+    shards need no checkpoints since bytes and characters coincide.
+    In a compressed index ``blocks`` holds the stored offset of every
+    compressed block followed by the stored size, and ``checkpoints`` is
+    unused.  ``sha256`` is the hex digest of the shard's UTF-8 text
+    (independent of compression), or empty if it was not recorded.
+    ``revision`` counts how often ``append`` re-wrote the shard; each
+    revision is stored under its own file name (see ``shard_name``).
+    """
 
     shard_id: int
     start_offset: int
     end_offset: int
     byte_length: int
+    num_bytes: int | None = None
+    checkpoints: tuple[int, ...] = ()
+    num_newlines: int | None = None
+    num_tokens: int | None = None
+    token_checkpoints: tuple[tuple[int, int], ...] = ()
+    blocks: tuple[int, ...] = ()
+    sha256: str = ""
+    revision: int = 0
+
+    @property
+    def stored_bytes(self) -> int | None:
+        """Size of the shard file as stored (compressed or not)."""
+        return self.blocks[-1] if self.blocks else self.num_bytes
+
+
+BINARY_MAGIC = b"DPINDEX1"
+
+# Per-shard integer columns of a ShardTable; -1 encodes None in the nullable ones.
+_COLUMNS = ("start_offset", "byte_length", "num_bytes", "num_newlines", "num_tokens")
+_NULLABLE = frozenset({"num_bytes", "num_newlines", "num_tokens"})
+# Variable-length columns, stored CSR-style as "<name>.offsets" + "<name>.values".
+_RAGGED = ("checkpoints", "token_checkpoints", "blocks")
+OBJECTS_DIR = "objects"  # content-addressed shards, next to the version directories
+_DIGEST = 32  # bytes per sha256 in the raw "sha256" column; all zeros when absent
+
+
+def content_hash(text: str) -> str:
+    """Hex sha256 of *text* encoded as UTF-8, as recorded in ``ShardMeta.sha256``."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def root_hash(shard_hashes: Iterable[str]) -> str:
+    """Hash of the ordered per-shard hashes, identifying a prompt's whole content.
+
+    Returns ``""`` if any shard hash is missing: a root over only some
+    shards would not identify the content.
+    """
+    h = hashlib.sha256()
+    for digest in shard_hashes:
+        if not digest:
+            return ""
+        h.update(bytes.fromhex(digest))
+    return h.hexdigest()
+
+
+def shard_name(shard_id: int, compression: str = "", revision: int = 0) -> str:
+    """File name of a shard in a plain (not content-addressed) shard directory."""
+    suffix = f"-{revision}" if revision else ""
+    return f"{shard_id:04d}{suffix}.{compression or 'txt'}"
+
+
+def aux_filename(name: str, digest: str) -> str:
+    """Content-derived name of a re-written or published auxiliary file (see ``aux_files``)."""
+    stem, dot, ext = name.rpartition(".")
+    return f"{stem}-{digest[:16]}.{ext}" if dot else f"{name}-{digest[:16]}"
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def object_filename(digest: str, compression: str = "", checkpoint_interval: int = 0) -> str:
+    """Path of a content-addressed shard within the objects directory.
+
+    Objects are fanned out by the first two hex digits.  Compressed objects
+    also carry the block interval, which determines their stored bytes.
+    """
+    if compression:
+        return f"{digest[:2]}/{digest}-{checkpoint_interval}.{compression}"
+    return f"{digest[:2]}/{digest}.txt"
+
+
+def _nullable(value: int) -> int | None:
+    return None if value < 0 else value
+
+
+class ShardTable(Sequence[ShardMeta]):
+    """Column-oriented, read-only sequence of ``ShardMeta``.
+
+    Each field is held in one flat integer array (or a zero-copy view into
+    a memory-mapped ``meta.bin``), and ``ShardMeta`` objects are only built
+    when an element is accessed, so opening an index with millions of
+    shards costs no per-shard Python objects.
+    """
+
+    def __init__(self, columns: dict[str, Sequence[int] | memoryview | bytearray]) -> None:
+        self._columns = columns
+
+    @classmethod
+    def from_metas(cls, metas: Iterable[ShardMeta]) -> ShardTable:
+        columns: dict[str, array | bytearray] = {name: array("q") for name in _COLUMNS}
+        columns["sha256"] = bytearray()
+        columns["revision"] = array("q")
+        for name in _RAGGED:
+            columns[f"{name}.offsets"] = array("q", [0])
+            columns[f"{name}.values"] = array("q")
+        for meta in metas:
+            columns["start_offset"].append(meta.start_offset)
+            columns["byte_length"].append(meta.byte_length)
+            columns["revision"].append(meta.revision)
+            for name in _NULLABLE:
+                value = getattr(meta, name)
+                columns[name].append(-1 if value is None else value)
+            columns["checkpoints.values"].extend(meta.checkpoints)
+            columns["token_checkpoints.values"].extend(
+                x for pair in meta.token_checkpoints for x in pair
+            )
+            columns["blocks.values"].extend(meta.blocks)
+            columns["sha256"] += bytes.fromhex(meta.sha256) if meta.sha256 else bytes(_DIGEST)
+            for name in _RAGGED:
+                columns[f"{name}.offsets"].append(len(columns[f"{name}.values"]))
+        return cls(columns)
+
+    def column(self, name: str) -> Sequence[int]:
+        """Return the raw integer column *name* (e.g. ``"start_offset"``)."""
+        return self._columns[name]
+
+    def _ragged(self, name: str, i: int) -> Sequence[int]:
+        offsets = self._columns[f"{name}.offsets"]
+        return self._columns[f"{name}.values"][offsets[i] : offsets[i + 1]]
+
+    def __len__(self) -> int:
+        return len(self._columns["start_offset"])
+
+    def has_hashes(self) -> bool:
+        """Whether every shard has a recorded ``sha256``."""
+        column = self._columns.get("sha256")
+        if column is None:
+            return not len(self)
+        missing = bytes(_DIGEST)
+        return all(column[i : i + _DIGEST] != missing for i in range(0, len(column), _DIGEST))
+
+    def revision(self, i: int) -> int:
+        """``ShardMeta.revision`` of shard *i*, without building the ``ShardMeta``."""
+        column = self._columns.get("revision")
+        return column[i] if column is not None else 0
+
+    @overload
+    def __getitem__(self, i: int) -> ShardMeta: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> list[ShardMeta]: ...
+
+    def __getitem__(self, i: int | slice) -> ShardMeta | list[ShardMeta]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("shard index out of range")
+        c = self._columns
+        start = c["start_offset"][i]
+        length = c["byte_length"][i]
+        pairs = self._ragged("token_checkpoints", i)
+        digest = bytes(c["sha256"][i * _DIGEST : (i + 1) * _DIGEST]) if "sha256" in c else b""
+        return ShardMeta(
+            shard_id=i,
+            start_offset=start,
+            end_offset=start + length,
+            byte_length=length,
+            num_bytes=_nullable(c["num_bytes"][i]),
+            checkpoints=tuple(self._ragged("checkpoints", i)),
+            num_newlines=_nullable(c["num_newlines"][i]),
+            num_tokens=_nullable(c["num_tokens"][i]),
+            token_checkpoints=tuple(zip(pairs[::2], pairs[1::2], strict=True)),
+            blocks=tuple(self._ragged("blocks", i)),
+            sha256=digest.hex() if any(digest) else "",
+            revision=self.revision(i),
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other, strict=True))
+
+    __hash__ = None  # type: ignore[assignment]
 
 
 @dataclass
 class ShardIndex:
     """Index mapping character offsets to shards.
 
-    Supports O(1) lookup of which shard(s) contain a given byte range.
+    Supports O(1) lookup of which shard(s) contain a given byte range for
+    fixed-size shards, and O(log n) bisection over the shard start offsets
+    when ingest cut shards on line or paragraph boundaries (``align``), in
+    which case ``shard_size`` is only the target size.  ``shards`` is a
+    list of ``ShardMeta`` when built in memory or read from ``meta.json``,
+    and a ``ShardTable`` when read from ``meta.bin``.
+
+    A ``content_addressed`` index names shard files by their ``sha256``
+    (see ``object_filename``) inside a shared objects directory, so
+    corpus versions that contain the same shard store it once.
+
+    ``aux_files`` maps auxiliary file names (``trigrams.bin``, ...) to the
+    name they are stored under when it differs (see ``aux_filename``), as
+    after ``append`` or in a corpus published by ``ingest_to_s3``.
     """
 
     total_length: int
     shard_size: int
     num_shards: int
     source_file: str
-    shards: list[ShardMeta] = field(default_factory=list)
+    shards: Sequence[ShardMeta] = field(default_factory=list)
+    checkpoint_interval: int = 0
+    trigram_bits: int = 0
+    line_index: bool = False
+    token_encoding: str = ""
+    compression: str = ""
+    align: str = ""
+    root_hash: str = ""
+    content_addressed: bool = False
+    aux_files: dict[str, str] = field(default_factory=dict)
+    _starts: Sequence[int] | None = field(default=None, init=False, repr=False, compare=False)
+
+    def shard_filename(self, shard_id: int) -> str:
+        """Name of a shard's file: ``NNNN.txt``, or ``NNNN.<codec>`` when compressed.
+
+        A shard re-written by ``append`` is ``NNNN-<revision>.<ext>``.  In a
+        content-addressed index this is the ``object_filename``, relative to
+        the objects directory.
+        """
+        if self.content_addressed:
+            digest = self.shards[shard_id].sha256
+            return object_filename(digest, self.compression, self.checkpoint_interval)
+        if isinstance(self.shards, ShardTable):
+            revision = self.shards.revision(shard_id)
+        else:
+            revision = self.shards[shard_id].revision
+        return shard_name(shard_id, self.compression, revision)
+
+    def has_hashes(self) -> bool:
+        """Whether every shard has a recorded ``sha256`` (required for ``root_hash``)."""
+        if isinstance(self.shards, ShardTable):
+            return self.shards.has_hashes()
+        return all(meta.sha256 for meta in self.shards)
 
     def lookup(self, start: int, stop: int) -> list[int]:
-        """Return shard IDs covering [start, stop). O(1) via integer division."""
+        """Return shard IDs covering [start, stop).
+
+        O(1) via integer division for fixed-size shards, O(log n) via
+        bisection for aligned ones.
+        """
         if start < 0:
             start = max(0, self.total_length + start)
         if stop < 0:
@@ -41,34 +295,199 @@ class ShardIndex:
         stop = min(stop, self.total_length)
         if start >= stop:
             return []
-        first = start // self.shard_size
-        last = (stop - 1) // self.shard_size
+        if not self.align:
+            first = start // self.shard_size
+            last = (stop - 1) // self.shard_size
+            return list(range(first, last + 1))
+        starts = self.start_offsets()
+        first = bisect_right(starts, start) - 1
+        last = bisect_right(starts, stop - 1, lo=first) - 1
         return list(range(first, last + 1))
 
-    def save(self, path: str | Path) -> None:
-        """Serialize index to JSON."""
-        data = {
+    def start_offsets(self) -> Sequence[int]:
+        """Start offset of every shard, as a sorted integer sequence."""
+        if isinstance(self.shards, ShardTable):
+            return self.shards.column("start_offset")
+        if self._starts is None or len(self._starts) != len(self.shards):
+            self._starts = array("q", (meta.start_offset for meta in self.shards))
+        return self._starts
+
+    def byte_range(self, shard_id: int, offset: int, length: int) -> tuple[int, int, int] | None:
+        """Map a character slice within a shard to an encoded byte span.
+
+        Returns ``(byte_start, byte_end, skip)``: decoding stored bytes
+        ``[byte_start, byte_end)`` with ``decode`` and dropping the first
+        ``skip`` characters yields the slice.  The span is at most one
+        checkpoint interval (or compressed block) wider than the slice on
+        each side.  Returns ``None`` when the shard has no checkpoint data
+        and must be read whole.
+        """
+        meta = self.shards[shard_id]
+        step = self.checkpoint_interval
+        if self.compression:
+            first = offset // step
+            last = min(-(-(offset + length) // step), len(meta.blocks) - 1)
+            return meta.blocks[first], meta.blocks[last], offset - first * step
+        if meta.num_bytes is None:
+            return None
+        if meta.num_bytes == meta.byte_length:
+            # Pure ASCII: byte offsets equal character offsets.
+            return offset, offset + length, 0
+        if not step or not meta.checkpoints:
+            return None
+        first = offset // step
+        last = -(-(offset + length) // step)
+        byte_start = meta.checkpoints[first]
+        byte_end = meta.checkpoints[last] if last < len(meta.checkpoints) else meta.num_bytes
+        return byte_start, byte_end, offset - first * step
+
+    def decode(self, shard_id: int, data: bytes, byte_start: int = 0) -> str:
+        """Decode stored shard bytes starting at *byte_start* (a ``byte_range`` start)."""
+        if not self.compression:
+            return data.decode("utf-8")
+        blocks = self.shards[shard_id].blocks
+        first = bisect_left(blocks, byte_start)
+        last = bisect_left(blocks, byte_start + len(data))
+        return decompress_blocks(data, blocks[first : last + 1], self.compression).decode("utf-8")
+
+    def _header(self) -> dict:
+        return {
             "total_length": self.total_length,
             "shard_size": self.shard_size,
             "num_shards": self.num_shards,
             "source_file": self.source_file,
-            "shards": [asdict(s) for s in self.shards],
+            "checkpoint_interval": self.checkpoint_interval,
+            "trigram_bits": self.trigram_bits,
+            "line_index": self.line_index,
+            "token_encoding": self.token_encoding,
+            "compression": self.compression,
+            "align": self.align,
+            "root_hash": self.root_hash,
+            "content_addressed": self.content_addressed,
+            "aux_files": self.aux_files,
         }
-        Path(path).write_text(json.dumps(data, indent=2))
+
+    def to_dict(self) -> dict:
+        """Return the JSON-serialisable form of the index."""
+        return {**self._header(), "shards": [asdict(s) for s in self.shards]}
 
     @classmethod
-    def load(cls, path: str | Path) -> ShardIndex:
-        """Deserialize index from JSON."""
-        data = json.loads(Path(path).read_text())
-        shards = [ShardMeta(**s) for s in data["shards"]]
+    def from_dict(cls, data: dict, shards: Sequence[ShardMeta] | None = None) -> ShardIndex:
+        """Build an index from its JSON form; missing newer fields get defaults."""
+        if shards is None:
+            shards = [
+                ShardMeta(
+                    **{
+                        **s,
+                        "checkpoints": tuple(s.get("checkpoints", ())),
+                        "token_checkpoints": tuple(map(tuple, s.get("token_checkpoints", ()))),
+                        "blocks": tuple(s.get("blocks", ())),
+                    }
+                )
+                for s in data["shards"]
+            ]
         return cls(
             total_length=data["total_length"],
             shard_size=data["shard_size"],
             num_shards=data["num_shards"],
             source_file=data["source_file"],
             shards=shards,
+            checkpoint_interval=data.get("checkpoint_interval", 0),
+            trigram_bits=data.get("trigram_bits", 0),
+            line_index=data.get("line_index", False),
+            token_encoding=data.get("token_encoding", ""),
+            compression=data.get("compression", ""),
+            align=data.get("align", ""),
+            root_hash=data.get("root_hash", ""),
+            content_addressed=data.get("content_addressed", False),
+            aux_files=data.get("aux_files", {}),
         )
 
+    def save(self, path: str | Path) -> None:
+        """Serialize index to JSON, replacing *path* atomically."""
+        _atomic_write(Path(path), json.dumps(self.to_dict(), indent=2).encode("utf-8"))
+
+    @classmethod
+    def load(cls, path: str | Path) -> ShardIndex:
+        """Deserialize index from JSON."""
+        return cls.from_dict(json.loads(Path(path).read_text()))
+
+    def to_bytes(self) -> bytes:
+        """Serialize to the binary ``meta.bin`` format.
+
+        Layout: the 8-byte magic, the header length as a little-endian
+        uint64, a JSON header (the index fields plus the byte offset and
+        length of every column), padded to 8 bytes, then the ``ShardTable``
+        columns as little-endian int64 arrays.  The ``sha256`` column is raw
+        digest bytes (its section carries a ``"B"`` format marker), padded to
+        8 bytes.
+        """
+        table = self.shards
+        if not isinstance(table, ShardTable):
+            table = ShardTable.from_metas(table)
+        sections: dict[str, list] = {}
+        body: list[bytes] = []
+        pos = 0
+        for name, column in table._columns.items():
+            if name == "sha256":
+                raw = bytes(column)
+                sections[name] = [pos, len(raw), "B"]
+                body.append(raw + bytes(-len(raw) % 8))
+            else:
+                data = array("q", column)
+                if sys.byteorder == "big":
+                    data.byteswap()
+                sections[name] = [pos, len(data)]
+                body.append(data.tobytes())
+            pos += len(body[-1])
+        header = json.dumps({**self._header(), "sections": sections}).encode("utf-8")
+        header += b" " * (-len(header) % 8)
+        return b"".join([BINARY_MAGIC, len(header).to_bytes(8, "little"), header, *body])
+
+    @classmethod
+    def from_bytes(cls, buffer: bytes | mmap.mmap) -> ShardIndex:
+        """Load a ``meta.bin`` image; columns are zero-copy views into *buffer*."""
+        view = memoryview(buffer)
+        if bytes(view[:8]) != BINARY_MAGIC:
+            raise ValueError("not a distributed_prompt binary index")
+        header_len = int.from_bytes(view[8:16], "little")
+        header = json.loads(bytes(view[16 : 16 + header_len]))
+        base = 16 + header_len
+        columns: dict[str, Sequence[int] | memoryview] = {}
+        for name, (offset, count, *fmt) in header.pop("sections").items():
+            if fmt == ["B"]:
+                columns[name] = view[base + offset : base + offset + count]
+                continue
+            raw = view[base + offset : base + offset + 8 * count]
+            if sys.byteorder == "big":
+                column = array("q", raw)
+                column.byteswap()
+                columns[name] = column
+            else:
+                columns[name] = raw.cast("q")
+        return cls.from_dict(header, shards=ShardTable(columns))
+
+    def save_binary(self, path: str | Path) -> None:
+        """Serialize index to the binary ``meta.bin`` format, replacing *path* atomically."""
+        _atomic_write(Path(path), self.to_bytes())
+
+    @classmethod
+    def load_binary(cls, path: str | Path) -> ShardIndex:
+        """Memory-map a binary index; shard metadata is decoded on access."""
+        with open(path, "rb") as f:
+            if not f.seek(0, 2):
+                raise ValueError(f"empty index file: {path}")
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls.from_bytes(mm)
+
+    @classmethod
+    def load_dir(cls, directory: str | Path) -> ShardIndex:
+        """Load a shard directory's index, preferring ``meta.bin`` over ``meta.json``."""
+        directory = Path(directory)
+        if (directory / "meta.bin").exists():
+            return cls.load_binary(directory / "meta.bin")
+        return cls.load(directory / "meta.json")
+
     @classmethod
     def build(cls, total_length: int, shard_size: int, source_file: str = "") -> ShardIndex:
         """Build a ShardIndex from total length and shard size."""
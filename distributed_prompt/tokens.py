@@ -0,0 +1,136 @@
+"""Per-shard token counts and sparse token→character checkpoints."""
+
+from __future__ import annotations
+
+from bisect import bisect_right
+from itertools import accumulate
+from typing import TYPE_CHECKING, Any
+
+from distributed_prompt.shard import ShardTable
+
+if TYPE_CHECKING:
+    from distributed_prompt.backends.base import Backend
+
+DEFAULT_TOKEN_INTERVAL = 4096  # tokens between checkpoints
+
+_ENCODINGS: dict[str, Any] = {}
+
+
+def get_encoding(encoding: str | Any) -> Any:
+    """Resolve a tiktoken encoding by name, or register and return an ``Encoding`` object.
+
+    Encodings passed as objects are remembered by name so that indexes
+    built with them can be read back in the same process.
+    """
+    if not isinstance(encoding, str):
+        _ENCODINGS[encoding.name] = encoding
+        return encoding
+    if encoding not in _ENCODINGS:
+        import tiktoken
+
+        _ENCODINGS[encoding] = tiktoken.get_encoding(encoding)
+    return _ENCODINGS[encoding]
+
+
+def tokenize_shard(enc: Any, chunk: str, interval: int) -> tuple[int, tuple[tuple[int, int], ...]]:
+    """Tokenize one shard; return its token count and ``(token, char)`` checkpoints.
+
+    A checkpoint is placed at the first token boundary at or after every
+    *interval*-th token that also falls on a character boundary (byte-level
+    BPE may split a multi-byte character across tokens), so decoding can
+    restart there.
+    """
+    tokens = enc.encode_ordinary(chunk)
+    data = chunk.encode("utf-8")
+    checkpoints: list[tuple[int, int]] = []
+    byte_pos = 0
+    char_pos = 0
+    last_byte = 0
+    target = 0
+    for k, token_bytes in enumerate(enc.decode_tokens_bytes(tokens)):
+        if k >= target and (byte_pos == len(data) or data[byte_pos] & 0xC0 != 0x80):
+            char_pos += len(data[last_byte:byte_pos].decode("utf-8"))
+            last_byte = byte_pos
+            checkpoints.append((k, char_pos))
+            target = len(checkpoints) * interval
+        byte_pos += len(token_bytes)
+    return len(tokens), tuple(checkpoints)
+
+
+class TokenIndex:
+    """Maps token positions to character offsets using per-shard checkpoints.
+
+    Token boundaries are those of tokenizing each shard on its own, so a
+    token straddling a shard boundary in the full text counts as two.
+    """
+
+    def __init__(self, backend: Backend) -> None:
+        self._backend = backend
+        self._index = backend.index
+        self.encoding = get_encoding(self._index.token_encoding)
+        shards = self._index.shards
+        if isinstance(shards, ShardTable):
+            counts = [None if n < 0 else n for n in shards.column("num_tokens")]
+        else:
+            counts = [meta.num_tokens for meta in shards]
+        if None in counts:
+            raise ValueError("token index is incomplete: a shard has no token count")
+        # _starts[i] is the global index of shard i's first token.
+        self._starts = [0, *accumulate(counts)]
+
+    @property
+    def num_tokens(self) -> int:
+        return self._starts[-1]
+
+    def char_offset(self, token: int) -> int:
+        """Return the character offset at which token number *token* starts."""
+        if not 0 <= token <= self.num_tokens:
+            raise IndexError("token index out of range")
+        if token == self.num_tokens:
+            return self._index.total_length
+        sid = bisect_right(self._starts, token) - 1
+        meta = self._index.shards[sid]
+        local = token - self._starts[sid]
+        checkpoints = meta.token_checkpoints
+        k = bisect_right(checkpoints, (local, float("inf"))) - 1
+        ck_token, ck_char = checkpoints[k]
+        if local == ck_token:
+            return meta.start_offset + ck_char
+        window_end = checkpoints[k + 1][1] if k + 1 < len(checkpoints) else meta.byte_length
+        text = self._backend.fetch_range(
+            meta.start_offset + ck_char, meta.start_offset + window_end
+        )
+        tokens = self.encoding.encode_ordinary(text)
+        prefix = b"".join(self.encoding.decode_tokens_bytes(tokens[: local - ck_token]))
+        # A boundary inside a multi-byte character rounds down to that character.
+        return meta.start_offset + ck_char + len(prefix.decode("utf-8", errors="ignore"))
+
+
+class Tokens:
+    """Token-addressed view: ``prompt.tokens[a:b]`` returns the text of tokens ``a..b``."""
+
+    def __init__(self, backend: Backend, token_index: TokenIndex) -> None:
+        self._backend = backend
+        self._index = token_index
+
+    def __len__(self) -> int:
+        return self._index.num_tokens
+
+    def __getitem__(self, key: int | slice) -> str:
+        n = len(self)
+        if isinstance(key, int):
+            if key < 0:
+                key += n
+            if not 0 <= key < n:
+                raise IndexError("token index out of range")
+            key = slice(key, key + 1)
+        if not isinstance(key, slice):
+            raise TypeError(f"token indices must be integers or slices, not {type(key).__name__}")
+        start, stop, step = key.indices(n)
+        if step != 1:
+            raise ValueError("token slices do not support steps")
+        if start >= stop:
+            return ""
+        return self._backend.fetch_range(
+            self._index.char_offset(start), self._index.char_offset(stop)
+        )
@@ -0,0 +1,81 @@
+"""Shared test fixtures."""
+
+import hashlib
+import io
+from pathlib import Path
+
+import pytest
+
+
+class NoSuchKeyError(Exception):
+    """Mimics botocore's ``ClientError`` for a missing key."""
+
+    def __init__(self, key: str) -> None:
+        super().__init__(key)
+        self.response = {"Error": {"Code": "NoSuchKey"}}
+
+
+class FakeS3Client:
+    """Minimal in-memory stand-in for a boto3 S3 client.
+
+    Records every ``get_object``, ``head_object`` and ``upload_file`` call so
+    tests can assert on request counts and ranges.
+    """
+
+    def __init__(self) -> None:
+        self.objects: dict[tuple[str, str], bytes] = {}
+        self.metadata: dict[tuple[str, str], dict[str, str]] = {}
+        self.get_calls: list[tuple[str, str | None]] = []
+        self.head_calls: list[str] = []
+        self.upload_calls: list[str] = []
+
+    def put(self, bucket: str, key: str, data: bytes) -> None:
+        self.objects[(bucket, key)] = data
+        self.metadata.pop((bucket, key), None)
+
+    def upload_file(
+        self,
+        Filename: str,  # noqa: N803
+        Bucket: str,  # noqa: N803
+        Key: str,  # noqa: N803
+        ExtraArgs: dict | None = None,  # noqa: N803
+        Config: object = None,  # noqa: N803
+    ) -> None:
+        self.upload_calls.append(Key)
+        self.put(Bucket, Key, Path(Filename).read_bytes())
+        self.metadata[(Bucket, Key)] = dict((ExtraArgs or {}).get("Metadata", {}))
+
+    def load_dir(self, shards_dir: str | Path, bucket: str, prefix: str = "") -> None:
+        for f in sorted(Path(shards_dir).iterdir()):
+            if f.is_file():
+                key = f"{prefix}/{f.name}" if prefix else f.name
+                self.put(bucket, key, f.read_bytes())
+
+    def get_object(self, Bucket: str, Key: str, Range: str | None = None) -> dict:  # noqa: N803
+        self.get_calls.append((Key, Range))
+        if (Bucket, Key) not in self.objects:
+            raise NoSuchKeyError(Key)
+        data = self.objects[(Bucket, Key)]
+        if Range is not None:
+            first, last = Range.removeprefix("bytes=").split("-")
+            data = data[int(first) : int(last) + 1]
+        return {"Body": io.BytesIO(data), "ETag": self._etag(Bucket, Key)}
+
+    def head_object(self, Bucket: str, Key: str) -> dict:  # noqa: N803
+        self.head_calls.append(Key)
+        if (Bucket, Key) not in self.objects:
+            raise NoSuchKeyError(Key)
+        data = self.objects[(Bucket, Key)]
+        return {
+            "ContentLength": len(data),
+            "ETag": self._etag(Bucket, Key),
+            "Metadata": self.metadata.get((Bucket, Key), {}),
+        }
+
+    def _etag(self, bucket: str, key: str) -> str:
+        return f'"{hashlib.md5(self.objects[(bucket, key)]).hexdigest()}"'
+
+
+@pytest.fixture
+def fake_s3():
+    return FakeS3Client()
@@ -0,0 +1,79 @@
+"""Tests for boundary-aligned, variable-size shards."""
+
+import random
+
+import pytest
+
+from distributed_prompt import (
+    DistributedPrompt,
+    FileBackend,
+    ShardIndex,
+    ingest_file,
+    ingest_string,
+)
+
+
+def make_text(seed=3, paragraphs=40):
+    rng = random.Random(seed)
+    words = ["lorem", "ipsum", "dolor", "sit", "amet", "café", "日本"]
+    paras = []
+    for _ in range(paragraphs):
+        lines = [
+            " ".join(rng.choice(words) for _ in range(rng.randint(3, 12)))
+            for _ in range(rng.randint(1, 5))
+        ]
+        paras.append("\n".join(lines))
+    return "\n\n".join(paras)
+
+
+@pytest.mark.parametrize("align", ["line", "paragraph"])
+def test_shards_end_on_boundaries(tmp_path, align):
+    data = make_text()
+    index = ingest_string(data, tmp_path, shard_size=200, align=align, align_tolerance=0.25)
+    shards = [data[m.start_offset : m.end_offset] for m in index.shards]
+
+    assert "".join(shards) == data
+    assert all(len(s) <= 250 for s in shards)
+    assert all(s.endswith("\n") for s in shards[:-1])
+    if align == "paragraph":
+        assert sum(s.endswith("\n\n") for s in shards) > len(shards) // 2
+    assert FileBackend(tmp_path).fetch_range(0, len(data)) == data
+
+
+def test_bisect_lookup_matches_offsets(tmp_path):
+    data = make_text(seed=5)
+    index = ingest_string(data, tmp_path, shard_size=150, align="line")
+    for start in range(0, len(data), 37):
+        for stop in (start + 1, start + 90, start + 400):
+            stop = min(stop, len(data))
+            expected = [
+                m.shard_id for m in index.shards if m.start_offset < stop and m.end_offset > start
+            ]
+            assert index.lookup(start, stop) == expected
+
+    binary = ShardIndex.load_binary(tmp_path / "meta.bin")
+    assert binary.align == "line"
+    assert binary.lookup(100, 700) == index.lookup(100, 700)
+
+
+def test_aligned_prompt_api(tmp_path):
+    data = make_text(seed=9)
+    src = tmp_path / "src.txt"
+    src.write_text(data, encoding="utf-8")
+    ingest_file(src, tmp_path / "out", shard_size=180, align="paragraph", trigram_bits=1024)
+    dp = DistributedPrompt(FileBackend(tmp_path / "out"))
+
+    assert len(dp) == len(data)
+    assert dp[123:456] == data[123:456]
+    assert dp.find("café 日本") == data.find("café 日本")
+    assert dp.lines[7] == data.split("\n")[7]
+
+
+def test_hard_cut_without_boundaries(tmp_path):
+    index = ingest_string("x" * 1000, tmp_path, shard_size=100, align="line")
+    assert [m.byte_length for m in index.shards] == [100] * 10
+
+
+def test_unknown_alignment(tmp_path):
+    with pytest.raises(ValueError):
+        ingest_string("abc", tmp_path, align="word")
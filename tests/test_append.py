@@ -0,0 +1,171 @@
+"""Tests for appending to an ingested corpus in place."""
+
+import io
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
+import pytest
+
+from distributed_prompt import DistributedPrompt, FileBackend, ShardIndex, ingest_string
+from distributed_prompt.ingest import append
+
+HEAD = "".join(f"line {i}: naïve café 🙂\n" for i in range(40))
+TAIL = "".join(f"tool output {i} — 日本語\n" for i in range(60))
+
+
+def aux_files(directory):
+    index = ShardIndex.load_dir(directory)
+    names = [name for name in ("trigrams.bin", "newlines.bin") if (directory / name).exists()]
+    return {name: (directory / index.aux_files.get(name, name)).read_bytes() for name in names}
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"compression": "zlib", "checkpoint_interval": 64},
+        {"align": "line"},
+        {"trigram_bits": 256},
+    ],
+)
+def test_append_matches_full_ingest(tmp_path, options):
+    ingest_string(HEAD, tmp_path / "grown", shard_size=300, **options)
+    append(tmp_path / "grown", TAIL[:500])
+    index = append(tmp_path / "grown", TAIL[500:])
+    fresh = ingest_string(HEAD + TAIL, tmp_path / "fresh", shard_size=300, **options)
+
+    # Identical apart from the revisions of the re-written shards and the aux file names.
+    assert ShardIndex.load_dir(tmp_path / "grown") == index
+    shards = [replace(s, revision=0) for s in index.shards]
+    assert replace(index, shards=shards, aux_files={}) == fresh
+    assert any(s.revision for s in index.shards)
+    assert aux_files(tmp_path / "grown") == aux_files(tmp_path / "fresh")
+    assert FileBackend(tmp_path / "grown").fetch_range(0, len(HEAD + TAIL)) == HEAD + TAIL
+
+
+def test_append_accepts_streams(tmp_path):
+    ingest_string(HEAD, tmp_path, shard_size=300)
+    append(tmp_path, io.StringIO(TAIL))
+    index = append(tmp_path, iter(["a", "", "bc" * 400]))
+    text = HEAD + TAIL + "a" + "bc" * 400
+    assert all(s.byte_length == 300 for s in index.shards[:-1])
+    assert FileBackend(tmp_path).fetch_range(0, len(text)) == text
+
+
+def test_append_content_addressed(tmp_path):
+    v1 = ingest_string(HEAD, tmp_path / "v1", shard_size=300, content_addressed=True)
+    index = append(tmp_path / "v1", TAIL)
+    assert (
+        index.root_hash == ingest_string(HEAD + TAIL, tmp_path / "fresh", shard_size=300).root_hash
+    )
+    unchanged = v1.num_shards - 1
+    assert [s.sha256 for s in index.shards[:unchanged]] == [s.sha256 for s in v1.shards[:unchanged]]
+    assert FileBackend(tmp_path / "v1").fetch_range(0, len(HEAD + TAIL)) == HEAD + TAIL
+
+
+def test_extend_prompt(tmp_path):
+    ingest_string(HEAD, tmp_path, shard_size=300)
+    backend = FileBackend(tmp_path)
+    prompt = DistributedPrompt(backend)
+    view = prompt[10:20]
+    assert prompt[-5:] == HEAD[-5:]  # caches the partial last shard
+    assert len(prompt.lines) == HEAD.count("\n") + 1
+
+    prompt.extend(TAIL)
+    assert len(prompt) == len(HEAD + TAIL)
+    assert prompt == HEAD + TAIL
+    assert prompt[len(HEAD) - 5 : len(HEAD) + 5] == (HEAD + TAIL)[len(HEAD) - 5 : len(HEAD) + 5]
+    assert prompt.find("tool output 59") == (HEAD + TAIL).find("tool output 59")
+    assert len(prompt.lines) == (HEAD + TAIL).count("\n") + 1
+    assert view == HEAD[10:20]
+    with pytest.raises(ValueError):
+        DistributedPrompt(backend, 5).extend("x")
+
+
+def test_stale_reader_then_refresh(tmp_path):
+    ingest_string(HEAD, tmp_path, shard_size=300)
+    reader = FileBackend(tmp_path)
+    assert reader.get_shard(reader.index.num_shards - 1) == HEAD[-(len(HEAD) % 300) :]
+
+    append(tmp_path, TAIL)
+    # The old index still reads the old text, and lines past it are ignored.
+    assert reader.fetch_range(0, len(HEAD)) == HEAD
+    assert reader.line_index.num_lines == HEAD.count("\n") + 1
+
+    assert reader.refresh()
+    assert not reader.refresh()
+    assert reader.fetch_range(0, len(HEAD + TAIL)) == HEAD + TAIL
+    assert reader.line_index.num_lines == (HEAD + TAIL).count("\n") + 1
+
+
+@pytest.mark.parametrize("compression", ["", "zlib"])
+def test_stale_reader_unaffected(tmp_path, compression):
+    text = "x" * 148 + "yy"
+    ingest_string(text, tmp_path, shard_size=100, compression=compression, checkpoint_interval=16)
+    reader = FileBackend(tmp_path)
+    before = set(tmp_path.iterdir())
+
+    index = append(tmp_path, "z" * 5)
+    assert before <= set(tmp_path.iterdir())
+    assert index.shard_filename(1) == f"0001-1.{compression or 'txt'}"
+    assert reader.fetch_range(148, 150) == "yy"
+    assert reader.get_shard(1) == text[100:]
+
+
+def test_short_shards_keep_cross_shard_trigrams(tmp_path):
+    ingest_string("abcdefghij", tmp_path / "small", shard_size=1, trigram_bits=1024)
+    prompt = DistributedPrompt(FileBackend(tmp_path / "small"))
+    assert [prompt.find(s) for s in ("abc", "hij")] == [0, 7]
+
+    ingest_string("abcdefghij", tmp_path / "grown", shard_size=3, trigram_bits=1024)
+    append(tmp_path / "grown", "klmnop")
+    prompt = DistributedPrompt(FileBackend(tmp_path / "grown"))
+    assert prompt.find("ijk") == 8
+    assert "ijk" in prompt
+    assert prompt.count("ijk") == 1
+
+
+@pytest.mark.parametrize("options", [{"trigram_bits": 64}, {"align": "line", "trigram_bits": 64}])
+def test_failed_append_leaves_corpus_intact(tmp_path, options):
+    text = "".join(f"row {i} ZWV\n" for i in range(20))
+    ingest_string(text, tmp_path, shard_size=40, **options)
+    before = {p.name: p.read_bytes() for p in tmp_path.iterdir()}
+
+    def pieces():
+        yield "more rows\n" * 20
+        raise OSError("input went away")
+
+    with pytest.raises(OSError):
+        append(tmp_path, pieces())
+    after = {p.name: p.read_bytes() for p in tmp_path.iterdir()}
+    assert {name: after[name] for name in before} == before
+    assert not [name for name in after if name.endswith(".tmp")]
+    prompt = DistributedPrompt(FileBackend(tmp_path))
+    assert prompt.lines[-2] == "row 19 ZWV"
+    assert prompt.count("ZWV") == 20
+
+
+def test_stale_reader_keeps_aux_files_of_its_index(tmp_path):
+    # Re-cutting the aligned last shard moves its boundaries and so its trigram record.
+    base = ingest_string("abcdefghiZWV\n", tmp_path, shard_size=8, align="line", trigram_bits=64)
+    reader = DistributedPrompt(FileBackend(tmp_path))
+    aux = {p.name: p.read_bytes() for p in tmp_path.iterdir() if p.name.endswith("s.bin")}
+
+    index = append(tmp_path, "z\nabcdefghijklm\n")
+    assert index.shards[base.num_shards - 1].byte_length != base.shards[-1].byte_length
+    assert set(index.aux_files) == {"trigrams.bin", "newlines.bin"}
+    assert {name: (tmp_path / name).read_bytes() for name in aux} == aux
+    assert reader.find("ZWV") == 9
+    assert reader.lines[0] == "abcdefghiZWV"
+
+
+def test_concurrent_appends_are_serialized(tmp_path):
+    ingest_string(HEAD, tmp_path / "grown", shard_size=300, trigram_bits=64)
+    pieces = [f"<{i}>" * 50 for i in range(4)]
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(lambda piece: append(tmp_path / "grown", piece), pieces))
+    backend = FileBackend(tmp_path / "grown")
+    text = backend.fetch_range(0, backend.index.total_length)
+    assert sorted(text[len(HEAD) + 150 * i : len(HEAD) + 150 * (i + 1)] for i in range(4)) == pieces
+    ingest_string(text, tmp_path / "fresh", shard_size=300, trigram_bits=64)
+    assert aux_files(tmp_path / "grown") == aux_files(tmp_path / "fresh")
@@ -0,0 +1,46 @@
+"""Tests for the asyncio API."""
+
+import asyncio
+
+from distributed_prompt import DistributedPrompt, FileBackend, ingest_string
+from distributed_prompt.backends.s3_backend import S3Backend
+
+DATA = "".join(chr(ord("a") + (i * 7) % 26) for i in range(2000)) + "needle" + "z" * 500
+
+
+def test_aslice_and_afind(tmp_path):
+    ingest_string(DATA, tmp_path, shard_size=300)
+
+    async def main():
+        with FileBackend(tmp_path) as backend:
+            dp = DistributedPrompt(backend)
+            parts = await asyncio.gather(*(dp.aslice(i, i + 250) for i in range(0, len(DATA), 250)))
+            found = await dp.afind("needle")
+            tail = await dp.aslice(-10)
+            shard = await backend.aget_shard(2)
+        return parts, found, tail, shard
+
+    parts, found, tail, shard = asyncio.run(main())
+    assert "".join(parts) == DATA
+    assert found == DATA.find("needle")
+    assert tail == DATA[-10:]
+    assert shard == DATA[600:900]
+
+
+def test_concurrent_s3_sessions(fake_s3, tmp_path):
+    ingest_string(DATA, tmp_path, shard_size=300)
+    fake_s3.load_dir(tmp_path, "prompts")
+    backend = S3Backend("prompts", client=fake_s3, max_pool_connections=4)
+    dp = DistributedPrompt(backend)
+
+    async def session(i):
+        start = (i * 97) % len(DATA)
+        return start, await dp.aslice(start, start + 123)
+
+    async def main():
+        return await asyncio.gather(*(session(i) for i in range(100)))
+
+    for start, text in asyncio.run(main()):
+        assert text == DATA[start : start + 123]
+    assert backend.async_workers == 4
+    backend.close()
@@ -0,0 +1,49 @@
+"""Tests for the binary, array-backed shard index."""
+
+import pytest
+
+from distributed_prompt import FileBackend, ShardIndex, ingest_string
+from distributed_prompt.backends.s3_backend import S3Backend
+from distributed_prompt.shard import ShardTable
+
+DATA = "naïve café — 日本語 🙂\n" * 60
+
+
+def test_binary_index_matches_json(tmp_path):
+    index = ingest_string(DATA, tmp_path, shard_size=50, checkpoint_interval=8)
+    binary = ShardIndex.load_binary(tmp_path / "meta.bin")
+
+    assert isinstance(binary.shards, ShardTable)
+    assert binary == index == ShardIndex.load(tmp_path / "meta.json")
+    assert binary.shards[-1] == index.shards[-1]
+    assert binary.shards[2:4] == index.shards[2:4]
+    with pytest.raises(IndexError):
+        binary.shards[len(index.shards)]
+
+
+def test_shard_table_columns():
+    index = ShardIndex.build(100, 30)
+    table = ShardTable.from_metas(index.shards)
+    assert list(table.column("start_offset")) == [0, 30, 60, 90]
+    assert table[3].num_bytes is None
+    assert ShardIndex.from_bytes(index.to_bytes()).shards == index.shards
+
+
+def test_backends_prefer_binary_index(fake_s3, tmp_path):
+    ingest_string(DATA, tmp_path, shard_size=50, checkpoint_interval=8)
+    backend = FileBackend(tmp_path)
+    assert isinstance(backend.index.shards, ShardTable)
+    assert backend.fetch_range(40, 260) == DATA[40:260]
+
+    fake_s3.load_dir(tmp_path, "prompts")
+    s3 = S3Backend("prompts", client=fake_s3)
+    assert isinstance(s3.index.shards, ShardTable)
+    assert [key for key, _ in fake_s3.get_calls] == ["meta.bin"]
+
+
+def test_s3_falls_back_to_json(fake_s3, tmp_path):
+    ingest_string(DATA, tmp_path, shard_size=50)
+    (tmp_path / "meta.bin").unlink()
+    fake_s3.load_dir(tmp_path, "prompts")
+    s3 = S3Backend("prompts", client=fake_s3)
+    assert s3.fetch_range(0, len(DATA)) == DATA
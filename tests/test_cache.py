@@ -0,0 +1,171 @@
+"""Tests for the byte-budgeted shard cache."""
+
+import multiprocessing
+import os
+import sys
+
+import pytest
+
+from distributed_prompt import FileBackend, ingest_string
+from distributed_prompt.cache import EvictionPolicy, ShardCache, SharedShardCache
+
+
+def entry_size(n):
+    return sys.getsizeof("x" * n)
+
+
+def test_hits_misses_and_load():
+    cache = ShardCache(max_bytes=10_000)
+    loads = []
+
+    def loader(key):
+        loads.append(key)
+        return f"shard-{key}"
+
+    assert cache.get_or_load(1, loader) == "shard-1"
+    assert cache.get_or_load(1, loader) == "shard-1"
+    assert loads == [1]
+    stats = cache.stats
+    assert (stats.hits, stats.misses, stats.entries) == (1, 1, 1)
+    assert stats.hit_rate == 0.5
+
+
+def test_lru_eviction_by_bytes():
+    cache = ShardCache(max_bytes=3 * entry_size(100), policy="lru")
+    for key in "abc":
+        cache.put(key, key * 100)
+    cache.get("a")
+    cache.put("d", "d" * 100)
+    assert "b" not in cache
+    assert {"a", "c", "d"} <= {k for k in "abcd" if k in cache}
+    assert cache.stats.evictions == 1
+    assert cache.nbytes <= cache.max_bytes
+
+
+def test_lfu_eviction():
+    cache = ShardCache(max_bytes=3 * entry_size(100), policy="lfu")
+    for key in "abc":
+        cache.put(key, key * 100)
+    for _ in range(3):
+        cache.get("a")
+        cache.get("c")
+    cache.get("b")
+    cache.put("d", "d" * 100)
+    assert "b" not in cache
+    assert "a" in cache and "c" in cache
+
+
+def test_arc_keeps_frequent_entries_under_scan():
+    cache = ShardCache(max_bytes=4 * entry_size(100), policy="arc")
+    for key in ("hot1", "hot2"):
+        cache.put(key, "h" * 100)
+        cache.get(key)
+    for i in range(20):
+        cache.put(f"scan{i}", "s" * 100)
+    assert "hot1" in cache and "hot2" in cache
+    assert cache.nbytes <= cache.max_bytes
+
+
+def test_oversized_value_not_stored():
+    cache = ShardCache(max_bytes=100)
+    cache.put("big", "x" * 1000)
+    assert "big" not in cache
+    assert cache.nbytes == 0
+
+
+def test_warm_and_clear():
+    cache = ShardCache()
+    cache.warm(range(3), str)
+    assert len(cache) == 3
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes == 0
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        ShardCache(policy="fifo")
+
+
+def test_incomplete_policy_fails_at_construction():
+    class NoVictim(EvictionPolicy):
+        def insert(self, key):
+            pass
+
+        touch = remove = insert
+
+        def clear(self):
+            pass
+
+    with pytest.raises(TypeError):
+        NoVictim()
+
+
+def _put_from_child(directory, key, value):
+    SharedShardCache(directory, namespace="corpus").put(key, value)
+
+
+def test_shared_cache_across_processes(tmp_path):
+    ctx = multiprocessing.get_context("spawn")
+    proc = ctx.Process(target=_put_from_child, args=(tmp_path, 3, "héllo shard"))
+    proc.start()
+    proc.join()
+    assert proc.exitcode == 0
+
+    cache = SharedShardCache(tmp_path, namespace="corpus")
+    assert 3 in cache
+    assert cache.get(3) == "héllo shard"
+    assert cache.get(4) is None
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+def test_shared_cache_requires_namespace(tmp_path):
+    with pytest.raises(TypeError):
+        SharedShardCache(tmp_path)
+    with pytest.raises(ValueError):
+        SharedShardCache(tmp_path, namespace="")
+
+
+def test_shared_cache_evicts_least_recently_used(tmp_path):
+    cache = SharedShardCache(tmp_path, max_bytes=250, namespace="corpus")
+    for i, key in enumerate("abc"):
+        cache.put(key, key * 100)
+        os.utime(cache._path(key), ns=(i * 10**9, i * 10**9))
+    assert "a" not in cache
+    assert cache.get("c") == "c" * 100
+    assert cache.nbytes <= 250
+    assert cache.stats.evictions == 1
+
+
+def test_shared_cache_backs_file_backend(tmp_path):
+    data = "shared shard data " * 20
+    ingest_string(data, tmp_path / "shards", shard_size=50)
+    shared = SharedShardCache(tmp_path / "cache", namespace="v1")
+    first = FileBackend(tmp_path / "shards", cache=shared)
+    assert first.fetch_range(0, len(data)) == data
+
+    second = FileBackend(
+        tmp_path / "shards", cache=SharedShardCache(tmp_path / "cache", namespace="v1")
+    )
+    assert second.fetch_range(0, len(data)) == data
+    assert second.cache.stats.misses == 0
+    shared.clear()
+    assert len(shared) == 0
+
+
+def test_shared_cache_slices_without_decoding_whole_entry(tmp_path):
+    data = "naïve café 日本語 🙂\n" * 400
+    ingest_string(data, tmp_path / "shards", shard_size=3000, checkpoint_interval=64)
+    FileBackend(
+        tmp_path / "shards", cache=SharedShardCache(tmp_path / "cache", namespace="v1")
+    ).warm()
+
+    cache = SharedShardCache(tmp_path / "cache", namespace="v1")
+    backend = FileBackend(tmp_path / "shards", cache=cache)
+    assert backend.fetch_range(3100, 3110) == data[3100:3110]
+    assert backend.fetch_range(5990, 6010) == data[5990:6010]
+    assert cache.stats.misses == 0
+    assert len(cache._local) == 0  # served from byte spans of the mapped entries
+
+    assert cache.get(1) == data[3000:6000]
+    assert len(cache._local) == 1
+    assert cache.get_slice(1, 10, 5) == data[3010:3015]
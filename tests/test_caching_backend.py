@@ -0,0 +1,92 @@
+"""Tests for the read-through disk cache backend."""
+
+from dataclasses import replace
+
+from distributed_prompt import FileBackend, ingest_string
+from distributed_prompt.backends.caching_backend import CachingBackend
+from distributed_prompt.backends.s3_backend import S3Backend
+
+DATA = "".join(chr(ord("a") + i % 26) for i in range(300))
+
+
+def s3_backend(fake_s3, tmp_path, hashes=True):
+    index = ingest_string(DATA, tmp_path / "src", shard_size=100)
+    if not hashes:
+        # An index written before content hashes existed.
+        shards = [replace(meta, sha256="") for meta in index.shards]
+        replace(index, shards=shards, root_hash="").save(tmp_path / "src" / "meta.json")
+        (tmp_path / "src" / "meta.bin").unlink()
+    fake_s3.load_dir(tmp_path / "src", "prompts", "v1")
+    return S3Backend("prompts", prefix="v1", client=fake_s3)
+
+
+def shard_gets(fake_s3):
+    return [key for key, _ in fake_s3.get_calls if key.endswith(".txt")]
+
+
+def test_read_through_persists_shards(fake_s3, tmp_path):
+    backend = CachingBackend(s3_backend(fake_s3, tmp_path), tmp_path / "cache")
+    assert backend.fetch_range(50, 250) == DATA[50:250]
+    assert (tmp_path / "cache" / "0001.txt").read_text() == DATA[100:200]
+
+    # The cache directory is a valid FileBackend layout.
+    assert FileBackend(tmp_path / "cache").get_shard(1) == DATA[100:200]
+
+
+def test_warm_restart_skips_object_store(fake_s3, tmp_path):
+    CachingBackend(s3_backend(fake_s3, tmp_path), tmp_path / "cache").warm()
+    fake_s3.get_calls.clear()
+    fake_s3.head_calls.clear()
+
+    restarted = CachingBackend(
+        S3Backend("prompts", prefix="v1", client=fake_s3), tmp_path / "cache"
+    )
+    assert restarted.fetch_range(0, 300) == DATA
+    assert shard_gets(fake_s3) == []
+    # Content hashes validate the cached files locally, without HEAD requests.
+    assert fake_s3.head_calls == []
+
+
+def test_corrupted_file_is_refetched(fake_s3, tmp_path):
+    CachingBackend(s3_backend(fake_s3, tmp_path), tmp_path / "cache").warm()
+    (tmp_path / "cache" / "0001.txt").write_text(DATA[100:200].upper())
+    fake_s3.get_calls.clear()
+
+    restarted = CachingBackend(
+        S3Backend("prompts", prefix="v1", client=fake_s3), tmp_path / "cache"
+    )
+    assert restarted.fetch_range(100, 200) == DATA[100:200]
+    assert shard_gets(fake_s3) == ["v1/0001.txt"]
+
+
+def test_changed_object_is_refetched(fake_s3, tmp_path):
+    backend = s3_backend(fake_s3, tmp_path, hashes=False)
+    CachingBackend(backend, tmp_path / "cache").warm()
+    changed = DATA[100:200].upper()
+    fake_s3.put("prompts", "v1/0001.txt", changed.encode())
+    fake_s3.get_calls.clear()
+
+    restarted = CachingBackend(
+        S3Backend("prompts", prefix="v1", client=fake_s3), tmp_path / "cache"
+    )
+    assert restarted.fetch_range(100, 200) == changed
+    assert shard_gets(fake_s3) == ["v1/0001.txt"]
+
+
+def test_truncated_file_is_refetched(fake_s3, tmp_path):
+    CachingBackend(s3_backend(fake_s3, tmp_path), tmp_path / "cache", validate=False).warm()
+    (tmp_path / "cache" / "0002.txt").write_text("short")
+
+    restarted = CachingBackend(
+        S3Backend("prompts", prefix="v1", client=fake_s3), tmp_path / "cache", validate=False
+    )
+    assert restarted.fetch_range(200, 300) == DATA[200:300]
+
+
+def test_disk_budget_evicts_oldest(fake_s3, tmp_path):
+    backend = CachingBackend(s3_backend(fake_s3, tmp_path), tmp_path / "cache", max_disk_bytes=250)
+    for sid in range(3):
+        backend.get_shard(sid)
+    assert backend.disk_bytes <= 250
+    assert not (tmp_path / "cache" / "0000.txt").exists()
+    assert (tmp_path / "cache" / "0002.txt").exists()
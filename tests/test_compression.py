@@ -0,0 +1,57 @@
+"""Tests for block-compressed shards."""
+
+import pytest
+
+from distributed_prompt import DistributedPrompt, FileBackend, ShardIndex, ingest_string
+from distributed_prompt.backends.caching_backend import CachingBackend
+from distributed_prompt.backends.s3_backend import S3Backend
+
+DATA = "naïve café — 日本語 🙂 plain ascii text, repeated.\n" * 400
+
+
+def test_compressed_roundtrip(tmp_path):
+    index = ingest_string(
+        DATA, tmp_path, shard_size=5000, checkpoint_interval=512, compression="zlib"
+    )
+    assert index.compression == "zlib"
+    assert (tmp_path / "0000.zlib").exists()
+    assert not (tmp_path / "0000.txt").exists()
+    assert sum(s.stored_bytes for s in index.shards) * 3 < len(DATA.encode("utf-8"))
+    assert ShardIndex.load(tmp_path / "meta.json") == index
+
+    backend = FileBackend(tmp_path)
+    assert backend.fetch_range(0, len(DATA)) == DATA
+    for start, stop in [(0, 1), (511, 513), (4990, 5020), (7000, 7600), (len(DATA) - 3, None)]:
+        assert backend.fetch_range(start, stop or len(DATA)) == DATA[start:stop]
+
+    dp = DistributedPrompt(backend)
+    assert dp.find("日本語 🙂", 9000) == DATA.find("日本語 🙂", 9000)
+
+
+def test_slice_reads_only_touched_blocks(fake_s3, tmp_path):
+    ingest_string(DATA, tmp_path, shard_size=10000, checkpoint_interval=256, compression="zlib")
+    fake_s3.load_dir(tmp_path, "prompts")
+    backend = S3Backend("prompts", client=fake_s3)
+    meta = backend.index.shards[1]
+
+    assert backend.fetch_range(10300, 10400) == DATA[10300:10400]
+    ((key, rng),) = fake_s3.get_calls[-1:]
+    assert key == "0001.zlib"
+    assert rng == f"bytes={meta.blocks[1]}-{meta.blocks[2] - 1}"
+
+
+def test_caching_backend_keeps_compressed_files(fake_s3, tmp_path):
+    ingest_string(DATA, tmp_path / "src", shard_size=5000, compression="zlib")
+    fake_s3.load_dir(tmp_path / "src", "prompts")
+    backend = CachingBackend(S3Backend("prompts", client=fake_s3), tmp_path / "cache")
+
+    assert backend.fetch_range(0, len(DATA)) == DATA
+    assert (tmp_path / "cache" / "0001.zlib").read_bytes() == (
+        tmp_path / "src" / "0001.zlib"
+    ).read_bytes()
+    assert FileBackend(tmp_path / "cache").fetch_range(4000, 6000) == DATA[4000:6000]
+
+
+def test_unknown_codec(tmp_path):
+    with pytest.raises(ValueError):
+        ingest_string("abc", tmp_path, compression="lzma")
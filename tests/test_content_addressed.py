@@ -0,0 +1,81 @@
+"""Tests for the content-addressed shard layout shared across corpus versions."""
+
+from distributed_prompt import FileBackend, ShardIndex, ingest_string
+from distributed_prompt.backends.caching_backend import CachingBackend
+from distributed_prompt.backends.s3_backend import S3Backend, ingest_to_s3
+from distributed_prompt.cache import ShardCache
+
+V1 = "".join(chr(ord("a") + i % 26) for i in range(1000))
+V2 = V1 + "appended log line\n" * 10
+
+
+def objects(root):
+    return sorted(p for p in (root / "objects").rglob("*") if p.is_file())
+
+
+def ingest_versions(root, **kwargs):
+    a = ingest_string(V1, root / "v1", shard_size=100, content_addressed=True, **kwargs)
+    b = ingest_string(V2, root / "v2", shard_size=100, content_addressed=True, **kwargs)
+    return a, b
+
+
+def test_versions_share_objects(tmp_path):
+    v1, v2 = ingest_versions(tmp_path)
+    assert not list((tmp_path / "v1").glob("*.txt"))
+    assert len(objects(tmp_path)) == len({s.sha256 for s in [*v1.shards, *v2.shards]})
+    assert len(objects(tmp_path)) == v2.num_shards
+
+    assert ShardIndex.load_binary(tmp_path / "v2" / "meta.bin") == v2
+    assert FileBackend(tmp_path / "v1").fetch_range(0, len(V1)) == V1
+    assert FileBackend(tmp_path / "v2").fetch_range(950, 1100) == V2[950:1100]
+
+
+def test_duplicate_shards_stored_once(tmp_path):
+    index = ingest_string("x" * 1000, tmp_path / "v1", shard_size=100, content_addressed=True)
+    assert index.num_shards == 10
+    assert len(objects(tmp_path)) == 1
+    assert FileBackend(tmp_path / "v1").verify() == []
+
+
+def test_compressed_objects(tmp_path):
+    ingest_versions(tmp_path, compression="zlib", checkpoint_interval=32)
+    assert all(p.suffix == ".zlib" for p in objects(tmp_path))
+    assert FileBackend(tmp_path / "v2").fetch_range(0, len(V2)) == V2
+
+
+def test_memory_cache_shared_across_versions(tmp_path):
+    ingest_versions(tmp_path)
+    cache = ShardCache(1 << 20)
+    FileBackend(tmp_path / "v1", cache=cache).warm()
+    misses = cache.stats.misses
+
+    assert FileBackend(tmp_path / "v2", cache=cache).fetch_range(0, len(V2)) == V2
+    assert cache.stats.misses - misses == 2  # only the two new shards
+
+
+def test_s3_publish_uploads_only_new_objects(fake_s3, tmp_path):
+    v1, v2 = ingest_versions(tmp_path)
+    ingest_to_s3(tmp_path / "v1", "prompts", prefix="corpus/v1", client=fake_s3)
+    uploaded = ingest_to_s3(tmp_path / "v2", "prompts", prefix="corpus/v2", client=fake_s3)
+
+    new = {s.sha256 for s in v2.shards} - {s.sha256 for s in v1.shards}
+    assert sorted(k for k in uploaded if k.startswith("corpus/objects/")) == sorted(
+        f"corpus/objects/{v2.shard_filename(s.shard_id)}" for s in v2.shards if s.sha256 in new
+    )
+    backend = S3Backend("prompts", prefix="corpus/v2", client=fake_s3)
+    assert backend.fetch_range(0, len(V2)) == V2
+
+
+def test_disk_cache_keeps_objects_across_versions(fake_s3, tmp_path):
+    ingest_versions(tmp_path)
+    for version in ("v1", "v2"):
+        ingest_to_s3(tmp_path / version, "prompts", prefix=f"corpus/{version}", client=fake_s3)
+    cache_dir = tmp_path / "cache"
+    CachingBackend(S3Backend("prompts", prefix="corpus/v1", client=fake_s3), cache_dir).warm()
+    fake_s3.get_calls.clear()
+
+    backend = CachingBackend(S3Backend("prompts", prefix="corpus/v2", client=fake_s3), cache_dir)
+    assert backend.fetch_range(0, len(V2)) == V2
+    fetched = [key for key, _ in fake_s3.get_calls if key.startswith("corpus/objects/")]
+    assert len(fetched) == 2
+    assert FileBackend(cache_dir, objects_dir=cache_dir / "objects").verify() == []
@@ -132,3 +132,99 @@ def test_iter(tmp_path):
 def test_format(prompt):
     dp, _ = prompt
     assert f"{dp}" == str(dp)
+
+
+@pytest.fixture
+def big(tmp_path):
+    data = "".join(chr(ord("a") + (i * 11) % 26) for i in range(5000)) + "needle\nline two\n"
+    ingest_string(data, tmp_path, shard_size=300)
+    dp = DistributedPrompt(FileBackend(tmp_path))
+    dp.view_threshold = 1000
+    return dp, data
+
+
+def test_large_slice_returns_view(big):
+    dp, data = big
+    view = dp[500:4900]
+    assert isinstance(view, DistributedPrompt)
+    assert len(view) == 4400
+    assert view == data[500:4900]
+    assert view[10:20] == data[510:520]
+    assert view[-3] == data[4897]
+    assert isinstance(dp[500:1400], str)
+    assert "window=[500:4,900]" in repr(view)
+
+
+def test_nested_view_search(big):
+    dp, data = big
+    view = dp[1000:][100:]
+    assert isinstance(view, DistributedPrompt)
+    sub = data[1100:]
+    assert view.find("needle") == sub.find("needle")
+    assert view.find("abc", 50, 2000) == sub.find("abc", 50, 2000)
+    assert "needle" in view
+    assert "needle" not in dp[:4900]
+    assert view.lines[-2] == "line two"
+    assert view.line_of(len(sub) - 1) == sub.count("\n", 0, len(sub) - 1)
+
+
+def test_step_slices_read_each_shard_once(big, monkeypatch):
+    dp, data = big
+    calls = []
+    fetch = dp._backend.fetch_range
+    monkeypatch.setattr(dp._backend, "fetch_range", lambda a, b: calls.append(a) or fetch(a, b))
+    assert dp[5:4000:7] == data[5:4000:7]
+    assert len(calls) == len(dp._index.lookup(5, 4000))
+    assert dp[4000:5:-3] == data[4000:5:-3]
+    assert dp[::-1] == data[::-1]
+    assert dp[1000:3000][::5] == data[1000:3000:5]
+
+
+def test_iter_streams_by_shard(prompt, monkeypatch):
+    dp, data = prompt
+    calls = []
+    fetch = dp._backend.fetch_range
+    monkeypatch.setattr(dp._backend, "fetch_range", lambda a, b: calls.append(a) or fetch(a, b))
+    assert "".join(dp) == data
+    assert len(calls) == dp._index.num_shards
+
+
+@pytest.mark.parametrize("size,overlap", [(1, 0), (7, 0), (10, 3), (25, 24), (104, 5), (500, 10)])
+def test_iter_chunks(prompt, size, overlap):
+    dp, data = prompt
+    stride = size - overlap
+    expected = [data[i : i + size] for i in range(0, len(data), stride)]
+    while len(expected) > 1 and len(expected[-1]) <= overlap:
+        expected.pop()
+    assert list(dp.iter_chunks(size, overlap)) == expected
+
+
+def test_iter_chunks_rejects_bad_overlap(prompt):
+    dp, _ = prompt
+    with pytest.raises(ValueError):
+        next(dp.iter_chunks(5, 5))
+
+
+def test_get_many(big, monkeypatch):
+    dp, data = big
+    hits = [data.find("needle")] + list(range(0, 5000, 450))
+    ranges = [(max(0, h - 40), h + 40) for h in hits] + [(-10, None), (4000, 3000), (None, 5)]
+    calls = []
+    fetch = dp._backend.get_shard_slice
+    monkeypatch.setattr(
+        dp._backend, "get_shard_slice", lambda sid, a, b: calls.append(sid) or fetch(sid, a, b)
+    )
+    assert dp.get_many(ranges) == [data[a:b] for a, b in ranges]
+    assert sorted(calls) == sorted(set(calls))
+
+    view = dp[1000:3000]
+    assert view.get_many([(0, 10), (1990, 2010)]) == [data[1000:1010], data[2990:3000]]
+
+
+def test_view_formats_in_full(big):
+    dp, data = big
+    view = dp[100:4100]
+    assert isinstance(view, DistributedPrompt)
+    assert str(view) == data[100:4100]
+    assert f"Context: {view}" == "Context: " + data[100:4100]
+    assert "omitted" in str(dp)
@@ -1,5 +1,7 @@
 """Tests for FileBackend."""
 
+import pytest
+
 from distributed_prompt import FileBackend, ingest_string
 
 
@@ -35,20 +37,22 @@ def test_empty_range(tmp_path):
 
 
 def test_cache_behavior(tmp_path):
-    """Reading the same shard twice should hit the LRU cache."""
+    """Reading the same whole shard twice should hit the LRU cache."""
     data = "abcdefghij" * 10
     ingest_string(data, tmp_path, shard_size=10)
-    backend = FileBackend(tmp_path, cache_size=4)
+    backend = FileBackend(tmp_path, cache_bytes=4096)
 
     # First read
-    r1 = backend.fetch_range(0, 5)
-    # Second read from same shard — should be cached
-    r2 = backend.fetch_range(5, 10)
-    assert r1 == "abcde"
-    assert r2 == "fghij"
+    r1 = backend.fetch_range(0, 10)
+    # Second read of the same shard — should be cached
+    r2 = backend.fetch_range(10, 20)
+    r3 = backend.fetch_range(0, 10)
+    assert r1 == r3 == "abcdefghij"
+    assert r2 == "abcdefghij"
 
-    info = backend._read_shard.cache_info()
-    assert info.hits >= 1
+    stats = backend.cache.stats
+    assert stats.hits >= 1
+    assert stats.misses == 2
 
 
 def test_get_shard(tmp_path):
@@ -65,3 +69,58 @@ def test_get_shard_slice(tmp_path):
     backend = FileBackend(tmp_path)
     assert backend.get_shard_slice(0, 2, 3) == "234"
     assert backend.get_shard_slice(1, 0, 2) == "56"
+
+
+def test_partial_slice_bypasses_cache(tmp_path):
+    """Partial slices are served from the memory map without caching the shard."""
+    data = "abcdefghij" * 10
+    ingest_string(data, tmp_path, shard_size=50)
+    backend = FileBackend(tmp_path)
+    assert backend.fetch_range(3, 7) == data[3:7]
+    assert len(backend.cache) == 0
+
+
+def test_non_ascii_slices(tmp_path):
+    """Checkpointed slices decode correctly across multi-byte characters."""
+    data = "héllo wörld ✓ 日本語テキスト 🙂 " * 20
+    ingest_string(data, tmp_path, shard_size=97, checkpoint_interval=8)
+    backend = FileBackend(tmp_path)
+    for start in range(0, len(data), 13):
+        for length in (1, 5, 40, 120):
+            assert backend.fetch_range(start, start + length) == data[start : start + length]
+
+
+def test_parallel_fetch_preserves_order(tmp_path):
+    data = "".join(chr(ord("a") + i % 26) for i in range(500))
+    ingest_string(data, tmp_path, shard_size=7)
+    with FileBackend(tmp_path, max_workers=4) as backend:
+        assert backend.fetch_range(3, 497) == data[3:497]
+        assert backend.fetch_range(0, len(data)) == data
+
+
+def test_cache_byte_budget(tmp_path):
+    """The cache evicts whole shards to stay within its byte budget."""
+    data = "x" * 1000
+    ingest_string(data, tmp_path, shard_size=100)
+    backend = FileBackend(tmp_path, cache_bytes=400)
+    assert backend.fetch_range(0, 1000) == data
+    assert backend.cache.nbytes <= 400
+    assert backend.cache.stats.evictions > 0
+
+
+def test_warm(tmp_path):
+    ingest_string("0123456789", tmp_path, shard_size=3)
+    backend = FileBackend(tmp_path)
+    backend.warm([0, 2])
+    assert 0 in backend.cache and 2 in backend.cache and 1 not in backend.cache
+    backend.cache.clear()
+    assert len(backend.cache) == 0
+
+
+def test_deprecated_cache_size(tmp_path):
+    ingest_string("x" * 1000, tmp_path, shard_size=100)
+    with pytest.warns(DeprecationWarning, match="cache_size"):
+        backend = FileBackend(tmp_path, cache_size=3)
+    assert backend.fetch_range(0, 1000) == "x" * 1000
+    assert len(backend.cache) == 3
+    assert backend.cache.stats.evictions == 7
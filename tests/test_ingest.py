@@ -1,5 +1,7 @@
 """Tests for the ingestion pipeline."""
 
+import pytest
+
 from distributed_prompt import FileBackend, ShardIndex, ingest_file, ingest_string
 
 
@@ -68,3 +70,76 @@ def test_shard_index_save_load_roundtrip(tmp_path):
     assert reloaded.total_length == index.total_length
     assert reloaded.num_shards == index.num_shards
     assert len(reloaded.shards) == len(index.shards)
+
+
+def test_ingest_file_non_ascii(tmp_path):
+    """Lengths are counted in characters, not bytes."""
+    src = tmp_path / "source.txt"
+    data = "naïve café — 日本語 🙂\n" * 50
+    src.write_text(data, encoding="utf-8")
+
+    out = tmp_path / "shards"
+    index = ingest_file(src, out, shard_size=64, checkpoint_interval=16)
+
+    assert index.total_length == len(data)
+    assert index.shards[-1].end_offset == len(data)
+    assert sum(s.num_bytes for s in index.shards) == len(data.encode("utf-8"))
+    backend = FileBackend(out)
+    assert backend.fetch_range(0, len(data)) == data
+    assert backend.fetch_range(100, 130) == data[100:130]
+
+
+def test_ascii_shards_have_no_checkpoints(tmp_path):
+    index = ingest_string("plain ascii " * 10, tmp_path, shard_size=50, checkpoint_interval=8)
+    assert all(s.checkpoints == () for s in index.shards)
+    assert all(s.num_bytes == s.byte_length for s in index.shards)
+
+
+def test_load_legacy_index(tmp_path):
+    """meta.json written before checkpoints existed still loads and reads."""
+    import json
+
+    ingest_string("abcdefghij", tmp_path, shard_size=4)
+    meta = json.loads((tmp_path / "meta.json").read_text())
+    del meta["checkpoint_interval"]
+    for s in meta["shards"]:
+        del s["num_bytes"], s["checkpoints"]
+    (tmp_path / "meta.json").write_text(json.dumps(meta))
+    (tmp_path / "meta.bin").unlink()
+
+    backend = FileBackend(tmp_path)
+    assert backend.index.shards[0].num_bytes is None
+    assert backend.fetch_range(2, 7) == "cdefg"
+
+
+@pytest.mark.parametrize("pool", [{"workers": 4}, {"workers": 2, "processes": 2}])
+def test_parallel_ingest_is_byte_identical(tmp_path, pool):
+    src = tmp_path / "source.txt"
+    src.write_text("naïve café — 日本語 🙂\nplain line\n" * 200, encoding="utf-8")
+    serial = ingest_file(src, tmp_path / "serial", shard_size=97, trigram_bits=1024, workers=1)
+    parallel = ingest_file(src, tmp_path / "parallel", shard_size=97, trigram_bits=1024, **pool)
+
+    assert parallel.shards == serial.shards
+    for name in sorted(p.name for p in (tmp_path / "serial").iterdir()):
+        if name not in ("meta.json", "meta.bin"):
+            assert (tmp_path / "parallel" / name).read_bytes() == (
+                tmp_path / "serial" / name
+            ).read_bytes(), name
+
+
+def test_ingest_reports_progress(tmp_path):
+    reports = []
+    index = ingest_string("x" * 95, tmp_path, shard_size=10, workers=2, progress=reports.append)
+
+    assert [p.shards_done for p in reports] == list(range(1, index.num_shards + 1))
+    assert reports[-1].chars == 95
+    assert reports[-1].bytes_written == 95
+    assert reports[-1].mb_per_s >= 0
+
+
+def test_ingest_empty_file(tmp_path):
+    src = tmp_path / "empty.txt"
+    src.write_text("")
+    index = ingest_file(src, tmp_path / "out")
+    assert index.num_shards == 0
+    assert index.total_length == 0
@@ -0,0 +1,49 @@
+"""Tests for the newline index and line-oriented API."""
+
+import pytest
+
+from distributed_prompt import DistributedPrompt, FileBackend, ingest_string
+
+DATA = "".join(f"line {i}: {'x' * (i % 7)}\n" for i in range(200)) + "tail without newline"
+
+
+@pytest.fixture(params=[True, False], ids=["indexed", "scanned"])
+def prompt(request, tmp_path):
+    ingest_string(DATA, tmp_path, shard_size=64, line_index=request.param)
+    return DistributedPrompt(FileBackend(tmp_path))
+
+
+def test_lines_match_split(prompt):
+    expected = DATA.split("\n")
+    assert len(prompt.lines) == len(expected)
+    assert prompt.lines[0] == expected[0]
+    assert prompt.lines[-1] == expected[-1]
+    assert prompt.lines[50:60] == expected[50:60]
+    assert prompt.lines[190:] == expected[190:]
+    assert prompt.lines[::37] == expected[::37]
+    assert prompt.lines[5:5] == []
+    assert list(prompt.lines) == expected
+
+
+def test_line_of_and_offset_of_line(prompt):
+    for offset in (0, 1, 10, 500, 1234, len(DATA) - 1, len(DATA)):
+        assert prompt.line_of(offset) == DATA.count("\n", 0, offset)
+    for n in (0, 1, 99, 200):
+        start = prompt.offset_of_line(n)
+        assert DATA[start:].split("\n", 1)[0] == DATA.split("\n")[n]
+    with pytest.raises(IndexError):
+        prompt.offset_of_line(10_000)
+
+
+def test_splitlines_streaming(tmp_path):
+    data = "a\r\nbb\rccc\n\ndddd\x0beeeee f\r"
+    ingest_string(data, tmp_path, shard_size=3)
+    dp = DistributedPrompt(FileBackend(tmp_path))
+    assert list(dp.splitlines()) == data.splitlines()
+    assert list(dp.splitlines(keepends=True)) == data.splitlines(keepends=True)
+
+
+def test_newline_counts_in_meta(tmp_path):
+    index = ingest_string(DATA, tmp_path, shard_size=64)
+    assert sum(s.num_newlines for s in index.shards) == DATA.count("\n")
+    assert (tmp_path / "newlines.bin").stat().st_size == 8 * DATA.count("\n")
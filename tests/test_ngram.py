@@ -0,0 +1,66 @@
+"""Tests for trigram-pruned search."""
+
+import random
+
+import pytest
+
+from distributed_prompt import DistributedPrompt, FileBackend, ingest_file, ingest_string
+
+
+def make_corpus(n=5000, seed=7):
+    rng = random.Random(seed)
+    words = ["alpha", "beta", "gamma", "delta", "épsilon", "zeta", "theta", "iota"]
+    return " ".join(rng.choice(words) for _ in range(n // 6))[:n]
+
+
+class CountingBackend(FileBackend):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+
+    def fetch_range(self, start, stop):
+        self.calls += 1
+        return super().fetch_range(start, stop)
+
+
+@pytest.fixture
+def indexed(tmp_path):
+    data = make_corpus() + " needle-in-the-haystack " + make_corpus(seed=8)
+    ingest_string(data, tmp_path, shard_size=200, trigram_bits=8192)
+    return DistributedPrompt(CountingBackend(tmp_path)), data
+
+
+def test_find_matches_str(indexed):
+    dp, data = indexed
+    for sub in ["needle", "haystack", "alpha beta", "épsilon zeta", "zzz", "ta", "a", ""]:
+        assert dp.find(sub) == data.find(sub), sub
+        assert (sub in dp) == (sub in data)
+    assert dp.find("gamma", 1000, 3000) == data.find("gamma", 1000, 3000)
+
+
+def test_cross_boundary_matches(tmp_path):
+    data = "".join(chr(ord("a") + (i * 7) % 26) for i in range(1000))
+    ingest_string(data, tmp_path, shard_size=10, trigram_bits=1024)
+    dp = DistributedPrompt(FileBackend(tmp_path))
+    for start in range(0, 990, 37):
+        sub = data[start : start + 9]
+        assert dp.find(sub) == data.find(sub)
+
+
+def test_rare_pattern_prunes_shards(indexed):
+    dp, data = indexed
+    backend = dp._backend
+    assert dp.find("needle-in-the") == data.find("needle-in-the")
+    assert backend.calls < backend.index.num_shards // 4
+
+
+def test_ingest_file_writes_filters(tmp_path):
+    src = tmp_path / "src.txt"
+    src.write_text(make_corpus(3000), encoding="utf-8")
+    index = ingest_file(src, tmp_path / "out", shard_size=500, trigram_bits=4096)
+    assert (tmp_path / "out" / "trigrams.bin").stat().st_size == index.num_shards * 512
+
+
+def test_invalid_bits(tmp_path):
+    with pytest.raises(ValueError):
+        ingest_string("abc", tmp_path, trigram_bits=1001)
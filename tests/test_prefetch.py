@@ -0,0 +1,87 @@
+"""Tests for sequential readahead."""
+
+import sys
+
+from distributed_prompt import DistributedPrompt, FileBackend, ingest_string
+from distributed_prompt.backends.prefetch import Prefetcher
+from distributed_prompt.shard import ShardIndex
+
+
+def test_sequential_scan_is_prefetched(tmp_path):
+    data = "".join(chr(ord("a") + i % 26) for i in range(100))
+    ingest_string(data, tmp_path, shard_size=10)
+    with FileBackend(tmp_path, readahead=2) as backend:
+        for sid in range(10):
+            meta = backend.index.shards[sid]
+            assert (
+                backend.fetch_range(meta.start_offset, meta.end_offset)
+                == data[meta.start_offset : meta.end_offset]
+            )
+        # The first two reads establish the pattern; the rest come from readahead.
+        assert backend.prefetcher.hits == 8
+
+
+def test_random_access_cancels_readahead():
+    index = ShardIndex.build(100, 10)
+    loaded = []
+    prefetcher = Prefetcher(lambda sid: loaded.append(sid) or str(sid), index, depth=3)
+    prefetcher.observe([0])
+    prefetcher.observe([1])
+    assert prefetcher.take(2) == "2"
+    prefetcher.observe([7])
+    assert prefetcher.take(3) is None
+    prefetcher.close()
+
+
+def test_reads_within_a_shard_are_not_sequential():
+    index = ShardIndex.build(100, 10)
+    loaded = []
+    prefetcher = Prefetcher(lambda sid: loaded.append(sid) or str(sid), index, depth=2)
+    prefetcher.observe([0])
+    prefetcher.observe([0])
+    prefetcher.close()
+    assert loaded == []
+
+    prefetcher = Prefetcher(str, index, depth=2)
+    prefetcher.observe([0])
+    prefetcher.observe([0, 1])
+    prefetcher.observe([1])  # still in the shard the scan reached
+    assert prefetcher.take(2) == "2"
+    prefetcher.close()
+
+
+def test_readahead_respects_byte_cap():
+    index = ShardIndex.build(100, 10)
+    # Without num_bytes a shard may be non-ASCII: up to 4 bytes per character.
+    shard = sys.getsizeof("") + 4 * 10
+    prefetcher = Prefetcher(str, index, depth=4, max_bytes=2 * shard + 5)
+    prefetcher.observe([0])
+    prefetcher.observe([1])
+    assert prefetcher.take(2) == "2"
+    assert prefetcher.take(3) == "3"
+    assert prefetcher.take(4) is None
+    prefetcher.close()
+
+
+def test_scans_with_readahead(tmp_path):
+    data = "abcdefghijklmnopqrstuvwxyz" * 4
+    ingest_string(data, tmp_path, shard_size=10)
+    dp = DistributedPrompt(FileBackend(tmp_path, readahead=3))
+    assert "yzab" in dp
+    assert dp.find("xyz", 30) == data.find("xyz", 30)
+    assert dp == data
+
+
+def test_budget_counts_decoded_size(tmp_path):
+    # Compresses to a fraction of its decoded size, which is what readahead holds.
+    ingest_string(
+        "a" * 4000, tmp_path, shard_size=1000, compression="zlib", checkpoint_interval=100
+    )
+    index = ShardIndex.load_dir(tmp_path)
+    assert index.shards[1].stored_bytes < 200
+    prefetcher = Prefetcher(lambda sid: "a" * 1000, index, depth=3, max_bytes=1500)
+    prefetcher.observe([0])
+    prefetcher.observe([1])
+    assert prefetcher.take(2) is not None
+    assert prefetcher.take(3) is None
+    prefetcher.close()
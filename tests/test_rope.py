@@ -0,0 +1,131 @@
+"""Tests for PromptRope, the lazy concatenation of prompts and strings."""
+
+import re
+
+import pytest
+
+from distributed_prompt import DistributedPrompt, FileBackend, PromptRope, ingest_string
+
+A = "alpha beta gamma delta\n" * 5
+B = "epsilon zeta eta theta\n" * 5
+
+
+@pytest.fixture
+def rope(tmp_path):
+    ingest_string(A, tmp_path / "a", shard_size=10)
+    ingest_string(B, tmp_path / "b", shard_size=10)
+    a = DistributedPrompt(FileBackend(tmp_path / "a"))
+    b = DistributedPrompt(FileBackend(tmp_path / "b"))
+    rope = "<<" + a + "|sep|" + DistributedPrompt(b._backend, 3) + a[:40] + ">>"
+    return rope, "<<" + A + "|sep|" + B[3:] + A[:40] + ">>"
+
+
+def test_concatenation_is_lazy(rope):
+    r, text = rope
+    assert isinstance(r, PromptRope)
+    assert len(r) == len(text)
+    assert [type(p).__name__ for p in r.parts] == [
+        "str",
+        "DistributedPrompt",
+        "str",
+        "DistributedPrompt",
+        "str",  # a[:40] is below the view threshold, so merged with ">>"
+    ]
+    assert r == text
+    assert str(r) == text[:80] + f"...({len(text) - 160} chars omitted)..." + text[-80:]
+
+
+def test_slicing_across_parts(rope):
+    r, text = rope
+    for sl in [slice(0, 5), slice(1, 120), slice(110, 130), slice(-50, None), slice(None)]:
+        assert r[sl] == text[sl]
+    assert r[::7] == text[::7]
+    assert r[200:3:-3] == text[200:3:-3]
+    assert r[len(A) + 2] == text[len(A) + 2]
+    with pytest.raises(IndexError):
+        r[len(text)]
+
+
+def test_views(rope):
+    r, text = rope
+    r.view_threshold = 20
+    view = r[1:150]
+    assert isinstance(view, PromptRope)
+    assert view == text[1:150]
+    assert view[100:140] == text[101:141]
+    assert isinstance(r[10:40], DistributedPrompt)  # inside one part
+
+
+@pytest.mark.parametrize(
+    "sub", ["a", "delta\n|se", ">>", "\n|sep|il", "ta\nalp", "a\n", "missing", ""]
+)
+def test_search_matches_str(rope, sub):
+    r, text = rope
+    assert r.find(sub) == text.find(sub)
+    assert r.rfind(sub) == text.rfind(sub)
+    assert r.count(sub) == text.count(sub)
+    assert (sub in r) == (sub in text)
+    assert r.find(sub, 20, 130) == text.find(sub, 20, 130)
+    assert r.rfind(sub, 20, 130) == text.rfind(sub, 20, 130)
+    assert r.count(sub, 20, 130) == text.count(sub, 20, 130)
+
+
+def test_finditer_non_overlapping_across_boundary(tmp_path):
+    ingest_string("xaa", tmp_path, shard_size=2)
+    r = DistributedPrompt(FileBackend(tmp_path)) + "aax"
+    assert list(r.finditer("aa")) == [1, 3]
+    assert r.count("aa") == "xaaaax".count("aa")
+    with pytest.raises(ValueError):
+        r.index("zz")
+
+
+def test_startswith_endswith(rope):
+    r, text = rope
+    assert r.startswith("<<alpha")
+    assert r.endswith(("nope", A[30:40] + ">>"))
+    assert r.startswith("|sep|ilo", len(A) + 2)
+    assert r.endswith("delta\n|se", 0, len(A) + 5)
+    assert not r.startswith("x" * 1000)
+
+
+def test_find_all_of_and_regex(rope):
+    r, text = rope
+    patterns = ["delta\n|se", "|sep|", "theta"]
+    expected = sorted(
+        (m.start(), p) for p in patterns for m in re.finditer(f"(?={re.escape(p)})", text)
+    )
+    assert sorted((pos, p) for p, pos in r.find_all_of(patterns)) == expected
+    assert [m.start for m in r.re_finditer(r"a\n\w+", max_match=16)] == [
+        m.start() for m in re.finditer(r"a\n\w+", text)
+    ]
+    assert [m.group() for m in r.re_finditer(r"\|sep\|\w+")] == ["|sep|ilon"]
+
+
+def test_iteration_and_chunks(rope):
+    r, text = rope
+    assert "".join(r) == text
+    assert list(r.iter_chunks(32, 8)) == list(text[i : i + 32] for i in range(0, len(text) - 8, 24))
+
+
+def test_equality(rope, tmp_path):
+    r, text = rope
+    ingest_string(text, tmp_path / "whole", shard_size=7)
+    whole = DistributedPrompt(FileBackend(tmp_path / "whole"))
+    assert r == whole
+    assert whole == r
+    assert r == PromptRope([text[:50], text[50:]])
+    assert r != text[:-1] + "!"
+    with pytest.raises(TypeError):
+        hash(r)
+    with pytest.raises(TypeError):
+        r + 1
+
+
+def test_str_previews_only_whole_prompts(rope):
+    r, text = rope
+    r.view_threshold = 20
+    view = r[1:250]
+    assert isinstance(view, PromptRope)
+    assert str(view) == f"{view}" == text[1:250]
+    assert str("> " + view) == "> " + text[1:250]
+    assert "omitted" in str(r)
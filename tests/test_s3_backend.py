@@ -0,0 +1,146 @@
+"""Tests for S3Backend against an in-memory object store."""
+
+from distributed_prompt import FileBackend, ingest_string
+from distributed_prompt.backends.s3_backend import S3Backend, ingest_to_s3
+from distributed_prompt.ingest import append
+
+
+def make_backend(fake_s3, tmp_path, data, **kwargs):
+    ingest_string(data, tmp_path, shard_size=kwargs.pop("shard_size", 100), checkpoint_interval=8)
+    fake_s3.load_dir(tmp_path, "prompts", "v1")
+    return S3Backend("prompts", prefix="v1", client=fake_s3, **kwargs)
+
+
+def test_full_read(fake_s3, tmp_path):
+    data = "the quick brown fox jumps over the lazy dog " * 10
+    backend = make_backend(fake_s3, tmp_path, data)
+    assert backend.index.total_length == len(data)
+    assert backend.fetch_range(0, len(data)) == data
+
+
+def test_small_slice_uses_range_request(fake_s3, tmp_path):
+    data = "0123456789" * 30
+    backend = make_backend(fake_s3, tmp_path, data)
+    fake_s3.get_calls.clear()
+
+    assert backend.fetch_range(105, 110) == data[105:110]
+    assert fake_s3.get_calls == [("v1/0001.txt", "bytes=5-9")]
+
+
+def test_non_ascii_range_request(fake_s3, tmp_path):
+    data = "日本語のテキスト、éèê — 🙂 " * 20
+    backend = make_backend(fake_s3, tmp_path, data)
+    for start in range(0, len(data) - 10, 7):
+        assert backend.fetch_range(start, start + 10) == data[start : start + 10]
+    assert any(r is not None for _, r in fake_s3.get_calls)
+
+
+def test_large_slice_fetches_whole_object(fake_s3, tmp_path):
+    data = "abcdefghij" * 30
+    backend = make_backend(fake_s3, tmp_path, data)
+    fake_s3.get_calls.clear()
+
+    assert backend.fetch_range(10, 90) == data[10:90]
+    assert backend.fetch_range(0, 5) == data[0:5]
+    assert fake_s3.get_calls[0] == ("v1/0000.txt", None)
+
+
+def test_parallel_multi_shard_fetch(fake_s3, tmp_path):
+    import threading
+    import time
+
+    data = "".join(chr(ord("a") + i % 26) for i in range(1000))
+    backend = make_backend(fake_s3, tmp_path, data, max_workers=4)
+    threads = set()
+    original = fake_s3.get_object
+
+    def slow_get(**kwargs):
+        threads.add(threading.get_ident())
+        time.sleep(0.01)
+        return original(**kwargs)
+
+    fake_s3.get_object = slow_get
+    with backend:
+        assert backend.fetch_range(50, 950) == data[50:950]
+    assert len(threads) > 1
+
+
+def test_ingest_to_s3_publishes_index_last(fake_s3, tmp_path):
+    data = "".join(chr(ord("a") + i % 26) for i in range(1000))
+    ingest_string(data, tmp_path, shard_size=100)
+    uploaded = ingest_to_s3(tmp_path, "prompts", prefix="v1", workers=4, client=fake_s3)
+
+    backend = S3Backend("prompts", prefix="v1", client=fake_s3)
+    aux = backend.index.aux_files
+    assert sorted(aux) == ["newlines.bin"]
+    assert sorted(uploaded) == sorted(f"v1/{aux.get(f.name, f.name)}" for f in tmp_path.iterdir())
+    assert fake_s3.upload_calls[-2:] == ["v1/meta.json", "v1/meta.bin"]
+    assert backend.fetch_range(0, 1000) == data
+    assert backend.read_aux("newlines.bin") == (tmp_path / "newlines.bin").read_bytes()
+
+
+def test_ingest_to_s3_skips_unchanged_objects(fake_s3, tmp_path):
+    data = "".join(chr(ord("a") + i % 26) for i in range(1000))
+    ingest_string(data, tmp_path, shard_size=100)
+    ingest_to_s3(tmp_path, "prompts", client=fake_s3)
+
+    changed = data[:550] + "!" + data[551:]
+    ingest_string(changed, tmp_path, shard_size=100)
+    fake_s3.upload_calls.clear()
+    assert ingest_to_s3(tmp_path, "prompts", client=fake_s3) == [
+        "0005-1.txt",
+        "meta.json",
+        "meta.bin",
+    ]
+    assert S3Backend("prompts", client=fake_s3).fetch_range(0, 1000) == changed
+    fake_s3.upload_calls.clear()
+    assert ingest_to_s3(tmp_path, "prompts", client=fake_s3) == ["meta.json", "meta.bin"]
+
+    forced = ingest_to_s3(tmp_path, "prompts", client=fake_s3, force=True)
+    assert len(forced) == len(list(tmp_path.iterdir()))
+
+
+def test_ingest_to_s3_keeps_aux_files_of_readers_on_the_old_index(fake_s3, tmp_path):
+    ingest_string("needle in a haystack " * 50, tmp_path, shard_size=100, trigram_bits=256)
+    old = (tmp_path / "trigrams.bin").read_bytes()
+    ingest_to_s3(tmp_path, "prompts", client=fake_s3)
+    reader = S3Backend("prompts", client=fake_s3)
+
+    append(tmp_path, "more hay " * 20)
+    ingest_to_s3(tmp_path, "prompts", client=fake_s3)
+    # The old reader loads its trigram filters only now, and still gets its own.
+    assert reader.read_aux("trigrams.bin") == old
+    assert reader.fetch_range(0, 21) == "needle in a haystack "
+    assert S3Backend("prompts", client=fake_s3).read_aux("trigrams.bin") != old
+
+
+def test_ingest_to_s3_never_overwrites_published_shards(fake_s3, tmp_path):
+    data = "alpha beta gamma " * 30
+    ingest_string(data, tmp_path, shard_size=100, checkpoint_interval=8)
+    ingest_to_s3(tmp_path, "prompts", prefix="v1", client=fake_s3)
+    reader = S3Backend("prompts", prefix="v1", client=fake_s3)
+
+    ingest_string(data.upper(), tmp_path, shard_size=100, checkpoint_interval=8)
+    ingest_to_s3(tmp_path, "prompts", prefix="v1", client=fake_s3)
+    # The old reader has cached nothing: every read goes to the store.
+    assert reader.fetch_range(0, 20) == data[:20]
+    assert reader.fetch_range(0, len(data)) == data
+    latest = S3Backend("prompts", prefix="v1", client=fake_s3)
+    assert latest.fetch_range(0, len(data)) == data.upper()
+    assert {s.revision for s in latest.index.shards} == {1}
+
+
+def test_ingest_to_s3_uploads_only_files_the_index_uses(fake_s3, tmp_path):
+    ingest_string("needle in a haystack " * 50, tmp_path, shard_size=100, trigram_bits=256)
+    append(tmp_path, "more hay " * 20)
+    append(tmp_path, "and more " * 20)
+    (tmp_path / "notes.txt~").write_text("editor backup")
+    uploaded = ingest_to_s3(tmp_path, "prompts", client=fake_s3)
+
+    backend = S3Backend("prompts", client=fake_s3)
+    index = backend.index
+    assert sorted(index.aux_files) == ["newlines.bin", "trigrams.bin"]
+    expected = [index.shard_filename(sid) for sid in range(index.num_shards)]
+    expected += [*index.aux_files.values(), "meta.json", "meta.bin"]
+    assert sorted(uploaded) == sorted(expected)
+    assert backend.read_aux("trigrams.bin") == FileBackend(tmp_path).read_aux("trigrams.bin")
@@ -0,0 +1,108 @@
+"""Tests for the streamed str search surface."""
+
+import re
+
+import pytest
+
+from distributed_prompt import DistributedPrompt, FileBackend, ingest_string
+
+DATA = ("abcab aaaa the cat sat; Café 42 and 7, ab\nab " * 40)[:1733]
+
+
+@pytest.fixture(params=[0, 2048], ids=["scan", "trigrams"])
+def dp(request, tmp_path):
+    ingest_string(DATA, tmp_path, shard_size=37, trigram_bits=request.param)
+    return DistributedPrompt(FileBackend(tmp_path))
+
+
+@pytest.mark.parametrize("sub", ["ab", "aa", "aaa", "cat sat", "b\nab", "zzz", "a", ""])
+def test_count_rfind_finditer(dp, sub):
+    assert dp.count(sub) == DATA.count(sub)
+    assert dp.count(sub, 100, 900) == DATA.count(sub, 100, 900)
+    assert dp.rfind(sub) == DATA.rfind(sub)
+    assert dp.rfind(sub, 5, 600) == DATA.rfind(sub, 5, 600)
+    if sub:
+        assert list(dp.finditer(sub)) == [m.start() for m in re.finditer(re.escape(sub), DATA)]
+
+
+def test_index_and_rindex(dp):
+    assert dp.index("cat") == DATA.index("cat")
+    assert dp.rindex("cat") == DATA.rindex("cat")
+    with pytest.raises(ValueError):
+        dp.index("zzz")
+    with pytest.raises(ValueError):
+        dp.rindex("zzz")
+
+
+def test_startswith_endswith(dp):
+    assert dp.startswith("abcab")
+    assert dp.startswith(("x", "abc"))
+    assert dp.startswith("cat", DATA.index("cat"))
+    assert not dp.startswith("abc", len(DATA) + 1)
+    assert dp.endswith(DATA[-50:])
+    assert dp.endswith("sat", 0, DATA.index("sat") + 3)
+    assert not dp.endswith("x" * 5000)
+    assert dp.startswith("") and dp.endswith("")
+
+
+@pytest.mark.parametrize(
+    "pattern", [r"\d+", r"\bab\b", r"a+", r"(?m)^ab", r"(?P<w>[A-Z]\w+)\s(\d+)", r"x*", r"t\w{2}"]
+)
+def test_re_finditer_matches_re(dp, pattern):
+    expected = [(m.start(), m.end(), m.group()) for m in re.finditer(pattern, DATA)]
+    got = [(m.start, m.end, m.text) for m in dp.re_finditer(pattern, max_match=64)]
+    assert got == expected
+
+
+def test_re_finditer_groups_and_process_pool(dp):
+    pattern = re.compile(r"(?P<word>\w+) (\d+)")
+    expected = list(pattern.finditer(DATA))
+    for processes in (None, 2):
+        got = list(dp.re_finditer(pattern, processes=processes, max_match=32))
+        assert [m.span() for m in got] == [m.span() for m in expected]
+        assert got[0].group("word") == expected[0].group("word")
+        assert got[0].group(2) == expected[0].group(2)
+
+
+def test_search_on_view(tmp_path):
+    ingest_string(DATA, tmp_path, shard_size=37)
+    dp = DistributedPrompt(FileBackend(tmp_path))
+    dp.view_threshold = 100
+    view, sub = dp[250:1500], DATA[250:1500]
+    assert view.count("ab") == sub.count("ab")
+    assert view.rfind("cat") == sub.rfind("cat")
+    assert [m.start for m in view.re_finditer(r"^\w", re.M)] == [
+        m.start() for m in re.finditer(r"^\w", sub, re.M)
+    ]
+
+
+def brute_force(patterns, text):
+    found = [
+        (p, i) for p in dict.fromkeys(patterns) for i in range(len(text)) if text.startswith(p, i)
+    ]
+    return sorted(found, key=lambda m: (m[1] + len(m[0]), m[1]))
+
+
+def test_find_all_of_matches_brute_force(dp):
+    patterns = ["ab", "b\nab", "aaa", "a", "cat", "Café 42", "at", "zzz", "ab"]
+    assert list(dp.find_all_of(patterns)) == brute_force(patterns, DATA)
+    assert list(dp.find_all_of(patterns, 100, 400)) == [
+        (p, i + 100) for p, i in brute_force(patterns, DATA[100:400])
+    ]
+
+
+def test_find_all_of_reads_each_shard_once(tmp_path, monkeypatch):
+    ingest_string(DATA, tmp_path, shard_size=37)
+    dp = DistributedPrompt(FileBackend(tmp_path))
+    calls = []
+    fetch = dp._backend.fetch_range
+    monkeypatch.setattr(dp._backend, "fetch_range", lambda a, b: calls.append(a) or fetch(a, b))
+    list(dp.find_all_of(["sat;", "ab\nab", "7, "]))
+    assert calls == [m.start_offset for m in dp._index.shards]
+
+
+def test_aho_corasick_rejects_empty_pattern():
+    from distributed_prompt.search import AhoCorasick
+
+    with pytest.raises(ValueError):
+        AhoCorasick(["a", ""])
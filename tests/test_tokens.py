@@ -0,0 +1,76 @@
+"""Tests for the token index and token-addressed slicing."""
+
+import pytest
+
+from distributed_prompt import DistributedPrompt, FileBackend, ingest_file, ingest_string
+from distributed_prompt.ingest import append
+
+tiktoken = pytest.importorskip("tiktoken")
+
+DATA = "the theory of the thing is that the other thin theme then ends. " * 30
+
+
+@pytest.fixture(scope="module")
+def enc():
+    """A small offline byte-level BPE encoding (no download needed)."""
+    ranks = {bytes([i]): i for i in range(256)}
+    for merge in [b"th", b"he", b"the", b" t", b" the", b"in", b"en", b"ing"]:
+        ranks[merge] = len(ranks)
+    return tiktoken.Encoding(
+        name="test-bytes",
+        pat_str=r""" ?\p{L}+| ?\p{N}+| ?[^\s\p{L}\p{N}]+|\s+(?!\S)|\s+""",
+        mergeable_ranks=ranks,
+        special_tokens={},
+    )
+
+
+def shard_tokens(enc, data, shard_size):
+    tokens = []
+    for i in range(0, len(data), shard_size):
+        tokens.extend(enc.encode_ordinary(data[i : i + shard_size]))
+    return tokens
+
+
+def test_num_tokens(tmp_path, enc):
+    index = ingest_string(DATA, tmp_path, shard_size=200, token_encoding=enc, token_interval=7)
+    dp = DistributedPrompt(FileBackend(tmp_path))
+    expected = shard_tokens(enc, DATA, 200)
+    assert dp.num_tokens == len(expected) == sum(s.num_tokens for s in index.shards)
+    assert len(dp.tokens) == len(expected)
+
+
+def test_token_slices(tmp_path, enc):
+    ingest_string(DATA, tmp_path, shard_size=200, token_encoding=enc, token_interval=7, workers=3)
+    dp = DistributedPrompt(FileBackend(tmp_path))
+    expected = shard_tokens(enc, DATA, 200)
+    for a, b in [(0, 1), (0, 10), (5, 50), (33, 34), (100, 400), (len(expected) - 5, None)]:
+        assert dp.tokens[a:b] == enc.decode(expected[a:b])
+    assert dp.tokens[3] == enc.decode(expected[3:4])
+    assert dp.tokens[-1] == enc.decode(expected[-1:])
+    assert dp.tokens[:] == DATA
+
+
+def test_non_ascii_windows_tile_the_text(tmp_path, enc):
+    data = "naïve café — 日本語のテキスト 🙂 " * 20
+    src = tmp_path / "src.txt"
+    src.write_text(data, encoding="utf-8")
+    ingest_file(src, tmp_path / "out", shard_size=50, token_encoding=enc, token_interval=3)
+    dp = DistributedPrompt(FileBackend(tmp_path / "out"))
+    n = dp.num_tokens
+    windows = [dp.tokens[i : i + 17] for i in range(0, n, 17)]
+    assert "".join(windows) == data
+
+
+def test_missing_token_index(tmp_path):
+    ingest_string("no tokens here", tmp_path)
+    dp = DistributedPrompt(FileBackend(tmp_path))
+    with pytest.raises(ValueError):
+        dp.num_tokens
+
+
+def test_append_extends_token_index(enc, tmp_path):
+    ingest_string(DATA[:1000], tmp_path, shard_size=300, token_encoding=enc, token_interval=16)
+    append(tmp_path, DATA[1000:], token_encoding=enc, token_interval=16)
+    prompt = DistributedPrompt(FileBackend(tmp_path))
+    assert prompt.num_tokens == len(shard_tokens(enc, DATA, 300))
+    assert prompt.tokens[100:140] == enc.decode(shard_tokens(enc, DATA, 300)[100:140])
@@ -0,0 +1,104 @@
+"""Tests for content hashes: hash-based equality and shard verification."""
+
+from dataclasses import replace
+
+from distributed_prompt import DistributedPrompt, FileBackend, ShardIndex, ingest_string
+from distributed_prompt.backends.s3_backend import S3Backend
+from distributed_prompt.ingest import append
+from distributed_prompt.shard import content_hash, root_hash
+
+DATA = "naïve café — 日本語 🙂 line of text\n" * 300
+
+
+class CountingBackend(FileBackend):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reads = 0
+
+    def get_shard_slice(self, shard_id, offset, length):
+        self.reads += 1
+        return super().get_shard_slice(shard_id, offset, length)
+
+
+def test_ingest_records_hashes(tmp_path):
+    index = ingest_string(DATA, tmp_path, shard_size=1000)
+    assert [s.sha256 for s in index.shards] == [
+        content_hash(DATA[s.start_offset : s.end_offset]) for s in index.shards
+    ]
+    assert index.root_hash == root_hash(s.sha256 for s in index.shards)
+    assert ShardIndex.load(tmp_path / "meta.json") == index
+    assert ShardIndex.load_binary(tmp_path / "meta.bin") == index
+
+
+def test_hashes_independent_of_compression(tmp_path):
+    plain = ingest_string(DATA, tmp_path / "plain", shard_size=1000)
+    packed = ingest_string(DATA, tmp_path / "zlib", shard_size=1000, compression="zlib")
+    assert packed.root_hash == plain.root_hash
+
+
+def test_equality_without_io(tmp_path):
+    ingest_string(DATA, tmp_path / "a", shard_size=1000)
+    ingest_string(DATA, tmp_path / "b", shard_size=1000, compression="zlib")
+    ingest_string(DATA[:-1] + "!", tmp_path / "c", shard_size=1000)
+    a, b, c = (CountingBackend(tmp_path / name) for name in "abc")
+
+    assert DistributedPrompt(a) == DistributedPrompt(b)
+    assert DistributedPrompt(a) != DistributedPrompt(c)
+    assert DistributedPrompt(a) == DATA
+    assert DistributedPrompt(c) != DATA
+    assert a.reads == b.reads == c.reads == 0
+
+
+def test_equality_falls_back_to_reading(tmp_path):
+    ingest_string(DATA, tmp_path / "a", shard_size=1000)
+    ingest_string(DATA, tmp_path / "b", shard_size=700)
+    a, b = FileBackend(tmp_path / "a"), FileBackend(tmp_path / "b")
+    assert DistributedPrompt(a) == DistributedPrompt(b)
+    assert DistributedPrompt(a)[5:] == DistributedPrompt(b)[5:]
+    assert DistributedPrompt(a)[5:] != DistributedPrompt(b)[6:]
+
+
+def test_verify_finds_corrupted_shards(tmp_path):
+    ingest_string(DATA, tmp_path, shard_size=1000)
+    backend = FileBackend(tmp_path, max_workers=4)
+    assert backend.verify() == []
+
+    path = tmp_path / "0003.txt"
+    data = bytearray(path.read_bytes())
+    data[10] ^= 1
+    path.write_bytes(bytes(data))
+    (tmp_path / "0005.txt").unlink()
+    assert backend.verify() == [3, 5]
+    assert backend.verify([0, 3]) == [3]
+
+
+def test_verify_compressed_over_s3(fake_s3, tmp_path):
+    ingest_string(DATA, tmp_path, shard_size=1000, compression="zlib")
+    fake_s3.load_dir(tmp_path, "prompts")
+    backend = S3Backend("prompts", client=fake_s3)
+    assert backend.verify() == []
+
+    fake_s3.put("prompts", "0002.zlib", b"garbage")
+    assert backend.verify() == [2]
+
+
+def strip_hashes(directory):
+    """Rewrite *directory*'s index as one written before content hashes existed."""
+    index = ShardIndex.load_dir(directory)
+    shards = [replace(s, sha256="") for s in index.shards]
+    replace(index, shards=shards, root_hash="").save(directory / "meta.json")
+    (directory / "meta.bin").unlink()
+
+
+def test_partial_hashes_never_decide_equality(tmp_path):
+    for name, text in [("a", "AAAAzz"), ("b", "BBBBzz")]:
+        ingest_string(text, tmp_path / name, shard_size=4)
+        strip_hashes(tmp_path / name)
+        index = append(tmp_path / name, "tail")
+        assert index.root_hash == ""
+        assert not index.has_hashes()
+
+    a, b = (DistributedPrompt(FileBackend(tmp_path / name)) for name in "ab")
+    assert a.root_hash is None
+    assert a != b
+    assert a == "AAAAzztail"